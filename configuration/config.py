@@ -11,3 +11,58 @@ CR_USER_ID = int(os.getenv("CR_USER_ID", "0").strip())
 CR_ROLE_NAME = os.getenv("CR_ROLE_NAME", "Class Representative").strip()
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "").strip()
 CHANNEL_ID = int(os.getenv("ANNOUNCEMENT_CHANNEL_ID", "0").strip())
+
+TEMP_CHANGES_FLUSH_SECONDS = int(os.getenv("TEMP_CHANGES_FLUSH_SECONDS", "15").strip())
+
+# Mistral HTTP client (shared keep-alive pool owned by the AI cog)
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions").strip()
+MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-small-latest").strip()
+MISTRAL_TIMEOUT = float(os.getenv("MISTRAL_TIMEOUT", "10").strip())
+MISTRAL_CONNECT_TIMEOUT = float(os.getenv("MISTRAL_CONNECT_TIMEOUT", "3").strip())
+MISTRAL_MAX_CONNECTIONS = int(os.getenv("MISTRAL_MAX_CONNECTIONS", "10").strip())
+MISTRAL_KEEPALIVE = float(os.getenv("MISTRAL_KEEPALIVE", "60").strip())
+# Per-attempt deadline, attempts per question, and the latency percentile after which a
+# hedged second request is sent (0 disables hedging)
+MISTRAL_ATTEMPT_TIMEOUT = float(os.getenv("MISTRAL_ATTEMPT_TIMEOUT", "6").strip())
+MISTRAL_MAX_ATTEMPTS = int(os.getenv("MISTRAL_MAX_ATTEMPTS", "2").strip())
+MISTRAL_HEDGE_PERCENTILE = float(os.getenv("MISTRAL_HEDGE_PERCENTILE", "0.95").strip())
+# Retries + hedges allowed per request on average, and circuit breaker settings
+MISTRAL_RETRY_BUDGET = float(os.getenv("MISTRAL_RETRY_BUDGET", "0.2").strip())
+MISTRAL_BREAKER_FAILURES = int(os.getenv("MISTRAL_BREAKER_FAILURES", "5").strip())
+MISTRAL_BREAKER_RESET = float(os.getenv("MISTRAL_BREAKER_RESET", "30").strip())
+# Stream answers and edit the reply at most once per MISTRAL_STREAM_EDIT_INTERVAL seconds
+MISTRAL_STREAM = os.getenv("MISTRAL_STREAM", "1").strip().lower() not in ("0", "false", "no")
+MISTRAL_STREAM_EDIT_INTERVAL = float(os.getenv("MISTRAL_STREAM_EDIT_INTERVAL", "1.0").strip())
+
+# !ask answer cache
+ASK_CACHE_SIZE = int(os.getenv("ASK_CACHE_SIZE", "256").strip())
+ASK_CACHE_TTL = float(os.getenv("ASK_CACHE_TTL", "600").strip())
+
+# Retrieved snippets included in the !ask prompt, and their approximate token budget
+ASK_CONTEXT_TOP_K = int(os.getenv("ASK_CONTEXT_TOP_K", "8").strip())
+ASK_CONTEXT_TOKENS = int(os.getenv("ASK_CONTEXT_TOKENS", "400").strip())
+
+# !ask admission control: concurrent Mistral calls, queue bound and token buckets
+ASK_CONCURRENCY = int(os.getenv("ASK_CONCURRENCY", "4").strip())
+ASK_MAX_QUEUE = int(os.getenv("ASK_MAX_QUEUE", "20").strip())
+ASK_MAX_WAIT = float(os.getenv("ASK_MAX_WAIT", "5").strip())
+ASK_USER_PER_MINUTE = float(os.getenv("ASK_USER_PER_MINUTE", "3").strip())
+ASK_USER_BURST = int(os.getenv("ASK_USER_BURST", "3").strip())
+ASK_CHANNEL_PER_MINUTE = float(os.getenv("ASK_CHANNEL_PER_MINUTE", "30").strip())
+ASK_CHANNEL_BURST = int(os.getenv("ASK_CHANNEL_BURST", "10").strip())
+
+# Outbound messages: per-channel send rate (Discord allows about 5 messages per 5 s per channel)
+# and the size above which long output is sent as a .txt attachment instead of many messages
+DISPATCH_CHANNEL_RATE = float(os.getenv("DISPATCH_CHANNEL_RATE", "1.0").strip())
+DISPATCH_CHANNEL_BURST = int(os.getenv("DISPATCH_CHANNEL_BURST", "5").strip())
+DISPATCH_FILE_THRESHOLD = int(os.getenv("DISPATCH_FILE_THRESHOLD", "12000").strip())
+
+# Command profiling: when PROFILE_THRESHOLD is above 0, commands are stack-sampled every
+# PROFILE_INTERVAL seconds and those slower than the threshold are written to PROFILE_DIR
+# (at most PROFILE_MAX_FILES files are kept). The PROFILE_SLOWEST slowest invocations are
+# listed by `!debug slowest`.
+PROFILE_THRESHOLD = float(os.getenv("PROFILE_THRESHOLD", "0").strip())
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005").strip())
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles").strip()
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50").strip())
+PROFILE_SLOWEST = int(os.getenv("PROFILE_SLOWEST", "20").strip())
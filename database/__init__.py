@@ -1 +1 @@
-from .database import init_db, get_db
\ No newline at end of file
+from .database import init_db, get_db, run_db, run_blocking, instrument
\ No newline at end of file
@@ -1,12 +1,27 @@
 import os
-from sqlalchemy import create_engine, text
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session
 from .models import Base
+from .migrations import run_migrations
 
 # Load .env file to ensure DATABASE_URL is available
 from dotenv import load_dotenv
 load_dotenv()
 
+# Pool / executor configuration
+# DB_POOL_SIZE and DB_MAX_OVERFLOW bound the connection pool (PostgreSQL only),
+# DB_POOL_TIMEOUT is how long to wait for a free connection, DB_QUERY_TIMEOUT
+# bounds how long an async caller waits for a query to finish.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_QUERY_TIMEOUT = float(os.getenv('DB_QUERY_TIMEOUT', '30'))
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', '0')) or DB_POOL_SIZE + DB_MAX_OVERFLOW
+
 # Database URL configuration
 # Priority: DATABASE_URL env var (PostgreSQL) > SQLite fallback
 DATABASE_URL = os.getenv('DATABASE_URL', '').strip() or None
@@ -19,7 +34,10 @@ if DATABASE_URL:
     
     # pool_pre_ping=True helps with "Connection timed out" errors by checking if the connection is alive
     # pool_recycle=3600 ensures connections are refreshed every hour
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
+    engine = create_engine(
+        DATABASE_URL, pool_pre_ping=True, pool_recycle=3600,
+        pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+    )
 else:
     # Local development: Use SQLite
     # Store DB file in /data if available (writable volume), or project root locally
@@ -36,23 +54,74 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 ScopedSession = scoped_session(SessionLocal)
 
 def init_db():
-    """Initialize the database by creating all tables defined in models.py."""
+    """Create missing tables and apply pending schema migrations (see migrations.py)."""
+    fresh = not inspect(engine).get_table_names()
     Base.metadata.create_all(bind=engine)
-    
-    # SQLite-specific migration: Add new columns if they don't exist
-    # Only run this for SQLite databases
-    if 'sqlite' in str(engine.url):
-        with engine.connect() as conn:
-            # Check schedule table columns
-            result = conn.execute(text("PRAGMA table_info(schedule)"))
-            columns = [row.name for row in result]
-            
-            if 'instructor' not in columns:
-                conn.execute(text("ALTER TABLE schedule ADD COLUMN instructor TEXT"))
-            if 'note' not in columns:
-                conn.execute(text("ALTER TABLE schedule ADD COLUMN note TEXT"))
-            conn.commit()
+    run_migrations(engine, fresh=fresh)
+
+_instrumented = False
+
+def instrument(metrics):
+    """Count and time every SQL statement into `metrics` (the bot's metrics registry).
+
+    Statements are labelled by their first keyword (SELECT, INSERT, ...), which keeps
+    the number of series small.
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    seconds = {}
+    errors = metrics.counter("db_query_errors", "SQL statements that raised")
+
+    def _verb(statement):
+        return (statement.lstrip().split(None, 1) or ['?'])[0].upper()
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        verb = _verb(statement)
+        histogram = seconds.get(verb)
+        if histogram is None:
+            histogram = seconds[verb] = metrics.histogram(
+                "db_query_seconds", "SQL statement execution time", labels={'statement': verb})
+        histogram.observe(elapsed)
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+        errors.inc()
 
 def get_db():
     """Provide a new database session. Caller is responsible for closing it."""
     return SessionLocal()
+
+# Bounded pool of worker threads so blocking queries never run on the event loop.
+# Sized to the connection pool so workers don't queue on pool checkout.
+_db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+
+async def run_blocking(func, *args, timeout=None, **kwargs):
+    """Run a blocking callable on the database thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    fut = loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(fut, timeout or DB_QUERY_TIMEOUT)
+
+async def run_db(func, *args, timeout=None, **kwargs):
+    """Call `func(session, *args, **kwargs)` with a fresh session on the database thread pool.
+
+    The session is closed afterwards, so `func` should return plain values rather than
+    ORM objects that will be accessed later.
+    """
+    def _call():
+        db = get_db()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+    return await run_blocking(_call, timeout=timeout)
@@ -0,0 +1,157 @@
+"""Versioned schema migrations.
+
+`create_all()` only creates missing tables, so changes to existing tables are
+expressed as numbered steps here. The last applied step is stored in the
+`schema_version` table; a brand-new database is stamped with the latest version
+because `create_all()` already built it with the current schema. Every step runs
+in its own transaction and uses DDL supported by both SQLite (>= 3.35) and
+PostgreSQL.
+"""
+import logging
+from sqlalchemy import inspect, text, bindparam, Date, Time
+from .models import Base, Assignment, SchemaVersion
+from .parsing import parse_date, parse_time, parse_interval, parse_weekday
+
+logger = logging.getLogger('discord_bot')
+
+
+def _columns(conn, table):
+    return {c['name']: c for c in inspect(conn).get_columns(table)}
+
+
+def _add_missing_schedule_columns(conn):
+    """v1: schedule.instructor / schedule.note (previously an ad-hoc SQLite-only block)."""
+    columns = _columns(conn, 'schedule')
+    for name in ('instructor', 'note'):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE schedule ADD COLUMN {name} VARCHAR"))
+
+
+def _convert_column(conn, table, column, sa_type, parser):
+    """Rewrite a string column as `sa_type`, converting existing values with `parser`.
+
+    Values the parser does not recognise become NULL; their original text is kept in
+    `<column>_raw` so nothing is lost.
+    """
+    current = _columns(conn, table).get(column)
+    if current is None or isinstance(current['type'], type(sa_type)):
+        return
+    tmp = f"{column}__new"
+    type_sql = sa_type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {tmp} {type_sql}"))
+    rows = conn.execute(text(f"SELECT id, {column} FROM {table}")).fetchall()
+    updates, unparsed = [], []
+    for row_id, raw in rows:
+        value = parser(raw)
+        if value is None and raw not in (None, ''):
+            logger.warning(f"Migration: could not parse {table}.{column}={raw!r} (id={row_id}); "
+                           f"storing NULL and keeping the text in {table}.{column}_raw")
+            unparsed.append({'row_id': row_id, 'raw': str(raw)})
+        updates.append({'row_id': row_id, 'value': value})
+    if updates:
+        stmt = text(f"UPDATE {table} SET {tmp} = :value WHERE id = :row_id").bindparams(bindparam('value', type_=sa_type))
+        conn.execute(stmt, updates)
+    if unparsed:
+        if f"{column}_raw" not in _columns(conn, table):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column}_raw VARCHAR"))
+        conn.execute(text(f"UPDATE {table} SET {column}_raw = :raw WHERE id = :row_id"), unparsed)
+    conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {tmp} TO {column}"))
+
+
+def _typed_columns(conn):
+    """v2: lowercase schedule days; DATE/TIME columns for assignments and assessments."""
+    conn.execute(text("UPDATE schedule SET day = lower(trim(day)) WHERE day IS NOT NULL"))
+    _convert_column(conn, 'assignments', 'due_date', Date(), parse_date)
+    _convert_column(conn, 'assessments', 'date', Date(), parse_date)
+    _convert_column(conn, 'assessments', 'time', Time(), parse_time)
+
+
+def _create_indexes(conn):
+    """v3: create the indexes declared on the models for tables that predate them."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _assignment_subject_index(conn):
+    """v4: (subject, due_date, id) index for subject-filtered assignment pages."""
+    for index in Assignment.__table__.indexes:
+        if index.name == 'ix_assignments_subject_due_date_id':
+            index.create(bind=conn, checkfirst=True)
+
+
+def _schedule_intervals(conn):
+    """v5: schedule.start_minute / schedule.end_minute, parsed from schedule.time."""
+    columns = _columns(conn, 'schedule')
+    for name in ('start_minute', 'end_minute'):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE schedule ADD COLUMN {name} INTEGER"))
+    rows = conn.execute(text("SELECT id, time FROM schedule")).fetchall()
+    updates = []
+    for row_id, raw in rows:
+        start, end = parse_interval(raw)
+        if start is None and raw not in (None, ''):
+            logger.warning(f"Migration: could not parse schedule.time={raw!r} (id={row_id}); storing NULL")
+        updates.append({'row_id': row_id, 'start': start, 'end': end})
+    if updates:
+        conn.execute(text("UPDATE schedule SET start_minute = :start, end_minute = :end WHERE id = :row_id"), updates)
+    # Let the next import re-diff the table against main.json, whose metadata may set day_start
+    conn.execute(text("DELETE FROM import_state WHERE name = 'schedule'"))
+
+
+def _normalize_schedule_days(conn):
+    """v6: full lowercase weekday names in schedule.day ('Mon' -> 'monday')."""
+    rows = conn.execute(text("SELECT id, day FROM schedule")).fetchall()
+    updates = []
+    for row_id, raw in rows:
+        day = parse_weekday(raw)
+        if day is None:
+            logger.warning(f"Migration: schedule.day={raw!r} (id={row_id}) is not a weekday; left unchanged")
+        elif day != raw:
+            updates.append({'row_id': row_id, 'day': day})
+    if updates:
+        conn.execute(text("UPDATE schedule SET day = :day WHERE id = :row_id"), updates)
+
+
+MIGRATIONS = [
+    (1, _add_missing_schedule_columns),
+    (2, _typed_columns),
+    (3, _create_indexes),
+    (4, _assignment_subject_index),
+    (5, _schedule_intervals),
+    (6, _normalize_schedule_days),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _get_version(conn):
+    row = conn.execute(text("SELECT version FROM schema_version WHERE id = 1")).first()
+    return row[0] if row else None
+
+
+def _set_version(conn, version):
+    table = SchemaVersion.__table__
+    if _get_version(conn) is None:
+        conn.execute(table.insert().values(id=1, version=version))
+    else:
+        conn.execute(table.update().where(table.c.id == 1).values(version=version))
+
+
+def run_migrations(engine, fresh=False):
+    """Apply all pending migrations. Returns the resulting schema version."""
+    with engine.begin() as conn:
+        version = _get_version(conn)
+        if version is None:
+            version = LATEST_VERSION if fresh else 0
+            _set_version(conn, version)
+
+    for number, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info(f"Applying database migration {step.__doc__.splitlines()[0]}")
+        with engine.begin() as conn:
+            step(conn)
+            _set_version(conn, number)
+        version = number
+    return version
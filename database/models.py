@@ -1,25 +1,39 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, Index, Date, Time, DateTime
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
 
+WEEKDAYS = ('sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')
+
 class Schedule(Base):
     __tablename__ = "schedule"
     id = Column(Integer, primary_key=True, autoincrement=True)
+    # Lowercase weekday name from WEEKDAYS (normalized with parsing.parse_weekday on every write),
+    # so lookups are plain equality seeks
     day = Column(String)
     time = Column(String)
+    # `time` parsed into minutes after midnight (see migrations.parse_interval); NULL if unparseable
+    start_minute = Column(Integer)
+    end_minute = Column(Integer)
     subject = Column(String)
     group_name = Column(String)
     room = Column(String)
     instructor = Column(String)
     note = Column(String)
 
+    __table_args__ = (Index("ix_schedule_day_group", "day", "group_name"),)
+
 class Assignment(Base):
     __tablename__ = "assignments"
     id = Column(Integer, primary_key=True, autoincrement=True)
     subject = Column(String)
     topic = Column(String)
-    due_date = Column(String)
+    due_date = Column(Date)
+
+    __table_args__ = (
+        Index("ix_assignments_due_date_id", "due_date", "id"),
+        Index("ix_assignments_subject_due_date_id", "subject", "due_date", "id"),
+    )
 
 class Note(Base):
     __tablename__ = "notes"
@@ -27,16 +41,52 @@ class Note(Base):
     subject = Column(String)
     link = Column(String)
 
+    __table_args__ = (Index("ix_notes_subject", "subject"),)
+
 class Material(Base):
     __tablename__ = "materials"
     id = Column(Integer, primary_key=True, autoincrement=True)
     subject = Column(String)
     drive_link = Column(String)
 
+    __table_args__ = (Index("ix_materials_subject", "subject"),)
+
 class Assessment(Base):
     __tablename__ = "assessments"
     id = Column(Integer, primary_key=True, autoincrement=True)
     subject = Column(String)
-    date = Column(String)
-    time = Column(String)
+    date = Column(Date)
+    time = Column(Time)
     description = Column(String)
+
+    __table_args__ = (Index("ix_assessments_date", "date"),)
+
+class TempChange(Base):
+    """Temporary (single-week) schedule replacement or cancellation."""
+    __tablename__ = "temp_changes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    year = Column(Integer, nullable=False)
+    week = Column(Integer, nullable=False)
+    group_name = Column(String, nullable=False)
+    day = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # 'replacement' or 'cancellation'
+    orig_time = Column(String)
+    orig_subject = Column(String)
+    new_time = Column(String)
+    new_subject = Column(String)
+    new_room = Column(String)
+
+    __table_args__ = (Index("ix_temp_changes_year_week", "year", "week"),)
+
+class SchemaVersion(Base):
+    """Single-row table recording the last applied migration (see migrations.py)."""
+    __tablename__ = "schema_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+class ImportState(Base):
+    """Content hash of the last bulk import per source (e.g. main.json -> schedule)."""
+    __tablename__ = "import_state"
+    name = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)
+    imported_at = Column(DateTime, nullable=False)
@@ -0,0 +1,85 @@
+"""Parsers for the free-form dates and times found in schedule and assignment data.
+
+Used by the schema migrations when converting existing rows and by the bot when
+importing or editing data, so both read values the same way.
+"""
+import re
+from datetime import datetime
+from .models import WEEKDAYS
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%d-%m-%Y', '%d/%m/%Y', '%d %B %Y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y')
+TIME_FORMATS = ('%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M%p', '%I %p', '%I%p')
+# Earliest time a class can start, in minutes after midnight; main.json's metadata.day_start overrides it
+DEFAULT_DAY_START = 7 * 60
+_CLOCK_RE = re.compile(r'(\d{1,2})[:.](\d{2})(?:\s*([AaPp])\.?[Mm]\.?)?')
+
+
+def parse_date(value):
+    """Parse a free-form date string into a date, or None if it isn't recognised."""
+    if value is None:
+        return None
+    s = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_time(value):
+    """Parse a free-form time string into a time, or None if it isn't recognised."""
+    if value is None:
+        return None
+    s = str(value).strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_weekday(value):
+    """Lowercase full weekday name for e.g. 'Monday', 'mon' or ' TUES ', or None if it isn't one."""
+    s = str(value or '').strip().lower().rstrip('.')
+    if len(s) >= 3:
+        for day in WEEKDAYS:
+            if day.startswith(s):
+                return day
+    return None
+
+
+def day_start_minute(metadata):
+    """Earliest class start in minutes after midnight, from main.json's `metadata.day_start`."""
+    value = parse_time(metadata.get('day_start')) if isinstance(metadata, dict) else None
+    return value.hour * 60 + value.minute if value else DEFAULT_DAY_START
+
+
+def _clock_minutes(hour, minute, marker, earliest):
+    if marker:
+        return (hour % 12 + (12 if marker in 'Pp' else 0)) * 60 + minute
+    value = hour * 60 + minute
+    # 12-hour reading without AM/PM: the first occurrence at or after `earliest`
+    if hour < 12 and value < earliest:
+        value += 12 * 60
+    return value
+
+
+def parse_interval(value, day_start=DEFAULT_DAY_START):
+    """Parse a schedule time like '10:15–11:55' or '1:35 - 2:25 PM' into (start_minute, end_minute).
+
+    main.json writes afternoon hours without AM/PM, so a bare start before `day_start` is
+    read as PM, and a bare end as the first time after the start. A single time gives
+    (start, None); anything unrecognised gives (None, None).
+    """
+    clocks = [
+        (int(h), int(m), marker) for h, m, marker in _CLOCK_RE.findall(str(value or ''))[:2]
+        if int(h) < 24 and int(m) < 60
+    ]
+    if not clocks:
+        return (None, None)
+    start = _clock_minutes(*clocks[0], day_start)
+    if len(clocks) == 1:
+        return (start, None)
+    return (start, _clock_minutes(*clocks[1], start + 1))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Benchmark `!ask` schedule questions: local fast path vs a Mistral round trip.
+
+First checks that the questions in HIT_QUESTIONS are answered by `fastpath`
+and those in MISS_QUESTIONS fall through to the LLM, exiting 1 otherwise. Then
+answers them all from main.json, reporting the hit rate and per-question
+latency, and sends the same questions to the local Mistral stand-in (with a
+configurable simulated provider delay) for comparison.
+
+    python scripts/bench_fastpath.py --iterations 2000 --llm-delay-ms 800
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src'), os.path.dirname(__file__)]
+
+import fastpath
+import mistral_standin
+from utils import load_main_schedule_from_file
+
+HIT_QUESTIONS = [
+    "what's next for GroupA",
+    "next class for group b",
+    "is there class tomorrow",
+    "classes today for group a",
+    "schedule for wednesday group b",
+    "where is Microprocessor lab",
+    "which room is English",
+    "where is control system on sunday",
+]
+# These must fall through to the LLM
+MISS_QUESTIONS = [
+    "when is the control system exam",
+    "explain the microprocessor assignment",
+    "what should I study next?",
+    "when is the next holiday",
+    "who teaches the monday class",
+    "can we skip class on friday?",
+    "what time does class end on monday",
+    "is the college open on saturday",
+    "what is the next chapter in control system",
+]
+QUESTIONS = HIT_QUESTIONS + MISS_QUESTIONS
+
+
+def check_intents():
+    """Questions answered (or not) contrary to HIT_QUESTIONS / MISS_QUESTIONS."""
+    wrong = [q for q in HIT_QUESTIONS if fastpath.FASTPATH.answer(q) is None]
+    wrong += [q for q in MISS_QUESTIONS if fastpath.FASTPATH.answer(q) is not None]
+    return wrong
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def bench_fastpath(iterations):
+    per_q = []
+    hits = 0
+    for q in QUESTIONS:
+        hits += fastpath.FASTPATH.answer(q) is not None
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fastpath.FASTPATH.answer(q)
+            samples.append(time.perf_counter() - started)
+        per_q.append((q, _summary(samples)))
+    return hits, per_q
+
+
+async def bench_llm(delay_ms, requests):
+    from mistral_client import MistralClient
+
+    app = mistral_standin.create_app(delay_ms=delay_ms)
+    runner, base = await mistral_standin.start(app)
+    client = MistralClient(api_key='standin', url=f"{base}/v1/chat/completions")
+    samples = []
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            await client.ask(QUESTIONS[i % len(QUESTIONS)])
+            samples.append(time.perf_counter() - started)
+    finally:
+        await client.close()
+        await runner.cleanup()
+    return _summary(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1000, help='Fast-path runs per question')
+    parser.add_argument('--llm-delay-ms', type=float, default=800.0, help='Simulated provider latency')
+    parser.add_argument('--llm-requests', type=int, default=10, help='Requests sent to the stand-in')
+    args = parser.parse_args()
+
+    load_main_schedule_from_file(os.path.join(PROJECT_ROOT, 'main.json'))
+    wrong = check_intents()
+    if wrong:
+        print("❌ fast path answered wrongly (expected the opposite):")
+        for q in wrong:
+            print(f"  {q!r}")
+        sys.exit(1)
+    hits, per_q = bench_fastpath(args.iterations)
+    print(f"fast path hit rate: {hits}/{len(QUESTIONS)} ({hits / len(QUESTIONS):.0%})")
+    for q, s in per_q:
+        print(f"  {q!r:45} mean={s['mean'] * 1e6:8.1f} us  p50={s['p50'] * 1e6:8.1f} us  p99={s['p99'] * 1e6:8.1f} us")
+    llm = asyncio.run(bench_llm(args.llm_delay_ms, args.llm_requests))
+    fast_mean = statistics.fmean(s['mean'] for _, s in per_q)
+    print(f"LLM stand-in ({args.llm_delay_ms:.0f} ms delay): mean={llm['mean'] * 1e3:.1f} ms  p50={llm['p50'] * 1e3:.1f} ms")
+    print(f"speedup on fast-path hits: ~{llm['mean'] / fast_mean:,.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the schedule merge, parse and render hot paths.
+
+Generates a synthetic timetable with the shape of `main.json`, scaled to any
+number of groups, plus a temporary-change overlay of a given density. It then
+measures, for each hot function:
+  * throughput: items per second, from the best of several timeit rounds
+  * allocations: peak traced memory for one pass (tracemalloc)
+
+Save the results as a baseline and compare later runs against it. A comparison
+exits with status 1 when any function's throughput drops, or its peak memory
+grows, by more than the threshold. This makes it usable as a CI gate. Record the
+baseline on the same machine as the run it is compared with.
+
+    python scripts/bench_hotpaths.py --groups 500 --overlay 0.3 --save /tmp/hotpaths.json
+    python scripts/bench_hotpaths.py --groups 500 --overlay 0.3 --compare /tmp/hotpaths.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+import utils
+from utils import (
+    merge_schedule_for_week, apply_temp_changes_to_db_rows, _parse_edit_cancel_args,
+    _find_time_tokens, _normalize_time, _normalize_subject,
+)
+from cogs.schedule import Schedule
+
+WEEK = (2025, 10)
+DAYS = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday"]
+SUBJECTS = [
+    "Microprocessor [L]", "English", "Control System (L)", "Numerical Methods (T)", "Electromagnetics (P)",
+    "Computer Graphics Lab", "Math III (L+T)", "Advanced Electronics", "Signal Analysis Practical",
+]
+INSTRUCTORS = ["Dr. RKS", "Er. AB", "Prof. CD", "None", ""]
+ROOMS = ["Lecture Room 4", "Lab 2", "Lab 3", "Lecture Room 1", ""]
+MIN_KIB_GROWTH = 4  # peak-memory growth below this is never a regression
+
+
+def _template(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {g: days for g, days in data.items() if g != 'metadata' and isinstance(days, dict)}
+
+
+def synthetic_schedule(groups, rng, template):
+    """`groups` groups: the real ones from main.json, then perturbed copies of them."""
+    real = list(template.items())
+    schedule = {}
+    for i in range(groups):
+        name, days = real[i % len(real)]
+        group = name if i < len(real) else f"{name}{i}"
+        schedule[group] = {}
+        for day, entries in days.items():
+            copied = []
+            for e in entries:
+                e = dict(e)
+                if i >= len(real) and rng.random() < 0.3:
+                    e['subject'] = rng.choice(SUBJECTS)
+                    e['instructor'] = rng.choice(INSTRUCTORS)
+                    e['room'] = rng.choice(ROOMS)
+                if rng.random() < 0.1:
+                    e['note'] = rng.choice(["Alt. week", "Alternate with lab", "Bring calculators"])
+                # Times appear in several spellings in hand-edited files
+                if rng.random() < 0.2:
+                    e['time'] = e['time'].replace('–', rng.choice(['-', ' - ', ' to '])) + rng.choice(['', ' am', 'PM'])
+                copied.append(e)
+            schedule[group][day.lower()] = copied
+    return schedule
+
+
+def synthetic_overlay(schedule, density, rng):
+    """Temp changes for WEEK: about `density` of all entries are replaced or cancelled, plus some pure adds."""
+    overlay = {}
+    for group, days in schedule.items():
+        for day, entries in days.items():
+            changes = {}
+            for e in entries:
+                if rng.random() >= density:
+                    continue
+                key = (_normalize_time(e.get('time')), _normalize_subject(e.get('subject')))
+                if rng.random() < 0.4:
+                    changes.setdefault('cancellations', []).append(key)
+                else:
+                    new_e = {'time': _normalize_time(e.get('time')), 'subject': rng.choice(SUBJECTS), 'room': rng.choice(ROOMS)}
+                    changes.setdefault('replacements', []).append((key, new_e))
+            if rng.random() < density / 2:
+                new_e = {'time': f"{rng.randint(1, 5)}:{rng.choice(['00', '30'])} PM", 'subject': "Extra class", 'room': ''}
+                changes.setdefault('replacements', []).append(((new_e['time'], 'extra class'), new_e))
+            if changes:
+                overlay.setdefault(group, {})[day] = changes
+    return {WEEK: overlay}
+
+
+def db_rows(schedule):
+    return [
+        {'group_name': group, 'day': day.title(), 'time': e.get('time'), 'subject': e.get('subject'), 'room': e.get('room', '')}
+        for group, days in schedule.items() for day, entries in days.items() for e in entries
+    ]
+
+
+def command_args(schedule, n, rng):
+    groups = list(schedule)
+    out = []
+    for _ in range(n):
+        time = f"{rng.randint(1, 12)}:{rng.choice(['00', '15', '30', '45'])}" + rng.choice(['', ' AM', 'PM', ' pm'])
+        subject = rng.choice(SUBJECTS)
+        head = f"{rng.choice(groups)} {rng.choice(DAYS).title()} {time} {subject}"
+        if rng.random() < 0.5:
+            new_time = f"{rng.randint(1, 12)}:{rng.choice(['00', '30'])}" + rng.choice(['', ' PM'])
+            out.append(f"{head} {new_time} {rng.choice(SUBJECTS)} {rng.choice(['temporary', 'permanent'])}")
+        else:
+            out.append(f"{head} {rng.choice(['temporary', 'permanent', ''])}".strip())
+    return out
+
+
+def workloads(schedule, rng, args):
+    pairs = [(g, d) for g, days in schedule.items() for d in days]
+    rows = db_rows(schedule)
+    commands = command_args(schedule, args.commands, rng)
+    token_lists = [c.split() for c in commands]
+    times = [e.get('time') for days in schedule.values() for entries in days.values() for e in entries]
+    merged = [e for g, d in pairs for e in merge_schedule_for_week(g, d, WEEK)]
+    formatter = Schedule(bot=None)
+
+    def merge():
+        for g, d in pairs:
+            merge_schedule_for_week(g, d, WEEK)
+
+    def find_tokens():
+        for tokens in token_lists:
+            _find_time_tokens(tokens, 2)
+
+    def parse():
+        for c in commands:
+            _parse_edit_cancel_args(c)
+
+    def normalize():
+        for t in times:
+            _normalize_time(t)
+
+    def render():
+        for e in merged:
+            formatter._format_schedule_entry(e)
+
+    return [
+        ('merge_schedule_for_week', len(pairs), merge),
+        ('apply_temp_changes_to_db_rows', len(rows), lambda: apply_temp_changes_to_db_rows(rows, WEEK)),
+        ('_parse_edit_cancel_args', len(commands), parse),
+        ('_find_time_tokens', len(token_lists), find_tokens),
+        ('_normalize_time', len(times), normalize),
+        ('_format_schedule_entry', len(merged), render),
+    ]
+
+
+def measure(fn, items, repeat):
+    # CPU time of this process, so time the machine spends on other work is not counted
+    timer = timeit.Timer(fn, timer=time.process_time)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'items': items,
+        'seconds_per_pass': best,
+        'items_per_second': items / best if best else 0.0,
+        'peak_kib': (peak - baseline) / 1024,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print deltas against `baseline`; return the names that regressed beyond `threshold`."""
+    regressed = []
+    print(f"\n{'function':32} {'items/s Δ':>10} {'peak Δ':>10}")
+    for name, r in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            print(f"{name:32} {'new':>10}")
+            continue
+        speed = r['items_per_second'] / old['items_per_second'] - 1 if old['items_per_second'] else 0.0
+        memory = (r['peak_kib'] / old['peak_kib'] - 1) if old['peak_kib'] else 0.0
+        bad = speed < -threshold or (memory > threshold and r['peak_kib'] - old['peak_kib'] > MIN_KIB_GROWTH)
+        if bad:
+            regressed.append(name)
+        print(f"{name:32} {speed:+10.1%} {memory:+10.1%}{'  ❌ regression' if bad else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=200, help='Groups in the synthetic schedule (main.json has 2)')
+    parser.add_argument('--overlay', type=float, default=0.2, help='Fraction of entries with a temporary change')
+    parser.add_argument('--commands', type=int, default=2000, help='Edit/cancel command strings to parse')
+    parser.add_argument('--repeat', type=int, default=5, help='timeit rounds; the best is reported')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='+', help='Run only these functions')
+    parser.add_argument('--save', help='Write results to this JSON file (a baseline)')
+    parser.add_argument('--compare', help='Compare against a baseline JSON file; exit 1 on regression')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Allowed slowdown / memory growth (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    schedule = synthetic_schedule(args.groups, rng, _template(os.path.join(PROJECT_ROOT, 'main.json')))
+    utils.MAIN_SCHEDULE = schedule
+    utils.MAIN_SCHEDULE_VERSION += 1
+    utils.TEMP_CHANGES.clear()
+    utils.TEMP_CHANGES.update(synthetic_overlay(schedule, args.overlay, rng))
+    utils.TEMP_CHANGES_VERSION += 1
+    entries = sum(len(e) for days in schedule.values() for e in days.values())
+    print(f"{args.groups} groups, {entries} entries, overlay {args.overlay:.0%}, Python {platform.python_version()}\n")
+
+    print(f"{'function':32} {'items':>8} {'items/s':>12} {'µs/item':>9} {'peak KiB':>9}")
+    results = {}
+    for name, items, fn in workloads(schedule, rng, args):
+        if args.only and name not in args.only:
+            continue
+        r = results[name] = measure(fn, items, args.repeat)
+        print(f"{name:32} {items:8} {r['items_per_second']:12,.0f} {1e6 / r['items_per_second']:9.2f} {r['peak_kib']:9.1f}")
+
+    config = {'groups': args.groups, 'overlay': args.overlay, 'commands': args.commands, 'seed': args.seed}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'config': config, 'python': platform.python_version(), 'results': results}, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print(f"\n⚠️ Baseline was recorded with {baseline.get('config')}; results are not comparable.")
+        regressed = compare(results, baseline, args.threshold)
+        if regressed:
+            print(f"\n{len(regressed)} function(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}.")
+
+
+if __name__ == '__main__':
+    main()
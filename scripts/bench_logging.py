@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Benchmark message logging: synchronous handlers vs the queued pipeline.
+
+Replays an `on_message`-style firehose on an asyncio loop while a monitor task
+measures event-loop lag. "before" is the old setup: a StreamHandler and a plain
+FileHandler, with every message logged at INFO on the loop. "after" is
+`log_pipeline.setup_logging()`, which uses a queue, a writer thread, sampling
+and redaction. `--disk-delay-ms` adds latency to every file write to simulate a
+slow or contended disk.
+
+    python scripts/bench_logging.py --messages 20000 --disk-delay-ms 0 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+from log_pipeline import setup_logging
+
+COMMAND_SHARE = 0.1  # fraction of messages that are bot commands
+
+
+class _SlowDisk(logging.Filter):
+    def __init__(self, delay_s):
+        super().__init__()
+        self.delay_s = delay_s
+
+    def filter(self, record):
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        return True
+
+
+def _before(name, path, devnull, delay_s):
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    fmt = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    ch = logging.StreamHandler(devnull)
+    ch.setLevel(logging.INFO)
+    ch.setFormatter(fmt)
+    fh = logging.FileHandler(path, encoding='utf-8')
+    fh.setFormatter(fmt)
+    fh.addFilter(_SlowDisk(delay_s))
+    logger.handlers[:] = [ch, fh]
+
+    def log(i, content, is_command):
+        logger.info(f"message to bot: author=user#{i % 50} channel=general content={content}")
+    return log, lambda: fh.close()
+
+
+def _after(name, path, devnull, delay_s, sample_rate):
+    stderr, sys.stderr = sys.stderr, devnull
+    try:
+        listener = setup_logging(name=name, log_file=path)
+    finally:
+        sys.stderr = stderr
+    for handler in listener.handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.addFilter(_SlowDisk(delay_s))
+    logger = logging.getLogger(name)
+
+    def log(i, content, is_command):
+        logger.log(
+            logging.INFO if is_command else logging.DEBUG, "message to bot",
+            extra={'author': f"user#{i % 50}", 'channel': 'general', 'content': content,
+                   'sample_rate': 1.0 if is_command else sample_rate},
+        )
+    return log, listener.stop
+
+
+async def _run(log, messages, burst):
+    lags = []
+    done = False
+
+    async def monitor():
+        interval = 0.005
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    task = asyncio.create_task(monitor())
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    for i in range(messages):
+        is_command = (i % int(1 / COMMAND_SHARE)) == 0
+        content = "!schedule today" if is_command else f"hey <@1234567890> see https://example.com/x?{i} mail me a{i}@b.com"
+        log(i, content, is_command)
+        if i % burst == burst - 1:
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    done = True
+    await task
+    return elapsed, sorted(lags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--burst', type=int, default=50, help='Messages logged between loop yields')
+    parser.add_argument('--disk-delay-ms', type=float, nargs='+', default=[0.0, 0.2])
+    parser.add_argument('--sample-rate', type=float, default=0.1, help='Sampling for non-command messages (after)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+        for delay_ms in args.disk_delay_ms:
+            for mode in ('before', 'after'):
+                path = os.path.join(tmp, f"{mode}-{delay_ms}.log")
+                name = f"bench.{mode}.{delay_ms}"
+                if mode == 'before':
+                    log, close = _before(name, path, devnull, delay_ms / 1000)
+                else:
+                    log, close = _after(name, path, devnull, delay_ms / 1000, args.sample_rate)
+                elapsed, lags = asyncio.run(_run(log, args.messages, args.burst))
+                drain_started = time.perf_counter()
+                close()
+                drain = time.perf_counter() - drain_started
+                size = os.path.getsize(path)
+                p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))] if lags else 0.0
+                print(f"[disk +{delay_ms} ms] {mode:6} {args.messages / elapsed:10,.0f} msg/s on loop  "
+                      f"loop lag p50={statistics.median(lags or [0]) * 1e3:6.2f} ms p99={p99 * 1e3:7.2f} ms "
+                      f"max={(lags[-1] if lags else 0) * 1e3:7.2f} ms  drain={drain * 1e3:7.1f} ms  file={size / 1024:,.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
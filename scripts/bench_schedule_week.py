@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark `!schedule week` data access: seven per-day ilike queries vs one query.
+
+Runs both strategies against a throwaway SQLite database, optionally adding a fixed
+delay to every statement to simulate a remote PostgreSQL round trip.
+
+    python scripts/bench_schedule_week.py --latency-ms 0 25 --copies 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Schedule as ScheduleModel
+from utils import load_main_schedule_from_file, apply_temp_changes_to_db_rows, get_week_key
+
+DAYS = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+
+
+def build_db(path, copies):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    data = load_main_schedule_from_file(os.path.join(PROJECT_ROOT, 'main.json'))
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    for n in range(copies):
+        for group, days in data.items():
+            if not isinstance(days, dict):
+                continue
+            for day, entries in days.items():
+                if not isinstance(entries, list):
+                    continue
+                for e in entries:
+                    db.add(ScheduleModel(day=day, time=e.get('time'), subject=e.get('subject'),
+                                         group_name=f"{group}{n or ''}", room=e.get('room', ''),
+                                         instructor=e.get('instructor', ''), note=e.get('note', '')))
+    db.commit()
+    db.close()
+    return engine
+
+
+def per_day(Session, week_key):
+    db = Session()
+    try:
+        out = {}
+        for d in DAYS:
+            rows = db.query(ScheduleModel).filter(ScheduleModel.day.ilike(d)).all()
+            out[d] = apply_temp_changes_to_db_rows(rows, week_key)
+        return out
+    finally:
+        db.close()
+
+
+def single_query(Session, week_key):
+    db = Session()
+    try:
+        rows = db.query(ScheduleModel).all()
+    finally:
+        db.close()
+    out = {}
+    for e in apply_temp_changes_to_db_rows(rows, week_key, days=DAYS):
+        out.setdefault(e['day'], []).append(e)
+    return out
+
+
+def measure(fn, Session, week_key, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(Session, week_key)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, nargs='+', default=[0.0, 25.0],
+                        help='Simulated per-statement latency values to test')
+    parser.add_argument('--copies', type=int, default=1, help='Replicate main.json groups N times')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_db(os.path.join(tmp, 'bench.db'), args.copies)
+        Session = sessionmaker(bind=engine)
+        week_key = get_week_key()
+        delay = {'s': 0.0}
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _simulate_latency(*_):
+            if delay['s']:
+                time.sleep(delay['s'])
+
+        print(f"{'latency':>8} {'strategy':>12} {'median ms':>10} {'max ms':>8}")
+        for latency in args.latency_ms:
+            delay['s'] = latency / 1000.0
+            for name, fn in (('per-day x7', per_day), ('single', single_query)):
+                med, worst = measure(fn, Session, week_key, args.runs)
+                print(f"{latency:>8.1f} {name:>12} {med:>10.2f} {worst:>8.2f}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
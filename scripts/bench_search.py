@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark `!search` on a synthetic corpus of notes, materials and assignments.
+
+Builds the in-memory index behind `!search` from generated rows (no database),
+then reports build time, query latency percentiles for exact and prefix queries,
+and the cost of incremental adds and deletes.
+
+    python scripts/bench_search.py --rows 100000 --queries 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+from retrieval import ContextBuilder
+
+SUBJECTS = [
+    "Control System", "Microprocessor", "Advanced Electronics", "Computer Graphics", "Math III",
+    "English", "Numerical Methods", "Electromagnetics", "Data Structures", "Signal Analysis",
+]
+TOPICS = [
+    "chapter", "lab report", "tutorial", "problem set", "project", "viva", "practical", "sheet",
+    "derivation", "numericals", "case study", "presentation", "revision", "past questions",
+]
+QUERIES = ["micro lab", "control chapter", "graph", "math tut", "electro", "signal project report", "viva"]
+
+
+def synthetic_rows(n, seed=1):
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    for i in range(n):
+        subject = rng.choice(SUBJECTS)
+        kind = rng.choice(('assignment', 'note', 'material'))
+        if kind == 'assignment':
+            topic = f"{rng.choice(TOPICS)} {rng.randint(1, 40)}"
+            yield kind, i, (subject, topic, start + timedelta(days=rng.randint(0, 365)))
+        else:
+            yield kind, i, (subject, f"https://drive.example.com/{subject.split()[0].lower()}/{i:06x}")
+
+
+def add(builder, kind, row_id, fields):
+    getattr(builder, f"add_{kind}")(row_id, *fields)
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    builder = ContextBuilder()
+    rows = list(synthetic_rows(args.rows))
+    started = time.perf_counter()
+    for kind, row_id, fields in rows:
+        add(builder, kind, row_id, fields)
+    build = time.perf_counter() - started
+    print(f"built index over {len(builder.index)} rows ({builder.index.term_count} terms) in {build:.2f} s")
+
+    for query in QUERIES:
+        samples = []
+        for _ in range(max(1, args.queries // len(QUERIES))):
+            t0 = time.perf_counter()
+            results = builder.search(query)
+            samples.append(time.perf_counter() - t0)
+        print(f"  {query!r:26} hits={len(results):2} p50={pct(samples, 0.5) * 1e3:7.3f} ms "
+              f"p99={pct(samples, 0.99) * 1e3:7.3f} ms mean={statistics.fmean(samples) * 1e3:7.3f} ms")
+
+    extra = list(synthetic_rows(1000, seed=2))
+    t0 = time.perf_counter()
+    for kind, row_id, fields in extra:
+        add(builder, kind, args.rows + row_id, fields)
+    t1 = time.perf_counter()
+    for kind, row_id, _ in extra:
+        builder.remove(kind, args.rows + row_id)
+    t2 = time.perf_counter()
+    print(f"incremental: add {(t1 - t0) / len(extra) * 1e6:.1f} us/row, delete {(t2 - t1) / len(extra) * 1e6:.1f} us/row")
+
+
+if __name__ == '__main__':
+    main()
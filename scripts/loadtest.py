@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""End-to-end load test: replay command traffic through the real bot without Discord.
+
+The bot is built with `main.create_bot()` and all cogs are loaded. It runs
+against a throwaway SQLite database seeded from main.json, and against a local
+Mistral stand-in that runs on its own thread so it does not add event-loop lag.
+Discord itself is stubbed:
+  * a fake bot user
+  * message, author and channel objects
+  * a Context whose `send()` waits `--send-ms` (the API round trip) and records the message
+
+Commands arrive at random (Poisson) intervals averaging `--rate` per second, for
+`--duration` seconds. Each one goes through the bot's `on_message` handler, so
+logging, metrics and profiling all run. The report gives:
+  * throughput
+  * p50/p95/p99 latency to the first reply and to command completion, per command
+  * event-loop lag
+  * database queries per command
+
+    python scripts/loadtest.py --rate 30 --duration 20 --users 300 --channels 8
+    python scripts/loadtest.py --mix "schedule today=50,ask=30,assignment list=20"
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+# Must be set before the bot's modules read them at import time
+WORKDIR = tempfile.mkdtemp(prefix='loadtest-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'loadtest.db')}"
+os.environ.setdefault('LOG_FILE', os.path.join(WORKDIR, 'bot.log'))
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('MISTRAL_API_KEY', 'standin')
+
+from discord.ext import commands
+import main as bot_main
+import mistral_standin
+import utils
+from configuration import config
+from database.database import get_db, init_db, instrument, run_blocking, run_db
+from database.models import Assignment
+from metrics import METRICS
+from retrieval import CONTEXT
+
+SUBJECTS = ["Microprocessor", "Control System", "Numerical Methods", "English", "Electromagnetics", "Math III"]
+QUESTIONS = [
+    "what's next for GroupA", "is there class tomorrow", "where is Microprocessor lab",
+    "classes on friday for GroupB", "when is the control system assignment due",
+    "summarize the microprocessor notes", "which exams are coming up",
+]
+SEND_LATENCY = 0.06  # seconds; set from --send-ms
+
+# name -> (weight, command text generator)
+MIX = {
+    'schedule today': (30, lambda rng, n: "!schedule today"),
+    'schedule tomorrow': (10, lambda rng, n: "!schedule tomorrow"),
+    'schedule week': (10, lambda rng, n: "!schedule week"),
+    # Some questions repeat (cache hits), the numbered ones never do
+    'ask': (15, lambda rng, n: f"!ask {rng.choice(QUESTIONS)}" + (f" #{n}" if rng.random() < 0.5 else "")),
+    'assignment list': (20, lambda rng, n: "!assignment list" + rng.choice(["", "", f" {rng.choice(SUBJECTS)}", " upcoming"])),
+    'assignment add': (5, lambda rng, n: f'!assignment add Subject="{rng.choice(SUBJECTS)}" Topic="Load test {n}" '
+                                         f'Due="{date.today() + timedelta(days=rng.randint(1, 60))}"'),
+    'search': (10, lambda rng, n: f"!search {rng.choice(SUBJECTS).split()[0][:5].lower()} {rng.choice(['lab', 'chapter', ''])}".strip()),
+}
+
+
+class StubUser:
+    def __init__(self, user_id, name, bot=False):
+        self.id = user_id
+        self.name = self.display_name = name
+        self.bot = bot
+        self.roles = []
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class StubChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.name = f"class-{channel_id}"
+        self.guild = None
+
+
+class StubMessage:
+    _ids = itertools.count(1)
+
+    def __init__(self, state, author, channel, content):
+        self.id = next(self._ids)
+        self._state = state
+        self.author = author
+        self.channel = channel
+        self.guild = None
+        self.content = content
+        self.webhook_id = None
+        self.attachments = []
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        await asyncio.sleep(SEND_LATENCY)
+        self.edits += 1
+        if 'content' in kwargs:
+            self.content = kwargs['content']
+        return self
+
+
+class RecordingContext(commands.Context):
+    """A Context whose replies are recorded instead of sent to Discord."""
+
+    async def send(self, content=None, **kwargs):
+        await asyncio.sleep(SEND_LATENCY)
+        if getattr(self.message, 'first_reply', None) is None:
+            self.message.first_reply = time.perf_counter()
+        self.message.replies = getattr(self.message, 'replies', 0) + 1
+        return StubMessage(self._state, self.bot.user, self.channel, content or '')
+
+
+def start_standin(delay_ms, token_delay_ms):
+    """Run the Mistral stand-in on its own thread and event loop; returns (url, stats)."""
+    ready = concurrent.futures.Future()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        app = mistral_standin.create_app(delay_ms=delay_ms, token_delay_ms=token_delay_ms, seed=1)
+        _, base = loop.run_until_complete(mistral_standin.start(app))
+        ready.set_result((f"{base}/v1/chat/completions", app['stats']))
+        loop.run_forever()
+
+    threading.Thread(target=run, name='mistral-standin', daemon=True).start()
+    return ready.result(timeout=10)
+
+
+def seed_database(assignments, rng):
+    init_db()
+    bot_main.auto_import_schedule(override=False)
+    utils.load_persisted_temp_changes()
+    db = get_db()
+    try:
+        for i in range(assignments):
+            db.add(Assignment(subject=rng.choice(SUBJECTS), topic=f"Seed topic {i}",
+                              due_date=date.today() + timedelta(days=rng.randint(-10, 90))))
+        db.commit()
+    finally:
+        db.close()
+
+
+def parse_mix(text):
+    if not text:
+        return {name: weight for name, (weight, _) in MIX.items()}
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in MIX:
+            raise SystemExit(f"Unknown command in --mix: {name!r} (choose from {', '.join(MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def db_queries():
+    return sum(v['count'] for name, v in METRICS.snapshot().items() if name.startswith('db_query_seconds{'))
+
+
+def pct(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else float('nan')
+
+
+async def run(args):
+    global SEND_LATENCY
+    SEND_LATENCY = args.send_ms / 1000
+    rng = random.Random(args.seed)
+
+    if args.mistral_url:
+        config.MISTRAL_API_URL, standin_stats = args.mistral_url, None
+    else:
+        config.MISTRAL_API_URL, standin_stats = start_standin(args.llm_ms, args.token_ms)
+
+    instrument(METRICS)
+    await run_blocking(seed_database, args.assignments, rng, timeout=300)
+    await run_db(CONTEXT.load)
+
+    bot = bot_main.create_bot()
+    bot_main.bot = bot
+    # Entering the client sets up its loop, as main() does before connecting
+    async with bot:
+        bot._connection.user = StubUser(1, 'ClassBot', bot=True)
+        bot.get_context = lambda message, *, cls=RecordingContext, _get=bot.get_context: _get(message, cls=cls)
+        await bot_main.load_extensions(bot)
+
+        users = [StubUser(1000 + i, f"student{i}") for i in range(args.users)]
+        channels = [StubChannel(100 + i) for i in range(args.channels)]
+        mix = parse_mix(args.mix)
+        names, weights = list(mix), list(mix.values())
+        counter = itertools.count()
+
+        results = {name: {'latency': [], 'first': [], 'errors': 0, 'silent': 0} for name in names}
+        lags = []
+        running = True
+
+        async def monitor():
+            while running:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        async def one(name):
+            message = StubMessage(bot._connection, rng.choice(users), rng.choice(channels),
+                                  MIX[name][1](rng, next(counter)))
+            message.first_reply = None
+            started = time.perf_counter()
+            try:
+                await bot.on_message(message)
+            except Exception:
+                results[name]['errors'] += 1
+                return
+            r = results[name]
+            r['latency'].append(time.perf_counter() - started)
+            if message.first_reply is None:
+                r['silent'] += 1
+            else:
+                r['first'].append(message.first_reply - started)
+
+        queries_before = db_queries()
+        lag_task = asyncio.create_task(monitor())
+        tasks = set()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        next_at = started
+        while True:
+            next_at += rng.expovariate(args.rate)
+            if next_at >= deadline:
+                break
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            task = asyncio.create_task(one(rng.choices(names, weights)[0]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        sent_for = time.perf_counter() - started
+        if tasks:
+            await asyncio.wait(tasks, timeout=args.drain)
+        elapsed = time.perf_counter() - started
+        running = False
+        await lag_task
+        queries = db_queries() - queries_before
+
+    total = sum(len(r['latency']) for r in results.values())
+    print(f"\n{total} commands completed in {elapsed:.1f}s (sent over {sent_for:.1f}s at a target of {args.rate}/s), "
+          f"{total / elapsed:.1f} commands/s; {len(tasks)} still running")
+    print(f"\n{'command':18} {'n':>5} {'err':>4} {'silent':>6}  {'first reply p50/p95/p99 (ms)':>30}  {'complete p50/p95/p99 (ms)':>28}")
+    for name, r in results.items():
+        first = "/".join(f"{pct(r['first'], q) * 1000:.0f}" for q in (0.5, 0.95, 0.99))
+        done = "/".join(f"{pct(r['latency'], q) * 1000:.0f}" for q in (0.5, 0.95, 0.99))
+        print(f"{name:18} {len(r['latency']):5} {r['errors']:4} {r['silent']:6}  {first:>30}  {done:>28}")
+    everything = [x for r in results.values() for x in r['latency']]
+    print(f"{'all':18} {len(everything):5}  complete p50={pct(everything, 0.5) * 1000:.0f} ms "
+          f"p95={pct(everything, 0.95) * 1000:.0f} ms p99={pct(everything, 0.99) * 1000:.0f} ms")
+    print(f"\nevent-loop lag: p50={statistics.median(lags) * 1000:.2f} ms p99={pct(lags, 0.99) * 1000:.2f} ms "
+          f"max={max(lags) * 1000:.1f} ms")
+    print(f"database: {queries} queries, {queries / total if total else 0:.2f} per command")
+    if standin_stats is not None:
+        print(f"mistral stand-in: {standin_stats['requests']} requests over {len(standin_stats['connections'])} connection(s)")
+    print(f"bot log: {os.environ['LOG_FILE']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=float, default=20.0, help='Commands per second (Poisson arrivals)')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds to send traffic for')
+    parser.add_argument('--drain', type=float, default=60.0, help='Seconds to wait for in-flight commands afterwards')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--channels', type=int, default=8)
+    parser.add_argument('--mix', help='Command weights, e.g. "schedule today=50,ask=20" (default: a class-morning mix)')
+    parser.add_argument('--assignments', type=int, default=300, help='Assignments seeded into the database')
+    parser.add_argument('--send-ms', type=float, default=60.0, help='Simulated Discord API latency per message')
+    parser.add_argument('--llm-ms', type=float, default=300.0, help='Stand-in Mistral latency before answering')
+    parser.add_argument('--token-ms', type=float, default=20.0, help='Stand-in delay between streamed tokens')
+    parser.add_argument('--mistral-url', help='Use this chat-completions URL instead of starting a stand-in')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
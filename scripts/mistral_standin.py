@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Mistral chat-completions API.
+
+Serves `POST /v1/chat/completions` with a canned answer (as a server-sent event
+stream when the request sets `"stream": true`) and counts requests and distinct
+TCP connections at `GET /stats`, so connection reuse and streaming can be checked
+without touching the real API.
+
+    python scripts/mistral_standin.py --port 8089
+    MISTRAL_API_URL=http://127.0.0.1:8089/v1/chat/completions MISTRAL_API_KEY=x python src/main.py
+
+`--selftest N` starts the server in-process, sends N requests through
+`MistralClient`, reports how many connections were opened, then streams one
+answer and reports its time to first token.
+
+Faults can be injected: `--fail-rate` answers that fraction of requests with
+HTTP 503 and `--slow-rate` delays that fraction by an extra `--slow-ms`.
+`--chaostest N` sends N requests through `MistralClient` against such a server
+and reports success rate, latency percentiles, retries, hedges and the circuit
+breaker state.
+
+    python scripts/mistral_standin.py --chaostest 200 --fail-rate 0.1 --slow-rate 0.05 --slow-ms 3000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+from aiohttp import web
+
+
+def create_app(delay_ms=0.0, token_delay_ms=50.0, answer="This is a stand-in answer.",
+               fail_rate=0.0, slow_rate=0.0, slow_ms=0.0, seed=None):
+    stats = {'requests': 0, 'connections': set(), 'failed': 0, 'slowed': 0}
+    rng = random.Random(seed)
+
+    async def stream_answer(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for i, word in enumerate(answer.split(' ')):
+            delta = word if i == 0 else ' ' + word
+            chunk = {"choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            if token_delay_ms:
+                await asyncio.sleep(token_delay_ms / 1000.0)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def completions(request):
+        stats['requests'] += 1
+        stats['connections'].add(id(request.transport))
+        body = await request.json()
+        if delay_ms:
+            await asyncio.sleep(delay_ms / 1000.0)
+        if rng.random() < slow_rate:
+            stats['slowed'] += 1
+            await asyncio.sleep(slow_ms / 1000.0)
+        if rng.random() < fail_rate:
+            stats['failed'] += 1
+            return web.json_response({"error": "injected failure"}, status=503)
+        if body.get('stream'):
+            return await stream_answer(request)
+        return web.json_response({
+            "id": f"standin-{stats['requests']}",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        })
+
+    async def get_stats(request):
+        return web.json_response({
+            'requests': stats['requests'], 'connections': len(stats['connections']),
+            'failed': stats['failed'], 'slowed': stats['slowed'],
+        })
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_post('/v1/chat/completions', completions)
+    app.router.add_get('/stats', get_stats)
+    return app
+
+
+async def start(app, host='127.0.0.1', port=0):
+    """Start `app` and return (runner, base_url)."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://{host}:{bound}"
+
+
+async def selftest(n, delay_ms, token_delay_ms):
+    from mistral_client import MistralClient
+
+    app = create_app(delay_ms=delay_ms, token_delay_ms=token_delay_ms)
+    runner, base = await start(app)
+    client = MistralClient(api_key='standin', url=f"{base}/v1/chat/completions")
+    try:
+        for _ in range(n):
+            assert await client.ask("ping") is not None
+        started = time.monotonic()
+        ttfb = None
+        text = ""
+        async for delta in client.stream("ping"):
+            if ttfb is None:
+                ttfb = time.monotonic() - started
+            text += delta
+        total = time.monotonic() - started
+    finally:
+        await client.close()
+        await runner.cleanup()
+    stats = app['stats']
+    print(f"requests={stats['requests']} connections={len(stats['connections'])}")
+    print(f"stream: ttfb={ttfb * 1000:.1f} ms total={total * 1000:.1f} ms text={text!r}")
+    return len(stats['connections']) == 1 and text == "This is a stand-in answer."
+
+
+async def chaostest(n, delay_ms, fail_rate, slow_rate, slow_ms, attempt_timeout):
+    from metrics import METRICS
+    from mistral_client import MistralClient
+
+    app = create_app(delay_ms=delay_ms, fail_rate=fail_rate, slow_rate=slow_rate, slow_ms=slow_ms, seed=1)
+    runner, base = await start(app)
+    client = MistralClient(api_key='standin', url=f"{base}/v1/chat/completions", attempt_timeout=attempt_timeout)
+    latencies = []
+    answered = 0
+    try:
+        for _ in range(n):
+            started = time.monotonic()
+            answered += await client.ask("ping") is not None
+            latencies.append(time.monotonic() - started)
+    finally:
+        await client.close()
+        await runner.cleanup()
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    metrics = METRICS.snapshot()
+    stats = app['stats']
+    print(f"answered={answered}/{n} server: requests={stats['requests']} failed={stats['failed']} slowed={stats['slowed']}")
+    print(f"latency: p50={pct(0.5):.1f} ms p95={pct(0.95):.1f} ms p99={pct(0.99):.1f} ms max={latencies[-1] * 1000:.1f} ms")
+    print(f"retries={metrics['mistral_retries']} hedges={metrics['mistral_hedges']} "
+          f"hedge_wins={metrics['mistral_hedge_wins']} circuit={client.breaker.state} "
+          f"circuit_rejected={metrics['mistral_circuit_rejected']}")
+    return answered > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='Latency added to every completion')
+    parser.add_argument('--token-delay-ms', type=float, default=50.0, help='Delay between streamed tokens')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 503')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='Fraction of requests delayed by --slow-ms')
+    parser.add_argument('--slow-ms', type=float, default=3000.0, help='Extra latency for slowed requests')
+    parser.add_argument('--attempt-timeout', type=float, default=None, help='Client per-attempt deadline (chaostest)')
+    parser.add_argument('--selftest', type=int, metavar='N', help='Send N sequential requests and check reuse')
+    parser.add_argument('--chaostest', type=int, metavar='N', help='Send N requests against injected faults')
+    args = parser.parse_args()
+
+    if args.selftest:
+        sys.exit(0 if asyncio.run(selftest(args.selftest, args.delay_ms, args.token_delay_ms)) else 1)
+    if args.chaostest:
+        ok = asyncio.run(chaostest(args.chaostest, args.delay_ms, args.fail_rate, args.slow_rate, args.slow_ms,
+                                   args.attempt_timeout))
+        sys.exit(0 if ok else 1)
+    app = create_app(delay_ms=args.delay_ms, token_delay_ms=args.token_delay_ms, fail_rate=args.fail_rate,
+                     slow_rate=args.slow_rate, slow_ms=args.slow_ms)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
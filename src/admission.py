@@ -0,0 +1,127 @@
+"""Admission control for expensive commands: concurrency limit, bounded queue and
+per-user / per-channel token buckets.
+
+Requests that would exceed a rate limit, find the queue full, or wait longer than
+`max_wait` for a slot are rejected immediately with `Overloaded`, which carries a
+retry-after estimate for a fast "busy, try again" reply. Tokens are only spent by
+admitted requests; a rejection refunds whatever it took.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from metrics import METRICS
+
+
+class Overloaded(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason}: retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, n=1):
+        """Take `n` tokens. Returns 0 on success, else the seconds until they are available."""
+        self._refill()
+        if self._tokens >= n:
+            self._tokens -= n
+            return 0.0
+        return (n - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def refund(self, n=1):
+        self._tokens = min(self.capacity, self._tokens + n)
+
+    @property
+    def full(self):
+        self._refill()
+        return self._tokens >= self.capacity
+
+
+class AdmissionController:
+    def __init__(self, name, concurrency=4, max_queue=20, max_wait=5.0,
+                 user_rate=0.05, user_burst=3, channel_rate=0.5, channel_burst=10, max_buckets=1000):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._user_limits = (user_rate, user_burst)
+        self._channel_limits = (channel_rate, channel_burst)
+        self._max_buckets = max_buckets
+        self._user_buckets = {}
+        self._channel_buckets = {}
+        self._sem = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+        self._avg_service = 1.0  # EWMA of service time, for retry-after estimates
+        self.queue_depth = METRICS.gauge(f"{name}_queue_depth", f"{name} requests waiting for a slot")
+        self.in_flight = METRICS.gauge(f"{name}_in_flight", f"{name} requests being served")
+        self.queue_wait = METRICS.histogram(f"{name}_queue_wait_seconds", f"{name} time spent waiting for a slot")
+        self.rejected = {
+            reason: METRICS.counter(f"{name}_rejected_{reason}", f"{name} requests rejected ({reason})")
+            for reason in ('user', 'channel', 'queue', 'timeout')
+        }
+
+    def _bucket(self, buckets, key, limits):
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self._max_buckets:
+                # Drop buckets that have refilled completely; they carry no state
+                for k in [k for k, b in buckets.items() if b.full]:
+                    del buckets[k]
+            bucket = buckets[key] = TokenBucket(*limits)
+        return bucket
+
+    def _reject(self, reason, retry_after):
+        self.rejected[reason].inc()
+        raise Overloaded(reason, retry_after)
+
+    @asynccontextmanager
+    async def admit(self, user_id, channel_id):
+        user_bucket = self._bucket(self._user_buckets, user_id, self._user_limits)
+        wait = user_bucket.try_acquire()
+        if wait:
+            self._reject('user', wait)
+        channel_bucket = self._bucket(self._channel_buckets, channel_id, self._channel_limits)
+        wait = channel_bucket.try_acquire()
+        if wait:
+            user_bucket.refund()
+            self._reject('channel', wait)
+        if self._waiting >= self.max_queue:
+            # Not admitted, so the caller is not charged for the attempt
+            user_bucket.refund()
+            channel_bucket.refund()
+            self._reject('queue', self._avg_service * (self._waiting + 1) / self.concurrency)
+
+        self._waiting += 1
+        self.queue_depth.set(self._waiting)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._sem.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            user_bucket.refund()
+            channel_bucket.refund()
+            self._reject('timeout', self._avg_service)
+        finally:
+            self._waiting -= 1
+            self.queue_depth.set(self._waiting)
+        self.queue_wait.observe(time.monotonic() - started)
+
+        self.in_flight.inc()
+        served = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * (time.monotonic() - served)
+            self.in_flight.dec()
+            self._sem.release()
@@ -0,0 +1,53 @@
+"""Bounded LRU cache with per-entry TTL and hit/miss counters."""
+import time
+from collections import OrderedDict
+from metrics import METRICS, hit_ratio
+
+
+class TTLCache:
+    def __init__(self, name, max_entries=256, ttl=600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = METRICS.counter(f"{name}_cache_hits", f"{name} cache hits")
+        self.misses = METRICS.counter(f"{name}_cache_misses", f"{name} cache misses")
+        self.evictions = METRICS.counter(f"{name}_cache_evictions", f"{name} cache evictions (size or TTL)")
+        METRICS.gauge(f"{name}_cache_hit_ratio", f"{name} cache hit ratio", fn=hit_ratio(self.hits, self.misses))
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            self.misses.inc()
+            return None
+        expires_at, value = item
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.evictions.inc()
+            self.misses.inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits.inc()
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions.inc()
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits.value + self.misses.value
+        return {
+            'size': len(self._entries),
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'hit_ratio': round(self.hits.value / total, 3) if total else 0.0,
+        }
@@ -1,12 +1,82 @@
 import discord
+import hashlib
+import logging
+import math
+import re
+import time
 from discord.ext import commands
-from database.database import get_db
-from database.models import Assessment
-from mistral_client import ask_mistral
+from configuration import config
+import fastpath
+from dispatch import send
+from admission import AdmissionController, Overloaded
+from cache import TTLCache
+from database.database import run_blocking
+from mistral_client import MistralClient
+from retrieval import CONTEXT
+from schedule_index import SCHEDULE_INDEX
+
+logger = logging.getLogger('discord_bot')
+
+def _format_answer(text):
+    # Discord rejects messages over 2000 characters
+    return f"🤖 **AI Answer:**\n{text}"[:2000]
+
+def _normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+def _answer_key(question, context):
+    # The context hash changes whenever the rows retrieved for the question change,
+    # which invalidates answers built on stale data.
+    return (_normalize_question(question), hashlib.sha1(context.encode("utf-8")).hexdigest())
 
 class AI(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.mistral = MistralClient()
+        self.answers = TTLCache("ask", max_entries=config.ASK_CACHE_SIZE, ttl=config.ASK_CACHE_TTL)
+        self.admission = AdmissionController(
+            "ask",
+            concurrency=config.ASK_CONCURRENCY,
+            max_queue=config.ASK_MAX_QUEUE,
+            max_wait=config.ASK_MAX_WAIT,
+            user_rate=config.ASK_USER_PER_MINUTE / 60.0,
+            user_burst=config.ASK_USER_BURST,
+            channel_rate=config.ASK_CHANNEL_PER_MINUTE / 60.0,
+            channel_burst=config.ASK_CHANNEL_BURST,
+        )
+
+    async def cog_unload(self):
+        await self.mistral.close()
+
+    async def _stream_answer(self, ctx, question, context):
+        """Stream the answer into one message, editing it at most once per edit interval.
+
+        The message is sent when the first token arrives. Returns (message, text, complete);
+        text is empty if the stream failed before producing anything.
+        """
+        message = None
+        text = shown = ""
+        last_edit = 0.0
+        complete = False
+        try:
+            async for delta in self.mistral.stream(question, context):
+                text += delta
+                now = time.monotonic()
+                if message is None:
+                    message = await send(ctx, _format_answer(text), coalesce=False)
+                    shown, last_edit = text, now
+                elif now - last_edit >= config.MISTRAL_STREAM_EDIT_INTERVAL:
+                    await message.edit(content=_format_answer(text))
+                    shown, last_edit = text, now
+            complete = True
+        except Exception as e:
+            logger.warning(f"Mistral stream failed after {len(text)} chars: {e!r}")
+        if message is not None and not complete:
+            text += " … (answer cut off)"
+        if message is not None and text != shown:
+            await message.edit(content=_format_answer(text))
+        return message, text, complete
 
     #==============================================================================================================
     #===============================================>AI ASK<=======================================================
@@ -15,21 +85,44 @@ class AI(commands.Cog):
     async def ask(self, ctx, *, question: str = None):
         # Try local DB first
         if not question:
-            await ctx.send('Usage: `!ask <question>`')
+            await send(ctx, 'Usage: `!ask <question>`')
             return
-        db = get_db()
-        try:
-            exams = db.query(Assessment).order_by(Assessment.date).all()
-            context = "Upcoming exams: " + "; ".join([f"{e.subject} on {e.date}" for e in exams[:5]])
-        finally:
-            db.close()
+        # Plain schedule questions are answered exactly, without the LLM
+        direct = fastpath.answer(question)
+        if direct:
+            await send(ctx, f"📅 **From the schedule:**\n{direct}")
+            return
+        schedule = await run_blocking(SCHEDULE_INDEX.ensure_loaded)
+        context = CONTEXT.build(question, schedule)
 
-        # Try Mistral
-        ai_answer = await ask_mistral(question, context)
+        key = _answer_key(question, context)
+        ai_answer = self.answers.get(key)
+        message = None
+        complete = True
+        if ai_answer is None:
+            # Try Mistral; only cache misses count against the rate limits and concurrency slots
+            try:
+                async with self.admission.admit(ctx.author.id, ctx.channel.id):
+                    streamed = config.MISTRAL_STREAM and self.mistral.enabled
+                    if streamed:
+                        message, ai_answer, complete = await self._stream_answer(ctx, question, context)
+                    if not ai_answer:
+                        # Non-streaming fallback; after a failed stream it is a retry, so it goes
+                        # through the retry budget and is skipped while the circuit is open
+                        ai_answer = await self.mistral.ask(question, context, retry=streamed)
+                        complete = True
+            except Overloaded as e:
+                await send(ctx, f"⏳ I'm busy right now, try again in {math.ceil(e.retry_after)} s.")
+                return
+            if ai_answer and complete:
+                self.answers.put(key, ai_answer)
+            if message is not None:
+                # Already streamed into this message
+                return
         if ai_answer:
-            await ctx.send(f"🤖 **AI Answer:**\n{ai_answer}")
+            await send(ctx, _format_answer(ai_answer))
         else:
-            await ctx.send("I couldn't find an answer. Try asking the CR or teacher!")
+            await send(ctx, "I couldn't find an answer. Try asking the CR or teacher!")
 
 async def setup(bot):
     await bot.add_cog(AI(bot))
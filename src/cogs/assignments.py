@@ -1,27 +1,196 @@
 import discord
-import io
+import logging
+from datetime import date
 from discord.ext import commands
 import re
-from database.database import get_db
+from sqlalchemy import and_, or_
+from database.database import run_db
 from database.models import Assignment, Note, Material
+from database.parsing import parse_date
+from dispatch import send
+from retrieval import CONTEXT
 from utils import is_cr
 
+logger = logging.getLogger('discord_bot')
+
+def _add_assignment(db, subject, topic, due):
+    assignment = Assignment(subject=subject, topic=topic, due_date=due)
+    db.add(assignment)
+    db.commit()
+    CONTEXT.add_assignment(assignment.id, subject, topic, due)
+
+LIST_PAGE_SIZE = 10
+LIST_TIMEOUT = 180  # seconds a !assignment list session keeps its buttons and page cache
+LIST_TITLES = {'overdue': "Overdue Assignments", 'upcoming': "Upcoming Assignments"}
+
+def _assignment_page(db, after=None, subject=None, window=None, limit=LIST_PAGE_SIZE, today=None):
+    """One page of assignments ordered by (due_date, id), starting after the `after` cursor.
+
+    Keyset pagination: each page is a range scan on the (due_date, id) index (or
+    (subject, due_date, id) with a subject filter) instead of an OFFSET. Rows without
+    a due date come last, ordered by id; a cursor of (None, id) is in that phase.
+    `window` is 'overdue' or 'upcoming' relative to `today`. Returns up to `limit` + 1
+    rows so the caller can tell whether another page follows.
+    """
+    columns = (Assignment.id, Assignment.subject, Assignment.topic, Assignment.due_date)
+    base = db.query(*columns)
+    if subject:
+        base = base.filter(Assignment.subject == subject)
+    rows = []
+    if after is None or after[0] is not None:
+        dated = base.filter(Assignment.due_date.isnot(None))
+        today = today or date.today()
+        if window == 'overdue':
+            dated = dated.filter(Assignment.due_date < today)
+        elif window == 'upcoming':
+            dated = dated.filter(Assignment.due_date >= today)
+        if after is not None:
+            due, last_id = after
+            dated = dated.filter(or_(Assignment.due_date > due, and_(Assignment.due_date == due, Assignment.id > last_id)))
+        rows = dated.order_by(Assignment.due_date, Assignment.id).limit(limit + 1).all()
+        if len(rows) > limit or window is not None:
+            return [tuple(r) for r in rows]
+        after = None
+    # Second phase: undated assignments
+    undated = base.filter(Assignment.due_date.is_(None))
+    if after is not None:
+        undated = undated.filter(Assignment.id > after[1])
+    rows += undated.order_by(Assignment.id).limit(limit + 1 - len(rows)).all()
+    return [tuple(r) for r in rows]
+
+def _delete_assignment(db, index):
+    assignment = db.query(Assignment).filter(Assignment.id == index).first()
+    if not assignment:
+        return None
+    deleted = (assignment.topic, assignment.subject)
+    db.delete(assignment)
+    db.commit()
+    CONTEXT.remove('assignment', index)
+    return deleted
+
+def _note_links(db, subject):
+    return [n.link for n in db.query(Note).filter(Note.subject == subject).all()]
+
+def _all_materials(db):
+    return [(m.subject, m.drive_link) for m in db.query(Material).all()]
+
+def _add_material(db, subject, link):
+    material = Material(subject=subject, drive_link=link)
+    db.add(material)
+    db.commit()
+    CONTEXT.add_material(material.id, subject, link)
+
+def _delete_materials(db, subject, link):
+    # Note: This deletes ALL matching entries.
+    rows = db.query(Material).filter(
+        Material.subject == subject,
+        Material.drive_link == link
+    ).all()
+    ids = [row.id for row in rows]
+    for row in rows:
+        db.delete(row)
+    db.commit()
+    for row_id in ids:
+        CONTEXT.remove('material', row_id)
+    return len(rows)
+
+def _parse_list_filters(args):
+    """Split `!assignment list` arguments into (subject, window)."""
+    words = (args or '').split()
+    window = None
+    for w in ('overdue', 'upcoming'):
+        if w in (x.lower() for x in words):
+            window = w
+    subject = " ".join(x for x in words if x.lower() not in ('overdue', 'upcoming', 'all')).title() or None
+    return subject, window
+
+class AssignmentPager(discord.ui.View):
+    """Previous/Next buttons over keyset-paginated assignment pages.
+
+    Pages already seen are cached with the cursor they started from; a cached page
+    is refetched from that cursor if assignments were added or deleted meanwhile.
+    """
+
+    def __init__(self, cog, user_id, subject, window, first_page):
+        super().__init__(timeout=LIST_TIMEOUT)
+        self.cog = cog
+        self.user_id = user_id
+        self.subject = subject
+        self.window = window
+        self.pages = [(None, first_page, cog.list_version)]  # (start cursor, rows, version)
+        self.index = 0
+        self.message = None
+        self._sync_buttons()
+
+    def _has_next(self):
+        return len(self.pages[self.index][1]) > LIST_PAGE_SIZE
+
+    def _sync_buttons(self):
+        self.previous.disabled = self.index == 0
+        self.next.disabled = not self._has_next()
+
+    def render(self):
+        return self.cog.render_assignment_page(self.pages[self.index][1], self.index, self.subject, self.window)
+
+    async def _show(self, index, start):
+        cached = self.pages[index] if index < len(self.pages) else None
+        if cached is None or cached[2] != self.cog.list_version:
+            rows = await run_db(_assignment_page, start, self.subject, self.window)
+            cached = (start, rows, self.cog.list_version)
+            del self.pages[index:]
+            self.pages.append(cached)
+        self.index = index
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Run `!assignment list` to browse your own copy.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        await self._show(self.index - 1, self.pages[self.index - 1][0])
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.primary)
+    async def next(self, interaction, button):
+        last = self.pages[self.index][1][LIST_PAGE_SIZE - 1]
+        await self._show(self.index + 1, (last[3], last[0]))
+        self._sync_buttons()
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    async def on_timeout(self):
+        self.cog.list_sessions.pop(self.user_id, None)
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+SEARCH_RESULTS = 10
+SEARCH_ICONS = {'assignment': '📝', 'note': '📒', 'material': '📁'}
+
 class Assignments(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Bumped on add/delete so cached list pages are refetched
+        self.list_version = 0
+        self.list_sessions = {}  # user id -> AssignmentPager
 
     #==============================================================================================================
     #============================================>ASSIGNMENTS<=====================================================
     #==============================================================================================================
     @commands.group(invoke_without_command=True)
     async def assignment(self, ctx):
-        await ctx.send("Usage: `!assignment add/list/delete`")
+        await send(ctx, "Usage: `!assignment add/list/delete`")
 
-    @assignment.command()
-    async def add(self, ctx, *, args: str = None):
+    # Named apart from `materials add/delete`: methods with the same name would shadow each other
+    @assignment.command(name="add")
+    async def add_assignment(self, ctx, *, args: str = None):
         try:
             if not args:
-                await ctx.send('Usage: `!assignment add Subject="Math" Topic="Algebra" Due="2025-12-01"`')
+                await send(ctx, 'Usage: `!assignment add Subject="Math" Topic="Algebra" Due="2025-12-01"`')
                 return
             # Robust parsing with regex: Captures Key="Value" or Key='Value'
             matches = re.findall(r'(\w+)="([^\"]*)"|(\w+)=\'([^\']*)\'', args)
@@ -35,51 +204,58 @@ class Assignments(commands.Cog):
             topic = parts.get("Topic", "").strip()
             due = parts.get("Due", "").strip()
             
-            if not all([subject, topic, due]):
+            due_date = parse_date(due)
+            if not all([subject, topic, due_date]):
                 raise ValueError("Missing fields")
             
-            db = get_db()
-            try:
-                new_assignment = Assignment(subject=subject.title(), topic=topic, due_date=due)
-                db.add(new_assignment)
-                db.commit()
-                await ctx.send(f"Assignment added: **{topic}** for **{subject.title()}**, due **{due}**")
-            finally:
-                db.close()
+            await run_db(_add_assignment, subject.title(), topic, due_date)
+            self.list_version += 1
+            await send(ctx, f"Assignment added: **{topic}** for **{subject.title()}**, due **{due_date}**")
         except:
-            await ctx.send('Usage: `!assignment add Subject="Math" Topic="Algebra" Due="2025-12-01"`\n\n**Examples that now work:**\n- `Subject="Control system" Topic="Chapter 1" Due="2025-12-01"`\n- `Subject="Math" Topic="Algebra" Due="2025-12-01" `')
+            await send(ctx, 'Usage: `!assignment add Subject="Math" Topic="Algebra" Due="2025-12-01"`\n\n**Examples that now work:**\n- `Subject="Control system" Topic="Chapter 1" Due="2025-12-01"`\n- `Subject="Math" Topic="Algebra" Due="2025-12-01" `')
+
+    def render_assignment_page(self, rows, index, subject=None, window=None):
+        title = LIST_TITLES.get(window, "Pending Assignments")
+        if subject:
+            title += f" — {subject}"
+        msg = f"**{title}** (page {index + 1})\n"
+        for a_id, subj, topic, due_date in rows[:LIST_PAGE_SIZE]:
+            msg += f"{a_id}. **{subj}** - {topic} (Due: {due_date or 'no date'})\n"
+        return msg
 
     @assignment.command()
-    async def list(self, ctx):
-        db = get_db()
-        try:
-            assignments = db.query(Assignment).order_by(Assignment.due_date).all()
-            
-            if not assignments:
-                await ctx.send("No assignments pending.")
-                return
+    async def list(self, ctx, *, filters: str = None):
+        """List assignments, 10 per page. Optional filters: a subject, `overdue` or `upcoming`.
 
-            msg = "**Pending Assignments**\n"
-            for a in assignments:
-                msg += f"{a.id}. **{a.subject}** - {a.topic} (Due: {a.due_date})\n"
-            await ctx.send(msg)
-        finally:
-            db.close()
+        Usage: `!assignment list [Subject] [overdue|upcoming]`
+        """
+        subject, window = _parse_list_filters(filters)
+        rows = await run_db(_assignment_page, None, subject, window)
 
-    @assignment.command()
+        if not rows:
+            await send(ctx, "No assignments pending." if not (subject or window) else "No assignments match those filters.")
+            return
+
+        if len(rows) <= LIST_PAGE_SIZE:
+            await send(ctx, self.render_assignment_page(rows, 0, subject, window))
+            return
+        previous = self.list_sessions.pop(ctx.author.id, None)
+        if previous is not None:
+            previous.stop()
+        view = AssignmentPager(self, ctx.author.id, subject, window, rows)
+        view.message = await send(ctx, view.render(), view=view)
+        self.list_sessions[ctx.author.id] = view
+
+    @assignment.command(name="delete")
     @is_cr()
-    async def delete(self, ctx, index: int):
-        db = get_db()
-        try:
-            assignment = db.query(Assignment).filter(Assignment.id == index).first()
-            if assignment:
-                db.delete(assignment)
-                db.commit()
-                await ctx.send(f"Deleted assignment: {assignment.topic} ({assignment.subject})")
-            else:
-                await ctx.send("Assignment not found.")
-        finally:
-            db.close()
+    async def delete_assignment(self, ctx, index: int):
+        deleted = await run_db(_delete_assignment, index)
+        if deleted:
+            self.list_version += 1
+            topic, subject = deleted
+            await send(ctx, f"Deleted assignment: {topic} ({subject})")
+        else:
+            await send(ctx, "Assignment not found.")
 
     # NOTES (view-only) & MATERIALS (Similar structure)
     @commands.group(invoke_without_command=True)
@@ -89,77 +265,39 @@ class Assignments(commands.Cog):
         Usage: `!notes <Subject>`
         """
         if subject:
-            db = get_db()
-            try:
-                links = db.query(Note).filter(Note.subject == subject.title()).all()
-                if links:
-                    msg = f"**Study Notes for {subject.title()}**\n"
-                    for l in links:
-                        msg += f"• {l.link}\n"
-                    await ctx.send(msg)
-                else:
-                    await ctx.send(f"No notes found for **{subject.title()}**")
-            finally:
-                db.close()
+            links = await run_db(_note_links, subject.title())
+            if links:
+                msg = f"**Study Notes for {subject.title()}**\n"
+                for l in links:
+                    msg += f"• {l}\n"
+                await send(ctx, msg)
+            else:
+                await send(ctx, f"No notes found for **{subject.title()}**")
         else:
-            await ctx.send("Usage: `!notes <Subject>`")
+            await send(ctx, "Usage: `!notes <Subject>`")
 
     # MATERIALS (Google Drive)
     @commands.group(invoke_without_command=True)
     async def materials(self, ctx):
         if ctx.invoked_subcommand is None:
-            await ctx.send("Usage: `!materials [subject]/all/add/delete`\nNote: `add` and `delete` are CR-only commands.")
+            await send(ctx, "Usage: `!materials [subject]/all/add/delete`\nNote: `add` and `delete` are CR-only commands.")
 
     @materials.command()
     async def all(self, ctx):
-        db = get_db()
         try:
-            items = db.query(Material).all()
+            items = await run_db(_all_materials)
         except Exception:
-            db.close()
-            await ctx.send("❌ Failed to read materials from the database.")
+            await send(ctx, "❌ Failed to read materials from the database.")
             return
 
-        try:
-            if not items:
-                await ctx.send("No materials uploaded yet.")
-                return
-
-            header = "**All Google Drive Materials**\n"
-            # Build messages under Discord's 2000 char limit (leave some headroom)
-            max_len = 1900
-            current = header
-            for i in items:
-                line = f"• **{i.subject}**: {i.drive_link}\n"
-                if len(current) + len(line) > max_len:
-                    try:
-                        await ctx.send(current)
-                    except Exception:
-                        # fallback: send as file (use BytesIO)
-                        try:
-                            bio = io.BytesIO(current.encode('utf-8'))
-                            bio.seek(0)
-                            await ctx.send(file=discord.File(bio, filename='materials.txt'))
-                        except Exception:
-                            await ctx.send("❌ Failed to send materials list (message too large).")
-                            return
-                    current = header + line
-                else:
-                    current += line
-
-            # send remaining
-            try:
-                await ctx.send(current)
-            except Exception:
-                try:
-                    bio = io.BytesIO(current.encode('utf-8'))
-                    bio.seek(0)
-                    await ctx.send(file=discord.File(bio, filename='materials.txt'))
-                except Exception:
-                    await ctx.send("❌ Failed to send materials list.")
-        finally:
-            db.close()
+        if not items:
+            await send(ctx, "No materials uploaded yet.")
+            return
 
+        msg = "**All Google Drive Materials**\n"
+        for subject, drive_link in items:
+            msg += f"• **{subject}**: {drive_link}\n"
+        await send(ctx, msg, filename='materials.txt')
 
     @materials.command()
     @is_cr()
@@ -169,7 +307,7 @@ class Assignments(commands.Cog):
         Expected format: Subject="SubjectName" Link="https://drive.link/..."
         """
         if not args:
-            await ctx.send('Usage: `!materials add Subject="Math" Link="https://..."`')
+            await send(ctx, 'Usage: `!materials add Subject="Math" Link="https://..."`')
             return
         try:
             matches = re.findall(r'(\w+)="([^"]*)"|(\w+)=\'([^\']*)\'', args)
@@ -184,18 +322,12 @@ class Assignments(commands.Cog):
             if not subject or not link:
                 raise ValueError("Missing Subject or Link")
 
-            db = get_db()
-            try:
-                new_material = Material(subject=subject.title(), drive_link=link)
-                db.add(new_material)
-                db.commit()
-                await ctx.send(f"✅ Material added for **{subject.title()}**: {link}")
-            finally:
-                db.close()
+            await run_db(_add_material, subject.title(), link)
+            await send(ctx, f"✅ Material added for **{subject.title()}**: {link}")
         except ValueError as ve:
-            await ctx.send(f"❌ {ve}. Usage: `!materials add Subject=\"Math\" Link=\"https://...\"`")
+            await send(ctx, f"❌ {ve}. Usage: `!materials add Subject=\"Math\" Link=\"https://...\"`")
         except Exception:
-            await ctx.send("❌ Failed to add material. Ensure command format is correct.")
+            await send(ctx, "❌ Failed to add material. Ensure command format is correct.")
 
 
     @materials.command()
@@ -207,7 +339,7 @@ class Assignments(commands.Cog):
         """
         # If user didn't provide args, show usage instead of raising a framework error
         if not args:
-            await ctx.send('Usage: `!materials delete Subject="Math" Link="https://..."`')
+            await send(ctx, 'Usage: `!materials delete Subject="Math" Link="https://..."`')
             return
         try:
             matches = re.findall(r'(\w+)="([^"]*)"|(\w+)=\'([^\']*)\'', args)
@@ -222,28 +354,44 @@ class Assignments(commands.Cog):
             if not subject or not link:
                 raise ValueError("Missing Subject or Link")
 
-            db = get_db()
-            try:
-                # Find and delete
-                # Note: This deletes ALL matching entries.
-                rows = db.query(Material).filter(
-                    Material.subject == subject.title(),
-                    Material.drive_link == link
-                ).all()
-                
-                if rows:
-                    for row in rows:
-                        db.delete(row)
-                    db.commit()
-                    await ctx.send(f"✅ Material deleted for **{subject.title()}**")
-                else:
-                    await ctx.send("⚠️ No matching material found to delete.")
-            finally:
-                db.close()
+            deleted = await run_db(_delete_materials, subject.title(), link)
+            if deleted:
+                await send(ctx, f"✅ Material deleted for **{subject.title()}**")
+            else:
+                await send(ctx, "⚠️ No matching material found to delete.")
         except ValueError as ve:
-            await ctx.send(f"❌ {ve}. Usage: `!materials delete Subject=\"Math\" Link=\"https://...\"`")
+            await send(ctx, f"❌ {ve}. Usage: `!materials delete Subject=\"Math\" Link=\"https://...\"`")
         except Exception:
-            await ctx.send("❌ Failed to delete material. Ensure the format is correct and the material exists.")
+            await send(ctx, "❌ Failed to delete material. Ensure the format is correct and the material exists.")
+
+    #==============================================================================================================
+    #===============================================>SEARCH<=======================================================
+    #==============================================================================================================
+    @commands.command()
+    async def search(self, ctx, *, terms: str = None):
+        """Search notes, materials and assignments. Words may be prefixes, e.g. `!search micro lab`."""
+        if not terms:
+            await send(ctx, "Usage: `!search <terms>`")
+            return
+        if not CONTEXT.loaded:
+            if CONTEXT.load_error is None:
+                await send(ctx, "⏳ The search index is still loading, try again in a moment.")
+                return
+            # The startup load failed; retry it now rather than waiting forever
+            try:
+                await run_db(CONTEXT.load)
+            except Exception as e:
+                logger.error(f"Search index load failed: {e!r}")
+                await send(ctx, "❌ The search index couldn't be loaded, try again later.")
+                return
+        results = CONTEXT.search(terms, k=SEARCH_RESULTS)
+        if not results:
+            await send(ctx, f"No notes, materials or assignments match **{terms}**.")
+            return
+        msg = f"**Search results for \"{terms}\"**\n"
+        for _, _, kind, text in results:
+            msg += f"{SEARCH_ICONS[kind]} {text}\n"
+        await send(ctx, msg)
 
 async def setup(bot):
     await bot.add_cog(Assignments(bot))
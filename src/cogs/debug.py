@@ -0,0 +1,57 @@
+from discord.ext import commands
+from dispatch import send
+from profiling import PROFILER
+from utils import is_cr
+
+MAX_PROFILE_RUNS = 20
+
+class Debug(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    #==============================================================================================================
+    #==============================================>DEBUG<=========================================================
+    #==============================================================================================================
+    @commands.group(invoke_without_command=True, hidden=True)
+    @is_cr()
+    async def debug(self, ctx):
+        """Profiling status. Usage: `!debug profile <command> [n]` / `!debug slowest`"""
+        threshold = f"{PROFILER.threshold * 1000:.0f} ms" if PROFILER.enabled else "off"
+        armed = ", ".join(f"`{name}` ×{n}" for name, n in PROFILER.armed().items()) or "none"
+        await send(ctx, f"🔬 Slow-command profiling: {threshold}. Armed: {armed}. Profiles go to `{PROFILER.out_dir}`.\n"
+                        "Usage: `!debug profile <command> [n]` / `!debug slowest`")
+
+    @debug.command(name="profile")
+    @is_cr()
+    async def profile(self, ctx, *, spec: str = None):
+        """Profile the next n invocations of a command. Usage: `!debug profile <command> [n]`"""
+        words = (spec or "").split()
+        n = 1
+        if len(words) > 1 and words[-1].isdigit():
+            n = int(words.pop())
+        command = self.bot.get_command(" ".join(words)) if words else None
+        if command is None:
+            await send(ctx, "Usage: `!debug profile <command> [n]`, e.g. `!debug profile schedule week 3`")
+            return
+        n = max(1, min(n, MAX_PROFILE_RUNS))
+        PROFILER.arm(command.qualified_name, n)
+        await send(ctx, f"🔬 Profiling the next {n} run(s) of `!{command.qualified_name}`; profiles go to `{PROFILER.out_dir}`.")
+
+    @debug.command(name="slowest")
+    @is_cr()
+    async def slowest(self, ctx):
+        """The slowest command invocations since startup, with their argument shapes."""
+        records = PROFILER.slowest()
+        if not records:
+            await send(ctx, "No commands recorded yet.")
+            return
+        msg = "**🐢 Slowest commands**\n"
+        for r in records:
+            shapes = ", ".join(r['args'] + [f"{k}={v}" for k, v in r['kwargs'].items()])
+            status = " ❌" if r['failed'] else ""
+            profile = f" → `{r['profile']}`" if r['profile'] else ""
+            msg += f"`{r['seconds'] * 1000:8.1f} ms` `!{r['command']}`({shapes}){status} at {r['at']:%m-%d %H:%M:%S}{profile}\n"
+        await send(ctx, msg)
+
+async def setup(bot):
+    await bot.add_cog(Debug(bot))
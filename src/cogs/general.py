@@ -1,5 +1,6 @@
 import discord
 from discord.ext import commands
+from dispatch import send
 
 class General(commands.Cog):
     def __init__(self, bot):
@@ -31,7 +32,7 @@ class General(commands.Cog):
                 msg_lines.append(f"**{cog_name}:** {cmd_list}")
 
             msg_lines.append("\nType `!bothelp <category>` or `!bothelp <command>` for details. Example: `!bothelp schedule`")
-            await ctx.send("\n".join(msg_lines))
+            await send(ctx, "\n".join(msg_lines))
             return
 
         # Topic provided -> try to match a cog name first
@@ -54,7 +55,7 @@ class General(commands.Cog):
                         usage = f"!{cmd.qualified_name} {cmd.signature}".strip()
                         lines.append(f"`{usage}` - {cmd.help or ''}")
 
-                await ctx.send("\n".join(lines))
+                await send(ctx, "\n".join(lines))
                 return
 
         # Match a top-level command name
@@ -68,15 +69,15 @@ class General(commands.Cog):
                             continue
                         usage = f"!{sc.qualified_name} {sc.signature}".strip()
                         lines.append(f"• `{usage}` - {sc.help or ''}")
-                    await ctx.send("\n".join(lines))
+                    await send(ctx, "\n".join(lines))
                     return
                 else:
                     usage = f"!{cmd.qualified_name} {cmd.signature}".strip()
-                    await ctx.send(f"`{usage}` - {cmd.help or 'No description available.'}")
+                    await send(ctx, f"`{usage}` - {cmd.help or 'No description available.'}")
                     return
 
         # No match found
-        await ctx.send("I couldn't find that category or command. Try `!bothelp` to see categories.")
+        await send(ctx, "I couldn't find that category or command. Try `!bothelp` to see categories.")
 
 async def setup(bot):
     await bot.add_cog(General(bot))
@@ -1,40 +1,86 @@
 import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
-from database.database import get_db
-from database.models import Schedule as ScheduleModel
+from database.database import run_db, run_blocking
+from database.models import Schedule as ScheduleModel, ImportState
+from database.parsing import parse_weekday
+from schedule_index import SCHEDULE_INDEX
+from render_cache import RENDER_CACHE
+from temp_store import TEMP_STORE
+from dispatch import send
+from schedule_import import import_schedule, file_sha256, SOURCE_NAME
 from utils import (
     is_cr, get_week_key, load_main_schedule_from_file, save_main_schedule_to_file,
     apply_temp_replacement, apply_temp_cancellation, merge_schedule_for_week,
     apply_temp_changes_to_db_rows, _parse_edit_cancel_args, _normalize_time,
-    _normalize_subject, MAIN_SCHEDULE, TEMP_CHANGES
+    _normalize_subject, set_entry_interval, time_sort_key, MAIN_SCHEDULE, TEMP_CHANGES
 )
 import utils
 
+def _delete_schedule_rows(db, day, time, subject):
+    rows = db.query(ScheduleModel).filter(
+        ScheduleModel.day == day,
+        ScheduleModel.time == time,
+        ScheduleModel.subject == subject.title()
+    ).all()
+    deleted_ids = [row.id for row in rows]
+    for row in rows:
+        db.delete(row)
+    if deleted_ids:
+        # The table no longer matches the imported file; let the next import re-diff it
+        db.query(ImportState).filter(ImportState.name == SOURCE_NAME).delete()
+    db.commit()
+    return deleted_ids
+
 class Schedule(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    async def _send_long_message(self, ctx, content, max_length=2000):
-        """Split and send long messages that exceed Discord's 2000 character limit."""
-        if len(content) <= max_length:
-            await ctx.send(content)
-            return
-        
-        # Split by lines to avoid breaking in the middle of content
-        lines = content.split('\n')
-        current_msg = ""
-        
-        for line in lines:
-            if len(current_msg) + len(line) + 1 > max_length:
-                if current_msg:
-                    await ctx.send(current_msg)
-                current_msg = line + '\n'
-            else:
-                current_msg += line + '\n'
-        
-        if current_msg:
-            await ctx.send(current_msg)
+    async def _persist_temp_changes(self):
+        """Write queued temporary changes now, so an acknowledged edit survives a restart.
+
+        Returns a note for the reply when they could not be written.
+        """
+        await run_blocking(TEMP_STORE.flush)
+        if TEMP_STORE.pending:
+            return "\n⚠️ Not saved to the database yet; it will be retried, but is lost if the bot restarts first."
+        return ""
+
+    def _render_day(self, title, merged):
+        """Render merged entries of one day grouped by group name."""
+        msg = f"**{title}:**\n"
+        msg += "--------------------------------------------------------\n"
+
+        grouped = {}
+        for e in merged:
+            grp = e.get('group_name', 'General')
+            if grp not in grouped:
+                grouped[grp] = []
+            grouped[grp].append(e)
+
+        for grp, entries in grouped.items():
+            msg += f"**{grp}:**\n"
+            msg += "--------------------------------------------------------\n"
+            for e in sorted(entries, key=time_sort_key):
+                msg += self._format_schedule_entry(e) + "\n"
+        return msg
+
+    def _render_day_view(self, schedule, day_l, week_key):
+        rows = schedule.rows_for_day(day_l)
+        merged = apply_temp_changes_to_db_rows(rows, week_key, days=[day_l])
+        if not merged:
+            return f"No classes scheduled for **{day_l.capitalize()}**."
+        return self._render_day(day_l.capitalize(), merged)
+
+    async def _send_day_view(self, ctx, day_l):
+        schedule = await run_blocking(SCHEDULE_INDEX.ensure_loaded)
+        week_key = get_week_key()
+        cache_key = RENDER_CACHE.key('day', day_l, week_key, schedule.version)
+        text = RENDER_CACHE.get(cache_key)
+        if text is None:
+            text = self._render_day_view(schedule, day_l, week_key)
+            RENDER_CACHE.put(cache_key, text)
+        await send(ctx, text)
 
     def _format_schedule_entry(self, e):
         """Helper to format a single schedule entry."""
@@ -74,221 +120,82 @@ class Schedule(commands.Cog):
 
     @commands.group(invoke_without_command=True)
     async def schedule(self, ctx):
-        await ctx.send("Usage: `!schedule add/delete/today/week`")
+        await send(ctx, "Usage: `!schedule add/delete/today/week`")
 
     @schedule.command()
     async def today(self, ctx):
-        weekday = datetime.now().strftime("%A")
-        day_l = weekday.lower()
-        
-        db = get_db()
-        try:
-            rows = db.query(ScheduleModel).filter(ScheduleModel.day.ilike(day_l)).all()
-            
-            week_key = get_week_key()
-            merged = apply_temp_changes_to_db_rows(rows, week_key)
-
-            if not merged:
-                await ctx.send(f"No classes scheduled for **{weekday}**.")
-                return
-
-            msg = f"**{weekday}:**\n"
-            msg += "--------------------------------------------------------\n"
-            
-            grouped = {}
-            for e in merged:
-                grp = e.get('group_name', 'General')
-                if grp not in grouped:
-                    grouped[grp] = []
-                grouped[grp].append(e)
-            
-            for grp, entries in grouped.items():
-                msg += f"**{grp}:**\n"
-                msg += "--------------------------------------------------------\n"
-                for e in sorted(entries, key=lambda x: x['time']):
-                    msg += self._format_schedule_entry(e) + "\n"
-
-            await self._send_long_message(ctx, msg)
-        finally:
-            db.close()
+        await self._send_day_view(ctx, datetime.now().strftime("%A").lower())
 
     @schedule.command()
     async def tomorrow(self, ctx):
         tomorrow_date = datetime.now() + timedelta(days=1)
-        weekday = tomorrow_date.strftime("%A")
-        day_l = weekday.lower()
-        
-        db = get_db()
-        try:
-            rows = db.query(ScheduleModel).filter(ScheduleModel.day.ilike(day_l)).all()
-            
-            week_key = get_week_key()
-            merged = apply_temp_changes_to_db_rows(rows, week_key)
-
-            if not merged:
-                await ctx.send(f"No classes scheduled for **{weekday}**.")
-                return
-
-            msg = f"**{weekday}:**\n"
-            msg += "--------------------------------------------------------\n"
-            
-            grouped = {}
-            for e in merged:
-                grp = e.get('group_name', 'General')
-                if grp not in grouped:
-                    grouped[grp] = []
-                grouped[grp].append(e)
-            
-            for grp, entries in grouped.items():
-                msg += f"**{grp}:**\n"
-                msg += "--------------------------------------------------------\n"
-                for e in sorted(entries, key=lambda x: x['time']):
-                    msg += self._format_schedule_entry(e) + "\n"
-
-            await self._send_long_message(ctx, msg)
-        finally:
-            db.close()
+        await self._send_day_view(ctx, tomorrow_date.strftime("%A").lower())
 
     @schedule.command()
     async def day(self, ctx, day_name: str):
-        day_name = day_name.lower()
-        valid_days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        if day_name not in valid_days:
-            await ctx.send("Please provide a valid day of the week (e.g., monday, tuesday, etc.).")
+        day_name = parse_weekday(day_name)
+        if day_name is None:
+            await send(ctx, "Please provide a valid day of the week (e.g., monday, tuesday, etc.).")
             return
-        
-        db = get_db()
-        try:
-            rows = db.query(ScheduleModel).filter(ScheduleModel.day.ilike(day_name)).all()
-            
-            week_key = get_week_key()
-            merged = apply_temp_changes_to_db_rows(rows, week_key)
+        await self._send_day_view(ctx, day_name)
 
-            if not merged:
-                await ctx.send(f"No classes scheduled for **{day_name.capitalize()}**.")
-                return
+    def _render_week_view(self, schedule, week_key):
+        days = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
 
-            msg = f"**{day_name.capitalize()}:**\n"
-            msg += "--------------------------------------------------------\n"
-            
-            grouped = {}
-            for e in merged:
-                grp = e.get('group_name', 'General')
-                if grp not in grouped:
-                    grouped[grp] = []
-                grouped[grp].append(e)
-            
-            for grp, entries in grouped.items():
-                msg += f"**{grp}:**\n"
-                msg += "--------------------------------------------------------\n"
-                for e in sorted(entries, key=lambda x: x['time']):
-                    msg += self._format_schedule_entry(e) + "\n"
+        # One snapshot of the whole table, one overlay pass, then bucket by day
+        rows = schedule.all_rows()
+        by_day = {}
+        for e in apply_temp_changes_to_db_rows(rows, week_key, days=days):
+            by_day.setdefault(e['day'], []).append(e)
 
-            await self._send_long_message(ctx, msg)
-        finally:
-            db.close()
+        if not by_day:
+            return ["No schedule set yet."]
+        # One block per day; the dispatcher keeps days whole when packing messages
+        return [self._render_day(d.title(), by_day[d]) for d in days if by_day.get(d)]
 
     @schedule.command()
     async def week(self, ctx):
-        days = ["sunday", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]
+        schedule = await run_blocking(SCHEDULE_INDEX.ensure_loaded)
         week_key = get_week_key()
-        
-        db = get_db()
-        try:
-            msg = ""
-            any_entry = False
-            for d in days:
-                rows = db.query(ScheduleModel).filter(ScheduleModel.day.ilike(d)).all()
-                merged = apply_temp_changes_to_db_rows(rows, week_key)
-                if merged:
-                    any_entry = True
-                    day_msg = f"**{d.title()}:**\n"
-                    day_msg += "--------------------------------------------------------\n"
-                    
-                    grouped = {}
-                    for e in merged:
-                        grp = e.get('group_name', 'General')
-                        if grp not in grouped:
-                            grouped[grp] = []
-                        grouped[grp].append(e)
-                    
-                    for grp, entries in grouped.items():
-                        day_msg += f"**{grp}:**\n"
-                        day_msg += "--------------------------------------------------------\n"
-                        for e in sorted(entries, key=lambda x: x['time']):
-                            day_msg += self._format_schedule_entry(e) + "\n"
-                    
-                    if len(msg) + len(day_msg) > 1900:
-                        await self._send_long_message(ctx, msg)
-                        msg = day_msg
-                    else:
-                        msg += day_msg
-            
-            if not any_entry:
-                await ctx.send("No schedule set yet.")
-                return
-            
-            if msg:
-                await self._send_long_message(ctx, msg)
-        finally:
-            db.close()
+        cache_key = RENDER_CACHE.key('week', None, week_key, schedule.version)
+        blocks = RENDER_CACHE.get(cache_key)
+        if blocks is None:
+            blocks = self._render_week_view(schedule, week_key)
+            RENDER_CACHE.put(cache_key, blocks)
+        await send(ctx, blocks=blocks, embeds=True, filename='schedule_week.txt')
 
     @schedule.command()
     @is_cr()
     async def delete(self, ctx, day: str, time: str, *, subject: str):
-        db = get_db()
-        try:
-            rows = db.query(ScheduleModel).filter(
-                ScheduleModel.day == day.title(),
-                ScheduleModel.time == time,
-                ScheduleModel.subject == subject.title()
-            ).all()
-            
-            if rows:
-                for row in rows:
-                    db.delete(row)
-                db.commit()
-                await ctx.send(f"Deleted: {subject.title()} on {day.title()} at {time}")
-            else:
-                await ctx.send("No matching class found.")
-        finally:
-            db.close()
+        weekday = parse_weekday(day)
+        if weekday is None:
+            await send(ctx, "Please provide a valid day of the week (e.g., monday, tuesday, etc.).")
+            return
+        deleted_ids = await run_db(_delete_schedule_rows, weekday, time, subject)
+        if deleted_ids:
+            SCHEDULE_INDEX.remove_ids(deleted_ids)
+            await send(ctx, f"Deleted: {subject.title()} on {weekday.title()} at {time}")
+        else:
+            await send(ctx, "No matching class found.")
 
     @schedule.command(name='main')
     @is_cr()
     async def schedule_main(self, ctx, subcmd: str, *, filename: str):
         if subcmd.lower() != 'routine':
-            await ctx.send("Usage: `!schedule main routine \"assets/main.json\"`")
+            await send(ctx, "Usage: `!schedule main routine \"assets/main.json\"`")
             return
         filename = filename.strip('"').strip("'")
         try:
-            schedule_data = load_main_schedule_from_file(filename)
-            
-            db = get_db()
-            try:
-                db.query(ScheduleModel).delete()
-                
-                for group, days in schedule_data.items():
-                    for day, entries in days.items():
-                        for e in entries:
-                            new_entry = ScheduleModel(
-                                day=day.title(),
-                                time=e.get('time'),
-                                subject=e.get('subject'),
-                                group_name=group,
-                                room=e.get('room', ''),
-                                instructor=e.get('instructor', ''),
-                                note=e.get('note', '')
-                            )
-                            db.add(new_entry)
-                db.commit()
-                await ctx.send(f"✅ Main schedule loaded successfully from `{filename}` and written to database.")
-            finally:
-                db.close()
+            schedule_data = await run_blocking(load_main_schedule_from_file, filename)
+            source_hash = await run_blocking(file_sha256, utils.MAIN_SCHEDULE_FILE)
+            result = await run_blocking(import_schedule, schedule_data, source_hash)
+            if result.changed:
+                SCHEDULE_INDEX.invalidate()
+            await send(ctx, f"✅ Main schedule loaded successfully from `{filename}` and written to database ({result}).")
         except FileNotFoundError:
-            await ctx.send(f"❌ File not found: `{filename}`")
+            await send(ctx, f"❌ File not found: `{filename}`")
         except Exception as e:
-            await ctx.send(f"❌ Failed to load schedule: {e}")
+            await send(ctx, f"❌ Failed to load schedule: {e}")
 
     @schedule.command()
     @is_cr()
@@ -297,11 +204,11 @@ class Schedule(commands.Cog):
         !schedule edit GroupA monday 9:00 AM Math 10:00 AM Math permanent|temporary
         """
         if not args:
-            await ctx.send("❌ Invalid format. Usage: `!schedule edit GroupA monday 9:00 AM Math 10:00 AM Math permanent` (use 'temporary' or 'permanent')")
+            await send(ctx, "❌ Invalid format. Usage: `!schedule edit GroupA monday 9:00 AM Math 10:00 AM Math permanent` (use 'temporary' or 'permanent')")
             return
         parsed = _parse_edit_cancel_args(args)
         if not parsed or 'new_time' not in parsed:
-            await ctx.send("❌ Invalid format. Usage: `!schedule edit GroupA monday 9:00 AM Math 10:00 AM Math permanent` (use 'temporary' or 'permanent')")
+            await send(ctx, "❌ Invalid format. Usage: `!schedule edit GroupA monday 9:00 AM Math 10:00 AM Math permanent` (use 'temporary' or 'permanent')")
             return
 
         group = parsed['group']
@@ -313,41 +220,43 @@ class Schedule(commands.Cog):
         permanent = parsed['permanent']
 
         if not utils.MAIN_SCHEDULE:
-            await ctx.send("❌ No main schedule loaded. Use `!schedule main routine \"main.json\"` first.")
+            await send(ctx, "❌ No main schedule loaded. Use `!schedule main routine \"main.json\"` first.")
             return
 
         if permanent:
             group_data = utils.MAIN_SCHEDULE.get(group)
             if not group_data or day not in group_data:
-                await ctx.send("⚠️ Group or day not found in main schedule.")
+                await send(ctx, "⚠️ Group or day not found in main schedule.")
                 return
             entries = group_data[day]
             for e in entries:
                 if _normalize_time(e.get('time')) == _normalize_time(orig_time) and _normalize_subject(e.get('subject')) == _normalize_subject(orig_subject):
                     e['time'] = new_time
                     e['subject'] = new_subject
+                    set_entry_interval(e)
                     try:
                         save_main_schedule_to_file()
-                        await ctx.send(f"✅ Schedule for {group} on {day.title()} updated permanently: {orig_time} {orig_subject} -> {new_time} {new_subject}")
+                        await send(ctx, f"✅ Schedule for {group} on {day.title()} updated permanently: {orig_time} {orig_subject} -> {new_time} {new_subject}")
                     except Exception as ex:
-                        await ctx.send(f"❌ Failed to save main schedule: {ex}")
+                        await send(ctx, f"❌ Failed to save main schedule: {ex}")
                     return
-            await ctx.send("⚠️ Matching class not found in main schedule.")
+            await send(ctx, "⚠️ Matching class not found in main schedule.")
         else:
             wk = get_week_key()
             apply_temp_replacement(wk, group, day, orig_time, orig_subject, {'time': new_time, 'subject': new_subject, 'room': ''})
-            await ctx.send(f"✅ Schedule for {group} on {day.title()} {orig_time} {orig_subject} has been temporarily changed to {new_time} {new_subject} for this week.")
+            note = await self._persist_temp_changes()
+            await send(ctx, f"✅ Schedule for {group} on {day.title()} {orig_time} {orig_subject} has been temporarily changed to {new_time} {new_subject} for this week.{note}")
 
     @schedule.command()
     @is_cr()
     async def cancel(self, ctx, *, args: str = None):
         """Cancel a class. Usage: !schedule cancel GroupA monday 9:00 AM Math permanent|temporary"""
         if not args:
-            await ctx.send("❌ Invalid format. Usage: `!schedule cancel GroupA monday 9:00 AM Math permanent`")
+            await send(ctx, "❌ Invalid format. Usage: `!schedule cancel GroupA monday 9:00 AM Math permanent`")
             return
         parsed = _parse_edit_cancel_args(args)
         if not parsed:
-            await ctx.send("❌ Invalid format. Usage: `!schedule cancel GroupA monday 9:00 AM Math permanent`")
+            await send(ctx, "❌ Invalid format. Usage: `!schedule cancel GroupA monday 9:00 AM Math permanent`")
             return
 
         group = parsed['group']
@@ -358,11 +267,11 @@ class Schedule(commands.Cog):
 
         if permanent:
             if not utils.MAIN_SCHEDULE:
-                await ctx.send("❌ No main schedule loaded.")
+                await send(ctx, "❌ No main schedule loaded.")
                 return
             group_data = utils.MAIN_SCHEDULE.get(group)
             if not group_data or day not in group_data:
-                await ctx.send("⚠️ Group or day not found in main schedule.")
+                await send(ctx, "⚠️ Group or day not found in main schedule.")
                 return
             entries = group_data[day]
             for i, e in enumerate(entries):
@@ -370,31 +279,37 @@ class Schedule(commands.Cog):
                     entries.pop(i)
                     try:
                         save_main_schedule_to_file()
-                        await ctx.send(f"✅ {orig_subject} on {day.title()} at {orig_time} permanently cancelled for {group}.")
+                        await send(ctx, f"✅ {orig_subject} on {day.title()} at {orig_time} permanently cancelled for {group}.")
                     except Exception as ex:
-                        await ctx.send(f"❌ Failed to save main schedule: {ex}")
+                        await send(ctx, f"❌ Failed to save main schedule: {ex}")
                     return
-            await ctx.send("⚠️ Matching class not found in main schedule.")
+            await send(ctx, "⚠️ Matching class not found in main schedule.")
         else:
             wk = get_week_key()
             apply_temp_cancellation(wk, group, day, orig_time, orig_subject)
-            await ctx.send(f"✅ {orig_subject} on {day.title()} at {orig_time} temporarily cancelled for {group} this week.")
+            note = await self._persist_temp_changes()
+            await send(ctx, f"✅ {orig_subject} on {day.title()} at {orig_time} temporarily cancelled for {group} this week.{note}")
 
     @schedule.command()
     async def view(self, ctx, group: str, day: str):
         if not utils.MAIN_SCHEDULE:
-            await ctx.send("❌ No main schedule loaded. Use `!schedule main routine \"main.json\"` first.")
+            await send(ctx, "❌ No main schedule loaded. Use `!schedule main routine \"main.json\"` first.")
             return
-        day_l = day.lower()
+        day_l = parse_weekday(day) or day.lower()
         week_key = get_week_key()
-        merged = merge_schedule_for_week(group, day_l, week_key)
-        if not merged:
-            await ctx.send(f"No schedule found for **{group}** on **{day.title()}**")
-            return
-        msg = f"**{group} schedule for {day.title()} (week {week_key[1]})**\n"
-        for e in merged:
-            msg += self._format_schedule_entry(e) + "\n"
-        await self._send_long_message(ctx, msg)
+        view_key = f"group:{group}"
+        cache_key = RENDER_CACHE.key(view_key, day_l, week_key)
+        text = RENDER_CACHE.get(cache_key)
+        if text is None:
+            merged = merge_schedule_for_week(group, day_l, week_key)
+            if not merged:
+                text = f"No schedule found for **{group}** on **{day.title()}**"
+            else:
+                text = f"**{group} schedule for {day.title()} (week {week_key[1]})**\n"
+                for e in sorted(merged, key=time_sort_key):
+                    text += self._format_schedule_entry(e) + "\n"
+            RENDER_CACHE.put(cache_key, text)
+        await send(ctx, text)
 
 async def setup(bot):
     await bot.add_cog(Schedule(bot))
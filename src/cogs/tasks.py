@@ -1,10 +1,16 @@
 import discord
 from discord.ext import commands
-from datetime import datetime
+from datetime import date
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from database.database import get_db
+from database.database import run_db, run_blocking
 from database.models import Assessment
-from configuration.config import CHANNEL_ID
+from configuration.config import CHANNEL_ID, TEMP_CHANGES_FLUSH_SECONDS
+from dispatch import send
+from temp_store import TEMP_STORE
+from utils import evict_past_temp_changes
+
+def _assessments_on(db, day):
+    return [(a.subject, a.time, a.description) for a in db.query(Assessment).filter(Assessment.date == day).all()]
 
 class Tasks(commands.Cog):
     def __init__(self, bot):
@@ -14,27 +20,38 @@ class Tasks(commands.Cog):
         # Add job if not already present (though in a cog, we usually just add it on load)
         if not self.scheduler.get_job("daily_reminder"):
             self.scheduler.add_job(self.daily_assessment_reminder, 'cron', hour=18, minute=0, id="daily_reminder")
+        # Write-behind flush of temporary schedule changes, and weekly-partition pruning.
+        # Both are coroutines so they run on the event loop, which owns utils.TEMP_CHANGES.
+        if not self.scheduler.get_job("flush_temp_changes"):
+            self.scheduler.add_job(self.flush_temp_changes, 'interval', seconds=TEMP_CHANGES_FLUSH_SECONDS, id="flush_temp_changes")
+        if not self.scheduler.get_job("prune_temp_changes"):
+            self.scheduler.add_job(self.prune_temp_changes, 'cron', hour=0, minute=5, id="prune_temp_changes")
+
+    async def flush_temp_changes(self):
+        await run_blocking(TEMP_STORE.flush)
+
+    async def prune_temp_changes(self):
+        # In-memory state is evicted here on the loop; only the table delete goes to the DB executor
+        current = evict_past_temp_changes()
+        await run_blocking(TEMP_STORE.delete_before, current)
 
     async def daily_assessment_reminder(self):
-        today = datetime.now().strftime("%Y-%m-%d")
-        db = get_db()
-        try:
-            assessments = db.query(Assessment).filter(Assessment.date == today).all()
-            
-            if assessments and CHANNEL_ID:
-                channel = self.bot.get_channel(CHANNEL_ID)
-                if channel:
-                    msg = "**🔔 Today's Assessments Reminder**\n\n"
-                    for a in assessments:
-                        time = a.time or "Time not set"
-                        desc = a.description or "No description"
-                        msg += f"• **{a.subject}**: {desc} at {time}\n"
-                    await channel.send("@Class\n" + msg)
-        finally:
-            db.close()
-
-    def cog_unload(self):
+        today = date.today()
+        assessments = await run_db(_assessments_on, today)
+
+        if assessments and CHANNEL_ID:
+            channel = self.bot.get_channel(CHANNEL_ID)
+            if channel:
+                msg = "**🔔 Today's Assessments Reminder**\n\n"
+                for subject, time, description in assessments:
+                    time = time.strftime("%H:%M") if time else "Time not set"
+                    desc = description or "No description"
+                    msg += f"• **{subject}**: {desc} at {time}\n"
+                await send(channel, "@Class\n" + msg)
+
+    async def cog_unload(self):
         self.scheduler.shutdown()
+        await run_blocking(TEMP_STORE.flush)
 
 async def setup(bot):
     await bot.add_cog(Tasks(bot))
@@ -0,0 +1,225 @@
+"""Outbound message dispatcher. Every cog sends through `send()`.
+
+* Packing: text is split on line boundaries into as few messages as possible
+  (or into embeds, which hold 4096 characters each and 6000 per message).
+  Callers may pass logical blocks (e.g. one per day) that are kept whole
+  unless a single block is over the limit.
+* Rate limits: each channel has a token bucket matching Discord's per-channel
+  limit, and one worker per channel sends queued messages in order.
+* Coalescing: short text messages queued by the same context (command) while
+  its channel waits for a token are merged into one message.
+* Files: text longer than DISPATCH_FILE_THRESHOLD is attached as a .txt file.
+
+Send latency is exported as `discord_send_seconds` and the number of messages
+each command produced as `messages_per_command`.
+"""
+import asyncio
+import io
+import logging
+import time
+from collections import deque
+import discord
+from admission import TokenBucket
+from configuration import config
+from metrics import METRICS
+
+logger = logging.getLogger('discord_bot')
+
+MAX_MESSAGE = 2000
+MAX_EMBED = 4096
+MAX_EMBEDS_TOTAL = 6000
+MAX_EMBEDS = 10
+
+SEND_LATENCY = METRICS.histogram("discord_send_seconds", "Time to send one Discord message")
+SENT = METRICS.counter("discord_messages_sent", "Discord messages sent")
+COALESCED = METRICS.counter("discord_messages_coalesced", "Queued messages merged into another message")
+RATE_LIMITED = METRICS.counter("discord_send_rate_limited", "Sends delayed by a channel rate-limit bucket")
+MESSAGES_PER_COMMAND = METRICS.histogram(
+    "messages_per_command", "Messages sent by one command invocation", buckets=(0, 1, 2, 3, 5, 8, 13, 21)
+)
+
+
+def _split_line(line, limit):
+    return [line[i:i + limit] for i in range(0, len(line), limit)] or ['']
+
+
+def pack(text, limit=MAX_MESSAGE):
+    """Split `text` on line boundaries into the fewest chunks of at most `limit` characters.
+
+    Filling each chunk greedily is optimal when order must be kept; lines longer
+    than `limit` are hard-split. Empty or whitespace-only text packs into no chunks,
+    since Discord rejects an empty message.
+    """
+    if not text.strip():
+        return []
+    if len(text) <= limit:
+        return [text]
+    chunks = []
+    current = ""
+    for line in text.split('\n'):
+        for piece in _split_line(line, limit - 1) if len(line) >= limit else [line]:
+            if current and len(current) + len(piece) + 1 > limit:
+                chunks.append(current)
+                current = ""
+            current += piece + '\n'
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+def pack_blocks(blocks, limit=MAX_MESSAGE):
+    """Pack `blocks` into chunks of at most `limit`, splitting only blocks that are too long."""
+    chunks = []
+    current = ""
+    for block in blocks:
+        if len(block) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(pack(block, limit))
+        elif len(current) + len(block) > limit:
+            chunks.append(current)
+            current = block
+        else:
+            current += block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_embeds(text=None, blocks=None):
+    """Return a list of embed lists, one per message, within Discord's embed limits."""
+    descriptions = pack_blocks(blocks, MAX_EMBED) if blocks is not None else pack(text, MAX_EMBED)
+    messages = []
+    current, total = [], 0
+    for d in descriptions:
+        if current and (total + len(d) > MAX_EMBEDS_TOTAL or len(current) == MAX_EMBEDS):
+            messages.append(current)
+            current, total = [], 0
+        current.append(discord.Embed(description=d))
+        total += len(d)
+    if current:
+        messages.append(current)
+    return messages
+
+
+def _channel_key(dest):
+    channel = getattr(dest, 'channel', None) or dest
+    return getattr(channel, 'id', None) or id(dest)
+
+
+class _ChannelQueue:
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate=rate, capacity=burst)
+        self.items = deque()  # (dest, kwargs, coalesce, future)
+        self.worker = None
+
+
+class Dispatcher:
+    def __init__(self, channel_rate=None, channel_burst=None, file_threshold=None):
+        self.channel_rate = channel_rate or config.DISPATCH_CHANNEL_RATE
+        self.channel_burst = channel_burst or config.DISPATCH_CHANNEL_BURST
+        self.file_threshold = file_threshold or config.DISPATCH_FILE_THRESHOLD
+        self._channels = {}
+
+    def _items(self, text, blocks, embeds, filename, kwargs):
+        """Turn one send() call into the keyword arguments of each message to send."""
+        if blocks is not None:
+            text = "".join(blocks)
+        if text is not None and not text.strip():
+            # Nothing to say; send the view/file/embed alone, if any
+            text = None
+        if text is None:
+            return [kwargs] if kwargs else []
+        if len(text) > self.file_threshold and 'file' not in kwargs:
+            first_line = text.lstrip().split('\n', 1)[0][:200]
+            attachment = discord.File(io.BytesIO(text.encode('utf-8')), filename=filename)
+            return [dict(kwargs, content=f"{first_line}\n📎 Full output attached ({len(text)} characters).", file=attachment)]
+        if embeds:
+            items = [{'embeds': group} for group in pack_embeds(text, blocks)]
+        else:
+            chunks = pack_blocks(blocks) if blocks is not None else pack(text)
+            items = [{'content': chunk} for chunk in chunks if chunk.strip()]
+        # Views, files and references belong with the last message
+        items[-1].update(kwargs)
+        return items
+
+    async def send(self, dest, content=None, *, blocks=None, embeds=False, filename='message.txt',
+                   coalesce=True, **kwargs):
+        """Send `content` (or `blocks`) to a Context or channel; returns the last message sent.
+
+        Nothing is sent (and None is returned) when there is no content, view or file.
+
+        Pass `coalesce=False` for messages that will be edited later, so they are
+        never merged with another command's output.
+        """
+        items = self._items(content, blocks, embeds, filename, kwargs)
+        if not items:
+            return None
+        key = _channel_key(dest)
+        queue = self._channels.get(key)
+        if queue is None:
+            queue = self._channels[key] = _ChannelQueue(self.channel_rate, self.channel_burst)
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            fut = loop.create_future()
+            can_merge = coalesce and set(item) == {'content'}
+            queue.items.append((dest, item, can_merge, fut))
+            futures.append(fut)
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._drain(key, queue))
+        if hasattr(dest, 'command'):
+            dest.messages_sent = getattr(dest, 'messages_sent', 0) + len(items)
+        results = await asyncio.gather(*futures)
+        return results[-1]
+
+    @staticmethod
+    def _can_merge(dest, content, queued):
+        nxt_dest, nxt, can_merge, _ = queued
+        return can_merge and nxt_dest is dest and len(content) + 1 + len(nxt['content']) <= MAX_MESSAGE
+
+    async def _drain(self, key, queue):
+        while queue.items:
+            wait = queue.bucket.try_acquire()
+            if wait:
+                RATE_LIMITED.inc()
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = queue.bucket.try_acquire()
+            dest, item, can_merge, fut = queue.items.popleft()
+            futures = [fut]
+            if can_merge:
+                # Everything the same context queued up behind this message and still fits goes with
+                # it; another command's output is never sent as (or in reply to) this one's
+                content = item['content']
+                while queue.items and self._can_merge(dest, content, queue.items[0]):
+                    _, nxt, _, nxt_fut = queue.items.popleft()
+                    content += '\n' + nxt['content']
+                    futures.append(nxt_fut)
+                    COALESCED.inc()
+                item = {'content': content}
+            started = time.monotonic()
+            try:
+                message = await dest.send(**item)
+            except Exception as e:
+                for f in futures:
+                    if not f.done():
+                        f.set_exception(e)
+                continue
+            SEND_LATENCY.observe(time.monotonic() - started)
+            SENT.inc()
+            for f in futures:
+                if not f.done():
+                    f.set_result(message)
+        if self._channels.get(key) is queue:
+            del self._channels[key]
+
+
+DISPATCHER = Dispatcher()
+send = DISPATCHER.send
+
+
+def record_command(ctx):
+    """Observe how many messages a finished command sent (bot `on_command_completion`)."""
+    MESSAGES_PER_COMMAND.observe(getattr(ctx, 'messages_sent', 0))
@@ -0,0 +1,211 @@
+"""Deterministic answers to common schedule questions, in front of the LLM.
+
+`answer()` recognises three question shapes and answers them straight from
+`utils.MAIN_SCHEDULE` with this week's temporary changes applied:
+
+* next class        — "what's next for GroupA", "next class for group b"
+* classes on a day  — "is there class tomorrow", "schedule for monday group a"
+* where is a class  — "where is Microprocessor lab", "which room is English"
+
+It returns None whenever the question is not clearly one of these (or mentions
+exams, assignments, notes, ...), and the caller falls back to Mistral. The first
+two shapes need an explicit phrase ("next class", "what's next", a class word and
+a day), and every other word must be one that such a lookup uses. "can we skip
+class on friday" or "when is the next holiday" therefore go to the LLM.
+"""
+import re
+from datetime import datetime, timedelta
+import utils
+from metrics import METRICS
+
+HITS = METRICS.counter("ask_fastpath_hits", "!ask questions answered from the schedule without the LLM")
+MISSES = METRICS.counter("ask_fastpath_misses", "!ask questions passed on to the LLM")
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+SCHEDULE_WORDS = frozenset({'class', 'classes', 'schedule', 'timetable', 'routine', 'lecture', 'lectures'})
+# The only words (besides weekdays and group mentions) a next-class / classes-on-a-day question may
+# contain; anything else ("teaches", "skip", "end", "holiday", "open", "study") is not a timetable lookup
+INTENT_WORDS = SCHEDULE_WORDS | frozenset({
+    'what', 'whats', 's', 'is', 'are', 'the', 'a', 'an', 'for', 'on', 'of', 'my', 'our', 'we', 'i', 'do', 'have',
+    'there', 'any', 'when', 'me', 'show', 'tell', 'list', 'please', 'next', 'today', 'tomorrow',
+})
+# Questions about these are better served by retrieval + LLM
+VETO_WORDS = frozenset({
+    'exam', 'exams', 'test', 'tests', 'quiz', 'assignment', 'assignments', 'homework', 'due', 'deadline',
+    'note', 'notes', 'material', 'materials', 'why', 'how', 'explain',
+})
+FILLER_WORDS = frozenset({
+    'where', 'which', 'what', 'is', 'are', 'the', 'a', 'an', 'room', 'held', 'happen', 'happening',
+    'located', 'class', 'for', 'in', 'at', 'on', 'of', 'does', 'do', 'take', 'place', 'today', 'tomorrow',
+    'group', 's', 'my', 'our',
+})
+LAB_WORDS = frozenset({'lab', 'labs', 'practical', 'practicals', 'p'})
+# Free slots are listed in main.json as 'BREAK' or with a subject of 'None'
+BREAK_SUBJECTS = frozenset({'break', 'lunch', 'none', ''})
+
+_GROUP_RE = re.compile(r"\bgroup\s*([a-z0-9])\b")
+
+
+def _tokens(question):
+    return re.sub(r"[^\w\s]", " ", question.lower()).split()
+
+
+def _only_intent_words(tokens):
+    return all(t in INTENT_WORDS or t in WEEKDAYS for t in tokens)
+
+
+def _asks_next_class(tokens):
+    """'next class', 'next lecture', or a question opening with "what's next"."""
+    if tokens[:3] == ['what', 's', 'next'] or tokens[:2] == ['whats', 'next']:
+        return True
+    return any(t == 'next' and following in SCHEDULE_WORDS for t, following in zip(tokens, tokens[1:]))
+
+
+def _is_break(entry):
+    return (entry.get('subject') or '').strip().lower() in BREAK_SUBJECTS
+
+
+def _format_entry(entry):
+    line = f"• {entry.get('time')} — {entry.get('subject')}"
+    if entry.get('room'):
+        line += f" ({entry['room']})"
+    return line
+
+
+class FastPath:
+    def __init__(self, schedule=None, merge=None):
+        # Injectable for benchmarks; defaults read the live utils state on every call
+        self._schedule = schedule
+        self._merge = merge
+
+    @property
+    def schedule(self):
+        return self._schedule if self._schedule is not None else utils.MAIN_SCHEDULE
+
+    def _day_entries(self, group, day, week_key):
+        merge = self._merge or utils.merge_schedule_for_week
+        entries = [e for e in merge(group, day, week_key) if not _is_break(e)]
+        return sorted(entries, key=utils.time_sort_key)
+
+    def _groups(self):
+        return [g for g, days in self.schedule.items() if isinstance(days, dict) and g.lower() != 'metadata']
+
+    def _find_groups(self, text):
+        by_key = {g.lower().replace(' ', ''): g for g in self._groups()}
+        found = [by_key.get(f"group{m}") for m in _GROUP_RE.findall(text)]
+        return [g for g in found if g]
+
+    @staticmethod
+    def _find_day(tokens, now):
+        if 'today' in tokens:
+            return WEEKDAYS[now.weekday()], 'today'
+        if 'tomorrow' in tokens:
+            return WEEKDAYS[(now + timedelta(days=1)).weekday()], 'tomorrow'
+        for t in tokens:
+            if t in WEEKDAYS:
+                return t, t.capitalize()
+        return None, None
+
+    # ----- intents ---------------------------------------------------------
+    def _next_class(self, groups, now):
+        week_key = utils.get_week_key(now)
+        minute = now.hour * 60 + now.minute
+        lines = []
+        for group in groups:
+            found = None
+            for offset in range(7):
+                day_dt = now + timedelta(days=offset)
+                day = WEEKDAYS[day_dt.weekday()]
+                for e in self._day_entries(group, day, utils.get_week_key(day_dt) if offset else week_key):
+                    start = e.get('start_minute')
+                    if offset == 0 and (start is None or start <= minute):
+                        continue
+                    found = (offset, day, e)
+                    break
+                if found:
+                    break
+            if not found:
+                lines.append(f"**{group}:** no upcoming classes this week.")
+                continue
+            offset, day, e = found
+            when = 'today' if offset == 0 else 'tomorrow' if offset == 1 else day.capitalize()
+            lines.append(f"**{group}** next ({when}):\n{_format_entry(e)}")
+        return "\n".join(lines)
+
+    def _classes_on(self, groups, day, label, now):
+        offset = (WEEKDAYS.index(day) - now.weekday()) % 7
+        week_key = utils.get_week_key(now + timedelta(days=offset))
+        when = label if label in ('today', 'tomorrow') else f"on {label}"
+        lines = []
+        for group in groups:
+            entries = self._day_entries(group, day, week_key)
+            if entries:
+                lines.append(f"**{group}** — classes {when}:")
+                lines.extend(_format_entry(e) for e in entries)
+            else:
+                lines.append(f"**{group}** — no classes {when}.")
+        return "\n".join(lines)
+
+    def _where(self, tokens, groups, day, now):
+        want_lab = any(t in LAB_WORDS for t in tokens)
+        core = [
+            t for t in tokens
+            if len(t) > 1 and t not in FILLER_WORDS and t not in WEEKDAYS
+            and t not in LAB_WORDS and not t.startswith('group')
+        ]
+        if not core:
+            return None
+        week_key = utils.get_week_key(now)
+        matches = []
+        for group in groups:
+            for d in ([day] if day else WEEKDAYS):
+                for e in self._day_entries(group, d, week_key):
+                    subj_tokens = _tokens(e.get('subject'))
+                    if not all(any(s.startswith(t) for s in subj_tokens) for t in core):
+                        continue
+                    is_lab = any(s in LAB_WORDS for s in subj_tokens) or 'lab' in (e.get('room') or '').lower()
+                    if want_lab and not is_lab:
+                        continue
+                    matches.append((group, d, e))
+        if not matches:
+            return None
+        rooms = {e.get('room') or 'room not listed' for _, _, e in matches}
+        lines = [f"**{e.get('subject')}** — {group}, {d.capitalize()} {e.get('time')}: {e.get('room') or 'room not listed'}"
+                 for group, d, e in matches[:10]]
+        if len(rooms) == 1:
+            lines.insert(0, f"📍 {rooms.pop()}")
+        return "\n".join(lines)
+
+    def answer(self, question, now=None):
+        """Return an exact answer for a recognised schedule question, else None."""
+        if not self.schedule:
+            return None
+        now = now or datetime.now()
+        text = " ".join(_tokens(question))
+        tokens = text.split()
+        if not tokens or VETO_WORDS.intersection(tokens):
+            return None
+        groups = self._find_groups(text) or self._groups()
+        day, label = self._find_day(tokens, now)
+
+        if tokens[0] == 'where' or 'room' in tokens:
+            return self._where(tokens, groups, day, now)
+        # Everything but the group mentions must be lookup vocabulary, or the LLM answers
+        words = _GROUP_RE.sub(' ', text).split()
+        if not _only_intent_words(words):
+            return None
+        if _asks_next_class(words):
+            return self._next_class(groups, now)
+        if day and SCHEDULE_WORDS.intersection(words):
+            return self._classes_on(groups, day, label, now)
+        return None
+
+
+FASTPATH = FastPath()
+
+
+def answer(question, now=None):
+    """Answer `question` from the schedule if possible, counting hits and misses."""
+    result = FASTPATH.answer(question, now)
+    (HITS if result else MISSES).inc()
+    return result
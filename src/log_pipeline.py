@@ -0,0 +1,162 @@
+"""Non-blocking logging: records are queued on the event loop and written by a
+background thread.
+
+`setup_logging()` attaches a QueueHandler to the `discord_bot` logger. A
+QueueListener thread feeds the console handler and a rotating file handler,
+which writes JSON lines by default. Handlers never run on the event loop, so a
+slow disk cannot stall it.
+
+Per-message logging from `on_message` is the firehose. Those records carry a
+`sample_rate` and are sampled out before they are queued. Their `content` field
+is redacted in the writer thread, according to LOG_MESSAGE_CONTENT:
+`full`, `redacted` (the default), or `none`, which logs only the length.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[email]"),
+    (re.compile(r"<[@#][!&]?\d+>"), "[mention]"),
+    (re.compile(r"https?://\S+"), "[url]"),
+    # Discord bot tokens and other long secret-looking strings
+    (re.compile(r"\b[\w-]{24,}\.[\w-]{6}\.[\w-]{27,}\b"), "[token]"),
+    (re.compile(r"\b[A-Za-z0-9_\-]{32,}\b"), "[secret]"),
+    (re.compile(r"\b\d{7,}\b"), "[number]"),
+]
+
+
+def redact(text):
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _extras(record):
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS and not k.startswith('_')}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and any traceback."""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        data.update(_extras(record))
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic `time LEVEL message` line, followed by any extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extras = {k: v for k, v in _extras(record).items() if k != 'sample_rate'}
+        if extras:
+            line += ' ' + ' '.join(f"{k}={v!r}" if isinstance(v, str) else f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a record with probability `record.sample_rate` (records without one always pass)."""
+
+    def __init__(self, rng=None):
+        super().__init__()
+        self._random = (rng or random.Random()).random
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', None)
+        return rate is None or rate >= 1.0 or self._random() < rate
+
+
+class RedactionFilter(logging.Filter):
+    """Rewrite the `content` field of message records according to `mode`."""
+
+    def __init__(self, mode='redacted'):
+        super().__init__()
+        self.mode = mode
+
+    def filter(self, record):
+        content = getattr(record, 'content', None)
+        if content is None or self.mode == 'full':
+            return True
+        if self.mode == 'none':
+            record.content_length = len(content)
+            del record.content
+        elif not getattr(record, '_redacted', False):
+            record.content = redact(content)
+            record._redacted = True
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Render the message now, because its args may change after this call.
+        # Formatting, including tracebacks, happens later in the writer thread.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(name='discord_bot', log_file=None, file_format=None, max_bytes=None, backups=None,
+                  rotate_when=None, console_level=None, content_mode=None):
+    """Configure `name` to log through a queue. Returns the started QueueListener."""
+    log_file = log_file or os.getenv('LOG_FILE', '/tmp/bot.log')
+    file_format = file_format or os.getenv('LOG_FORMAT', 'json').lower()
+    max_bytes = max_bytes or int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    backups = backups or int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    rotate_when = rotate_when if rotate_when is not None else os.getenv('LOG_ROTATE_WHEN', '')
+    console_level = console_level or os.getenv('LOG_LEVEL', 'INFO').upper()
+    content_mode = content_mode or os.getenv('LOG_MESSAGE_CONTENT', 'redacted').lower()
+
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(TextFormatter())
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backups, encoding='utf-8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(JsonFormatter() if file_format == 'json' else TextFormatter())
+    redaction = RedactionFilter(content_mode)
+    for handler in (console, file_handler):
+        handler.addFilter(redaction)
+
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    queue_handler.addFilter(SamplingFilter())
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.handlers[:] = [queue_handler]
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(records, console, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop, listener)
+    return listener
+
+
+def _stop(listener):
+    # QueueListener.stop() fails if called twice (e.g. once by the caller, then at exit)
+    if listener._thread is not None:
+        listener.stop()
@@ -24,24 +24,25 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-from database.database import init_db, get_db
-from database.models import Schedule as ScheduleModel
+from database.database import init_db, instrument, run_blocking, run_db
 from configuration.config import TOKEN
-from utils import load_main_schedule_from_file
+from utils import load_main_schedule_from_file, load_persisted_temp_changes, prune_temp_changes
+from schedule_index import SCHEDULE_INDEX
+from retrieval import CONTEXT
+from schedule_import import import_schedule, file_sha256
+from startup import STARTUP, probe_network
+from metrics import METRICS, monitor_loop_lag
+from dispatch import send, record_command
+from log_pipeline import setup_logging
+from profiling import PROFILER
 
 
 # ----- Logging setup -----------------------------------------------------
+# Records go through a queue to a background writer thread (console + rotating file)
+log_listener = setup_logging()
 logger = logging.getLogger('discord_bot')
-logger.setLevel(logging.DEBUG)
-fmt = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-ch = logging.StreamHandler()
-ch.setLevel(logging.INFO)
-ch.setFormatter(fmt)
-fh = logging.FileHandler('/tmp/bot.log', encoding='utf-8')
-fh.setLevel(logging.DEBUG)
-fh.setFormatter(fmt)
-logger.addHandler(ch)
-logger.addHandler(fh)
+# Fraction of non-command messages (the on_message firehose) that are logged
+LOG_MESSAGE_SAMPLE_RATE = float(os.getenv('LOG_MESSAGE_SAMPLE_RATE', '0.1'))
 
 
 # ----- Bot setup (Placeholder) -------------------------------------------
@@ -49,14 +50,33 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = None  # Will be initialized in main()
 
+# init_db and the schedule import may run migrations / bulk statements; allow them longer
+# than the per-command DB_QUERY_TIMEOUT
+DB_INIT_TIMEOUT = float(os.getenv('DB_INIT_TIMEOUT', '300'))
+
 
 # ----- Health Check Server (for HF Spaces) --------------------------------
 async def health_check(request):
-    return web.json_response({"status": "healthy", "bot": str(bot.user or "starting")})
+    state = STARTUP.snapshot()
+    user = bot.user if bot is not None else None
+    return web.json_response({
+        "status": "healthy" if state['ready'] else "starting",
+        "bot": str(user or "starting"),
+        **state,
+    })
+
+async def stats(request):
+    return web.json_response(METRICS.snapshot())
+
+async def prometheus_metrics(request):
+    return web.Response(text=METRICS.render_prometheus(), content_type='text/plain', charset='utf-8',
+                        headers={'X-Content-Type-Options': 'nosniff'})
 
 async def start_health_server():
     app = web.Application()
     app.router.add_get('/health', health_check)
+    app.router.add_get('/stats', stats)
+    app.router.add_get('/metrics', prometheus_metrics)
     app.router.add_get('/', health_check)
     runner = web.AppRunner(app)
     await runner.setup()
@@ -66,15 +86,38 @@ async def start_health_server():
     logger.info(f"🚀 Health check server started on port {port}")
 
 
-# Initialize database
+async def process_commands(bot_instance, message):
+    """`bot.process_commands`, counting, timing and (when enabled) profiling each command invocation."""
+    if message.author.bot:
+        return
+    ctx = await bot_instance.get_context(message)
+    if ctx.command is None:
+        await bot_instance.invoke(ctx)  # reports CommandNotFound
+        return
+    invocation = PROFILER.begin(ctx)
+    try:
+        await bot_instance.invoke(ctx)
+    finally:
+        elapsed = PROFILER.end(invocation, ctx)
+        name = ctx.command.qualified_name
+        METRICS.histogram("bot_command_seconds", "Command invocation time", labels={'command': name}) \
+            .observe(elapsed)
+        status = 'error' if ctx.command_failed else 'ok'
+        METRICS.counter("bot_commands", "Command invocations", labels={'command': name, 'status': status}).inc()
 
 
+def _restore_temp_changes():
+    prune_temp_changes()
+    loaded = load_persisted_temp_changes()
+    logger.info(f"Loaded {loaded} temporary schedule changes")
+
 
 def auto_import_schedule(override: bool = False):
     """Import schedule from main.json.
 
     If override is False, do not import when Schedule table already has rows.
-    If override is True, clear existing schedule entries and import.
+    If override is True, apply the difference between main.json and the table,
+    unless main.json is unchanged since the last import.
     """
     try:
         # Try multiple possible locations for main.json
@@ -107,47 +150,13 @@ def auto_import_schedule(override: bool = False):
         logger.info(f"📅 Importing schedule from {main_json_path}...")
         schedule_data = load_main_schedule_from_file(main_json_path)
 
-        db = get_db()
-        try:
-            # If not overriding, and DB already has schedule rows, skip import
-            if not override:
-                existing = db.query(ScheduleModel).count()
-                if existing > 0:
-                    logger.info(f"Found {existing} existing schedule entries in DB; skipping import (use --override to replace).")
-                    return
-
-            # Clear existing schedule data (when override True or DB empty)
-            deleted_count = db.query(ScheduleModel).delete()
-            logger.info(f"🗑️ Cleared {deleted_count} existing schedule entries")
-
-            # Insert new data from main.json
-            entry_count = 0
-            for group, days in schedule_data.items():
-                # skip any top-level keys that are not schedule groups (e.g., metadata)
-                if not isinstance(days, dict):
-                    continue
-                for day, entries in days.items():
-                    # entries should be a list of dicts; skip otherwise
-                    if not isinstance(entries, list):
-                        continue
-                    for e in entries:
-                        if not isinstance(e, dict):
-                            continue
-                        new_entry = ScheduleModel(
-                            day=day.title(),
-                            time=e.get('time'),
-                            subject=e.get('subject'),
-                            group_name=group,
-                            room=e.get('room', ''),
-                            instructor=e.get('instructor', ''),
-                            note=e.get('note', ''),
-                        )
-                        db.add(new_entry)
-                        entry_count += 1
-            db.commit()
-            logger.info(f"✅ Schedule imported successfully! ({entry_count} entries)")
-        finally:
-            db.close()
+        result = import_schedule(schedule_data, source_hash=file_sha256(main_json_path), override=override)
+        if result.skipped:
+            logger.info(f"Schedule import skipped: {result.reason}.")
+            return
+        if result.changed:
+            SCHEDULE_INDEX.invalidate()
+        logger.info(f"✅ Schedule imported successfully! ({result})")
     except Exception as e:
         logger.exception(f"❌ Error auto-importing schedule: {e}")
 
@@ -162,42 +171,25 @@ async def load_extensions(bot_instance):
             await bot_instance.load_extension(f'cogs.{filename[:-3]}')
 
 
-async def main(argv=None):
-    global bot
-    parser = argparse.ArgumentParser(description='Start the Discord bot')
-    parser.add_argument('--override', action='store_true', help='Override existing schedule data in DB with main.json')
-    args = parser.parse_args(argv)
-
-    # Initialize database
-    try:
-        init_db()
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {e}")
-        logger.error("   Check your DATABASE_URL in .env or Supabase credentials.")
-        sys.exit(1)
-
-    # Diagnostic: Check DNS resolution before starting
-    logger.info("🔍 Diagnostic: Checking DNS resolution for discord.com...")
-    for family in [socket.AF_INET, socket.AF_INET6, socket.AF_UNSPEC]:
-        fam_name = "IPv4" if family == socket.AF_INET else "IPv6" if family == socket.AF_INET6 else "ANY"
-        try:
-            addr = socket.getaddrinfo("discord.com", 443, family=family)
-            logger.info(f"   ✅ {fam_name} resolution: {addr[0][4][0]}")
-        except Exception as e:
-            logger.warning(f"   ❌ {fam_name} resolution failed: {e}")
+def create_bot(connector=None):
+    """Build the bot and register its event handlers; extensions are loaded separately.
 
-    # Add a small delay to ensure network is fully ready (common on HF Spaces)
-    logger.info("⏳ Waiting 5 seconds for network stability...")
-    await asyncio.sleep(5)
-
-    # Use AF_UNSPEC (0) to allow both IPv4 and IPv6, which is more robust
-    connector = aiohttp.TCPConnector(family=socket.AF_UNSPEC)
+    `main()` uses this with a real connector; `scripts/loadtest.py` uses it to drive
+    commands without a gateway connection.
+    """
     bot = commands.Bot(command_prefix="!", intents=intents, connector=connector)
 
     # ----- Bot Events -------------------------------------------------------
     @bot.event
     async def on_ready():
         logger.info(f"{bot.user} is online!")
+        if STARTUP.phases.get('gateway', {}).get('status') == 'running':
+            STARTUP.finish('gateway')
+            STARTUP.log_summary()
+
+    @bot.event
+    async def on_command_completion(ctx):
+        record_command(ctx)
 
     @bot.event
     async def on_command_error(ctx, error):
@@ -205,10 +197,10 @@ async def main(argv=None):
             if isinstance(error, commands.MissingRequiredArgument):
                 param = error.param.name if hasattr(error, 'param') else 'argument'
                 usage = f" Usage: `!{ctx.command.qualified_name} {ctx.command.signature}`" if ctx.command else ''
-                await ctx.send(f"❌ Missing required argument: `{param}`.{usage}")
+                await send(ctx, f"❌ Missing required argument: `{param}`.{usage}")
                 return
             logger.exception(f"Error in command '{getattr(ctx, 'command', None)}': {error}")
-            await ctx.send("❌ An error occurred while processing your command.")
+            await send(ctx, "❌ An error occurred while processing your command.")
         except Exception:
             logger.exception("Failed in on_command_error handler")
 
@@ -216,45 +208,94 @@ async def main(argv=None):
     async def on_message(message: discord.Message):
         try:
             if getattr(message, 'webhook_id', None) is not None: return
-            if message.author == bot.user:
-                logger.info(f"message by bot: channel={getattr(message.channel, 'name', message.channel.id)} content={message.content}")
-            else:
-                logger.info(f"message to bot: author={message.author} channel={getattr(message.channel, 'name', message.channel.id)} content={message.content}")
-            await bot.process_commands(message)
+            # Commands are always logged; other traffic is sampled and its content redacted
+            is_command = message.content.startswith(bot.command_prefix)
+            logger.log(
+                logging.INFO if is_command else logging.DEBUG,
+                "message by bot" if message.author == bot.user else "message to bot",
+                extra={
+                    'author': str(message.author),
+                    'channel': getattr(message.channel, 'name', message.channel.id),
+                    'content': message.content,
+                    'sample_rate': 1.0 if is_command else LOG_MESSAGE_SAMPLE_RATE,
+                },
+            )
+            await process_commands(bot, message)
         except Exception:
             logger.exception("Error in on_message handler")
 
-    # Import schedule according to flag
-    try:
-        auto_import_schedule(override=args.override)
-    except Exception:
-        logger.exception('Auto-import schedule failed')
+    return bot
 
-    # Start health check server
+
+async def main(argv=None):
+    global bot
+    parser = argparse.ArgumentParser(description='Start the Discord bot')
+    parser.add_argument('--override', action='store_true', help='Override existing schedule data in DB with main.json')
+    args = parser.parse_args(argv)
+
+    instrument(METRICS)
+    # Event-loop lag is sampled for /metrics for the lifetime of the process
+    loop_lag_task = asyncio.create_task(monitor_loop_lag())
+
+    # Start health check server first so /health reports startup progress
     try:
-        await start_health_server()
+        await STARTUP.run('health_server', start_health_server())
     except Exception as e:
         logger.error(f"❌ Failed to start health check server: {e}")
 
-    # Start bot with retry logic for DNS/Connection issues
-    max_retries = 5
-    for attempt in range(max_retries):
-        try:
-            async with bot:
-                await load_extensions(bot)
-                await bot.start(TOKEN)
-            break # Success!
-        except (aiohttp.ClientConnectorDNSError, socket.gaierror) as e:
-            wait_time = 2 ** attempt # Exponential backoff
-            if attempt < max_retries - 1:
-                logger.warning(f"📡 DNS/Connection error: {e}. Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
-                await asyncio.sleep(wait_time)
-            else:
-                logger.error(f"❌ Max retries reached. Could not connect to Discord: {e}")
+    # Database setup and the network readiness probe are independent; run them concurrently
+    logger.info("🔍 Checking database and network readiness for discord.com...")
+    db_task = STARTUP.start('database', run_blocking(init_db, timeout=DB_INIT_TIMEOUT))
+    net_task = STARTUP.start('network', probe_network())
+    try:
+        await db_task
+    except Exception as e:
+        net_task.cancel()
+        logger.error(f"❌ Database initialization failed: {e}")
+        logger.error("   Check your DATABASE_URL in .env or Supabase credentials.")
+        sys.exit(1)
+
+    # Restore temporary schedule changes for this and next week; drop older weeks
+    try:
+        await STARTUP.run('temp_changes', run_blocking(_restore_temp_changes))
+    except Exception:
+        logger.exception('Failed to load temporary schedule changes')
+
+    # Import schedule according to flag, off the critical path (reads lazily load the index)
+    STARTUP.background('schedule_import', run_blocking(auto_import_schedule, args.override, timeout=DB_INIT_TIMEOUT))
+    # In-memory index behind !search and the !ask context, also off the critical path
+    STARTUP.background('search_index', run_db(CONTEXT.load))
+
+    await asyncio.gather(net_task, return_exceptions=True)
+
+    # Use AF_UNSPEC (0) to allow both IPv4 and IPv6, which is more robust
+    connector = aiohttp.TCPConnector(family=socket.AF_UNSPEC)
+    bot = create_bot(connector=connector)
+
+    try:
+        # Start bot with retry logic for DNS/Connection issues
+        max_retries = 5
+        for attempt in range(max_retries):
+            try:
+                async with bot:
+                    await STARTUP.run('extensions', load_extensions(bot))
+                    STARTUP.begin('gateway')
+                    await bot.start(TOKEN)
+                break # Success!
+            except (aiohttp.ClientConnectorDNSError, socket.gaierror) as e:
+                wait_time = 2 ** attempt # Exponential backoff
+                if attempt < max_retries - 1:
+                    logger.warning(f"📡 DNS/Connection error: {e}. Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error(f"❌ Max retries reached. Could not connect to Discord: {e}")
+                    raise
+            except Exception as e:
+                logger.exception(f"❌ Unexpected error during bot startup: {e}")
                 raise
-        except Exception as e:
-            logger.exception(f"❌ Unexpected error during bot startup: {e}")
-            raise
+    finally:
+        # Stop sampling once the bot has shut down
+        loop_lag_task.cancel()
 
 
 if __name__ == '__main__':
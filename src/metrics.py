@@ -0,0 +1,185 @@
+"""Process-wide metrics registry.
+
+Cogs and helpers register named counters, gauges and histograms here, optionally
+with labels (e.g. `labels={'command': 'schedule'}`). The health server exposes a
+JSON snapshot at `/stats` and the Prometheus text format at `/metrics`.
+"""
+import asyncio
+import bisect
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help='', labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Gauge:
+    """A value that goes up and down; with `fn`, the value is computed when read."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help='', labels=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._value = 0
+        self._fn = fn
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, n=1):
+        self._value += n
+
+    def dec(self, n=1):
+        self._value -= n
+
+    @property
+    def value(self):
+        return self._fn() if self._fn is not None else self._value
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations (seconds by convention)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', buckets=DEFAULT_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def value(self):
+        return {'count': self._count, 'sum': round(self._sum, 6)}
+
+    def cumulative(self):
+        """Return [(upper_bound, count)], the last bound being +Inf, plus the sum and count."""
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        running = 0
+        buckets = []
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            running += n
+            buckets.append((bound, running))
+        return buckets, total, count
+
+
+def _label_text(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def hit_ratio(hits, misses):
+    """Gauge function: hits / (hits + misses) of two counters, 0 before any lookup."""
+    def ratio():
+        total = hits.value + misses.value
+        return round(hits.value / total, 4) if total else 0.0
+    return ratio
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metric
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help, labels, **kwargs):
+        labels = tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+        with self._lock:
+            metric = self._metrics.get((name, labels))
+            if metric is None:
+                metric = self._metrics[(name, labels)] = cls(name, help, labels=labels, **kwargs)
+            return metric
+
+    def counter(self, name, help='', labels=None):
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name, help='', labels=None, fn=None):
+        return self._get_or_create(Gauge, name, help, labels, fn=fn)
+
+    def histogram(self, name, help='', buckets=DEFAULT_BUCKETS, labels=None):
+        return self._get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+    def _sorted(self):
+        with self._lock:
+            return sorted(self._metrics.items(), key=lambda item: item[0])
+
+    def snapshot(self):
+        return {name + _label_text(labels): m.value for (name, labels), m in self._sorted()}
+
+    def render_prometheus(self):
+        """Return every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        previous = None
+        for (name, labels), m in self._sorted():
+            if name != previous:
+                lines.append(f"# HELP {name} {m.help}")
+                lines.append(f"# TYPE {name} {m.kind}")
+                previous = name
+            if m.kind == 'histogram':
+                buckets, total, count = m.cumulative()
+                for bound, n in buckets:
+                    lines.append(f"{name}_bucket{_label_text(labels, [('le', _number(bound))])} {n}")
+                lines.append(f"{name}_sum{_label_text(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+            else:
+                lines.append(f"{name}{_label_text(labels)} {_number(m.value)}")
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = MetricsRegistry()
+
+LOOP_LAG = METRICS.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke a periodic timer",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+LOOP_LAG_LAST = METRICS.gauge("event_loop_lag_last_seconds", "Most recent event-loop lag sample")
+
+
+async def monitor_loop_lag(interval=0.5):
+    """Sleep `interval` forever and record how late each wake-up is."""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - started - interval)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
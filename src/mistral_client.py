@@ -1,35 +1,250 @@
 # mistral_client.py
 import aiohttp
+import asyncio
 import json
-import os
+import logging
+import time
+from configuration import config
+from metrics import METRICS
+from resilience import CircuitBreaker, CircuitOpen, LatencyTracker, RetryBudget
 
-async def ask_mistral(question, context=""):
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
-        return None
+logger = logging.getLogger('discord_bot')
+
+TTFB = METRICS.histogram("mistral_stream_ttfb_seconds", "Time from request to first streamed token")
+RETRIES = METRICS.counter("mistral_retries", "Mistral requests retried after a failed attempt")
+HEDGES = METRICS.counter("mistral_hedges", "Hedged second Mistral requests sent")
+HEDGE_WINS = METRICS.counter("mistral_hedge_wins", "Hedged requests that answered first")
+REQUEST_LATENCY = METRICS.histogram("mistral_request_seconds", "Duration of one Mistral request (attempt or stream)")
+
+
+def _record(started, status):
+    """Observe one finished request; `status` is the HTTP code, or `timeout` / `cancelled` / `error`."""
+    REQUEST_LATENCY.observe(time.monotonic() - started)
+    METRICS.counter("mistral_responses", "Mistral responses by HTTP status", labels={'status': status}).inc()
+
+# Worth another attempt: rate limited or a server-side failure
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class MistralError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.status is None or self.status in RETRYABLE_STATUS
+
+
+class MistralClient:
+    """Long-lived Mistral chat-completions client with a keep-alive connection pool.
+
+    The aiohttp session is created lazily on first use (it must be created inside the
+    running event loop) and reused for every request until `close()`.
+
+    Each attempt has its own deadline. Once enough latencies are known, a second
+    (hedged) request is sent if the first is slower than the `hedge_percentile`
+    latency. Retries and hedges draw on a shared retry budget, and a circuit
+    breaker fails fast while the API keeps failing.
+    """
 
-    url = "https://api.mistral.ai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "mistral-small-latest",
-        "messages": [
-            {"role": "system", "content": f"You are a helpful class assistant. Use this context if relevant: {context}"},
-            {"role": "user", "content": question}
-        ],
-        "temperature": 0.5,
-        "max_tokens": 300
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload, timeout=10) as response:
-                if response.status == 200:
+    def __init__(self, api_key=None, url=None, model=None, timeout=None, connect_timeout=None,
+                 max_connections=None, keepalive=None, attempt_timeout=None, max_attempts=None,
+                 hedge_percentile=None, breaker=None, retry_budget=None):
+        self.api_key = config.MISTRAL_API_KEY if api_key is None else api_key
+        self.url = url or config.MISTRAL_API_URL
+        self.model = model or config.MISTRAL_MODEL
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout or config.MISTRAL_TIMEOUT,
+            sock_connect=connect_timeout or config.MISTRAL_CONNECT_TIMEOUT,
+        )
+        self.max_connections = max_connections or config.MISTRAL_MAX_CONNECTIONS
+        self.keepalive = keepalive or config.MISTRAL_KEEPALIVE
+        self.attempt_timeout = attempt_timeout or config.MISTRAL_ATTEMPT_TIMEOUT
+        self.max_attempts = max_attempts or config.MISTRAL_MAX_ATTEMPTS
+        self.hedge_percentile = config.MISTRAL_HEDGE_PERCENTILE if hedge_percentile is None else hedge_percentile
+        self.breaker = breaker or CircuitBreaker(
+            "mistral", failure_threshold=config.MISTRAL_BREAKER_FAILURES, reset_timeout=config.MISTRAL_BREAKER_RESET
+        )
+        self.retry_budget = retry_budget or RetryBudget(ratio=config.MISTRAL_RETRY_BUDGET)
+        self.latency = LatencyTracker()
+        self._session = None
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                keepalive_timeout=self.keepalive,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            )
+        return self._session
+
+    def _payload(self, question, context):
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": f"You are a helpful class assistant. Use this context if relevant: {context}"},
+                {"role": "user", "content": question}
+            ],
+            "temperature": 0.5,
+            "max_tokens": 300
+        }
+
+    async def _attempt(self, payload):
+        """One request under the per-attempt deadline. Raises on any failure."""
+        started = time.monotonic()
+        session = self._get_session()
+        status = 'error'
+        try:
+            async with asyncio.timeout(self.attempt_timeout):
+                async with session.post(self.url, json=payload) as response:
+                    status = response.status
+                    if response.status != 200:
+                        raise MistralError(f"HTTP {response.status}", status=response.status)
                     data = await response.json()
-                    return data["choices"][0]["message"]["content"]
-    except Exception as e:
-        print(f"Mistral API Error: {e}")
-        pass
-    return None
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            raise
+        except asyncio.CancelledError:
+            # The losing half of a hedged pair
+            status = 'cancelled'
+            raise
+        finally:
+            _record(started, status)
+        self.latency.observe(time.monotonic() - started)
+        return data["choices"][0]["message"]["content"]
+
+    async def _hedged(self, payload):
+        """Run an attempt, racing a second one if the first is slower than usual."""
+        delay = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        if delay is None or delay >= self.attempt_timeout:
+            return await self._attempt(payload)
+        first = asyncio.create_task(self._attempt(payload))
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not self.retry_budget.try_spend():
+            return await first
+        HEDGES.inc()
+        hedge = asyncio.create_task(self._attempt(payload))
+        pending = {first, hedge}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in done if not t.exception()), None)
+                if winner is not None:
+                    if winner is hedge:
+                        HEDGE_WINS.inc()
+                    return winner.result()
+                if not pending:
+                    # Both failed; surface the first request's error
+                    return first.result()
+        finally:
+            for t in pending:
+                t.cancel()
+
+    async def ask(self, question, context="", retry=False):
+        """Return the completion text, or None if the API is disabled, unhealthy or the call failed.
+
+        Pass `retry=True` when this call retries a request that already failed (e.g. a
+        stream); it is then charged to the retry budget and skipped once that is spent.
+        """
+        if not self.enabled:
+            return None
+        payload = self._payload(question, context)
+        if not retry:
+            self.retry_budget.deposit()
+        elif self.breaker.rejecting or not self.retry_budget.try_spend():
+            logger.debug("Mistral retry skipped: circuit open or retry budget exhausted")
+            return None
+        else:
+            RETRIES.inc()
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.breaker.allow()
+            except CircuitOpen as e:
+                error = error or e
+                break
+            try:
+                text = await self._hedged(payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError, MistralError, KeyError, ValueError) as e:
+                error = e
+                if isinstance(e, MistralError) and not e.retryable:
+                    # The API answered; the request itself was rejected (bad key, bad payload)
+                    self.breaker.record_success()
+                    break
+                self.breaker.record_failure()
+                if attempt == self.max_attempts or not self.retry_budget.try_spend():
+                    break
+                RETRIES.inc()
+                continue
+            self.breaker.record_success()
+            return text
+        # An open circuit is already reported by the breaker's state transitions
+        log = logger.debug if isinstance(error, CircuitOpen) else logger.warning
+        log(f"Mistral API Error: {error!r}")
+        return None
+
+    async def stream(self, question, context=""):
+        """Yield completion text deltas as they arrive over server-sent events.
+
+        Raises MistralError, CircuitOpen (or aiohttp errors) on failure so callers can fall
+        back to `ask(retry=True)`. No token may take longer than the per-attempt deadline to arrive.
+        """
+        if not self.enabled:
+            return
+        self.breaker.allow()
+        self.retry_budget.deposit()
+        payload = self._payload(question, context)
+        payload["stream"] = True
+        started = time.monotonic()
+        first = True
+        session = self._get_session()
+        timeout = aiohttp.ClientTimeout(
+            total=self.timeout.total, sock_connect=self.timeout.sock_connect, sock_read=self.attempt_timeout
+        )
+        status = 'error'
+        try:
+            async with session.post(self.url, json=payload, headers={"Accept": "text/event-stream"},
+                                    timeout=timeout) as response:
+                status = response.status
+                if response.status != 200:
+                    raise MistralError(f"HTTP {response.status}", status=response.status)
+                async for raw in response.content:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content")
+                    if delta:
+                        if first:
+                            TTFB.observe(time.monotonic() - started)
+                            first = False
+                        yield delta
+        except (aiohttp.ClientError, asyncio.TimeoutError, MistralError, ValueError) as e:
+            if isinstance(e, asyncio.TimeoutError):
+                status = 'timeout'
+            if isinstance(e, MistralError) and not e.retryable:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        finally:
+            _record(started, status)
+        self.breaker.record_success()
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
@@ -0,0 +1,197 @@
+"""Opt-in profiling of slow commands.
+
+A background thread samples the stack of every profiled command invocation each
+PROFILE_INTERVAL seconds. When the command is running, the sample is the event
+loop thread's live stack. When it is suspended, the sample is its await chain,
+ending in `[await <what>]`. The result is a wall-clock profile, so time spent
+waiting on the database, Mistral or Discord shows up as well as CPU time.
+
+An invocation is profiled when PROFILE_THRESHOLD is set or when its command was
+armed with `!debug profile <command> [n]`. A profile is written to PROFILE_DIR if
+the command was slower than the threshold or was armed. The file uses the
+collapsed-stack format (`frame;frame;frame count`), which flamegraph.pl and
+speedscope read.
+
+Separately, the PROFILE_SLOWEST slowest invocations are kept, together with the
+shapes of their arguments (types and lengths, never the values).
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from configuration import config
+
+logger = logging.getLogger('discord_bot')
+
+
+def arg_shape(value):
+    """Describe an argument without its value, e.g. `str[12]`, `int`, `Member`."""
+    if isinstance(value, (str, bytes, list, tuple, set, dict)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+def _await_chain(coro):
+    """Frames of a suspended coroutine, outermost first, ending with what it waits on."""
+    labels = []
+    awaitable = coro
+    while awaitable is not None:
+        frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'gi_frame', None)
+        if frame is None:
+            # e.g. a Future, whose C implementation awaits through a FutureIter
+            labels.append(f"[await {type(awaitable).__name__.removesuffix('Iter')}]")
+            break
+        labels.append(_label(frame))
+        awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+    return labels
+
+
+class _Invocation:
+    __slots__ = ('root', 'started', 'samples', 'sampled')
+
+    def __init__(self, root, sampled):
+        self.root = root  # the coroutine of the task running the command
+        self.started = time.perf_counter()
+        self.samples = Counter()
+        self.sampled = sampled
+
+
+class CommandProfiler:
+    def __init__(self, threshold=None, interval=None, out_dir=None, max_files=None, slowest=None):
+        self.threshold = config.PROFILE_THRESHOLD if threshold is None else threshold
+        self.interval = interval or config.PROFILE_INTERVAL
+        self.out_dir = out_dir or config.PROFILE_DIR
+        self.max_files = max_files or config.PROFILE_MAX_FILES
+        self.slowest_size = slowest or config.PROFILE_SLOWEST
+        self._armed = {}  # qualified command name -> invocations left to profile
+        self._active = set()
+        self._slowest = []  # min-heap of (seconds, seq, record)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._loop_thread = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def arm(self, command, n=1):
+        """Profile the next `n` invocations of `command` (a qualified name)."""
+        self._armed[command] = self._armed.get(command, 0) + n
+
+    def armed(self):
+        return dict(self._armed)
+
+    def slowest(self):
+        """The slowest invocations seen, slowest first."""
+        return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def begin(self, ctx):
+        """Start timing the invocation in `ctx`; call `end()` with the result when it finishes."""
+        # Only the root command is known before invoking; an armed subcommand is
+        # sampled on spec and kept if it turns out to be the one invoked
+        root = ctx.command.qualified_name
+        wanted = self.enabled or any(name.split(' ', 1)[0] == root for name in self._armed)
+        task = asyncio.current_task()
+        invocation = _Invocation(task.get_coro() if task is not None else None, wanted and task is not None)
+        if invocation.sampled:
+            self._loop_thread = threading.get_ident()
+            with self._lock:
+                self._active.add(invocation)
+                self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+        return invocation
+
+    def end(self, invocation, ctx):
+        """Stop sampling, record the invocation and write its profile if it qualifies.
+
+        Returns the invocation's duration in seconds.
+        """
+        elapsed = time.perf_counter() - invocation.started
+        if invocation.sampled:
+            with self._lock:
+                self._active.discard(invocation)
+        name = ctx.command.qualified_name
+        path = None
+        armed = self._armed.get(name, 0)
+        if armed:
+            if armed == 1:
+                del self._armed[name]
+            else:
+                self._armed[name] = armed - 1
+        if invocation.samples and (armed or (self.enabled and elapsed >= self.threshold)):
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+            path = os.path.join(self.out_dir, f"{stamp}-{name.replace(' ', '_')}-{elapsed * 1000:.0f}ms.collapsed")
+            asyncio.get_running_loop().run_in_executor(None, self._write, path, invocation.samples)
+        if len(self._slowest) < self.slowest_size or elapsed > self._slowest[0][0]:
+            record = {
+                'command': name,
+                'seconds': elapsed,
+                'at': datetime.now(),
+                'args': [arg_shape(a) for a in ctx.args[2 if ctx.cog else 1:]],
+                'kwargs': {k: arg_shape(v) for k, v in ctx.kwargs.items()},
+                'failed': ctx.command_failed,
+                'profile': path,
+            }
+            item = (elapsed, next(self._seq), record)
+            if len(self._slowest) < self.slowest_size:
+                heapq.heappush(self._slowest, item)
+            else:
+                heapq.heapreplace(self._slowest, item)
+        return elapsed
+
+    def _stack(self, invocation, top):
+        labels = []
+        frame = top
+        root_frame = getattr(invocation.root, 'cr_frame', None)
+        while frame is not None:
+            labels.append(_label(frame))
+            if frame is root_frame:
+                labels.reverse()
+                return ';'.join(labels)
+            frame = frame.f_back
+        # Not on the loop thread's stack right now: the command is waiting on something
+        return ';'.join(_await_chain(invocation.root))
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+                top = sys._current_frames().get(self._loop_thread)
+                for invocation in self._active:
+                    invocation.samples[self._stack(invocation, top)] += 1
+                del top
+            time.sleep(self.interval)
+
+    def _write(self, path, samples):
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            profiles = sorted(p for p in os.listdir(self.out_dir) if p.endswith('.collapsed'))
+            for old in profiles[:-self.max_files]:
+                os.remove(os.path.join(self.out_dir, old))
+            logger.info(f"🔬 Wrote profile {path}")
+        except OSError:
+            logger.exception(f"Failed to write profile {path}")
+
+
+PROFILER = CommandProfiler()
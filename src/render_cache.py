@@ -0,0 +1,60 @@
+"""Cache of fully rendered schedule views (a text, or a list of per-day blocks).
+
+Entries are keyed by (view, day, week_key, schedule_version, temp_changes_version),
+so any mutation that bumps one of the version counters naturally misses the cache.
+Stale versions are evicted in LRU order once `max_entries` is reached.
+"""
+from collections import OrderedDict
+import utils
+from metrics import METRICS, hit_ratio
+from schedule_index import SCHEDULE_INDEX
+
+
+def current_versions(index_version=None):
+    """Return (schedule_version, temp_changes_version) for cache keys.
+
+    Pass the version of the `ScheduleSnapshot` being rendered as `index_version`.
+    """
+    if index_version is None:
+        index_version = SCHEDULE_INDEX.version
+    return ((index_version, utils.MAIN_SCHEDULE_VERSION), utils.TEMP_CHANGES_VERSION)
+
+
+class RenderCache:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = METRICS.counter("schedule_render_cache_hits", "Schedule views served from the render cache")
+        self.misses = METRICS.counter("schedule_render_cache_misses", "Schedule views rendered from scratch")
+        METRICS.gauge("schedule_render_cache_hit_ratio", "Schedule render cache hit ratio",
+                      fn=hit_ratio(self.hits, self.misses))
+
+    def key(self, view, day, week_key, index_version=None):
+        """Cache key for a view at the current versions (of `index_version`'s snapshot, if given).
+
+        Take it before rendering and pass the same key to `put()`, so a render of
+        data that changed meanwhile is never stored under the newer versions.
+        """
+        schedule_version, temp_version = current_versions(index_version)
+        return (view, day, week_key, schedule_version, temp_version)
+
+    def get(self, key):
+        rendered = self._entries.get(key)
+        if rendered is None:
+            self.misses.inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits.inc()
+        return rendered if isinstance(rendered, str) else list(rendered)
+
+    def put(self, key, rendered):
+        self._entries[key] = rendered if isinstance(rendered, str) else tuple(rendered)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+RENDER_CACHE = RenderCache()
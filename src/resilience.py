@@ -0,0 +1,118 @@
+"""Tail-latency and failure control for outbound calls.
+
+* `CircuitBreaker` fails fast while a dependency keeps failing, then lets a single
+  probe through after `reset_timeout` to decide whether to close again.
+* `RetryBudget` caps retries and hedges to a fraction of recent traffic, so a
+  struggling provider is not hit with a retry storm.
+* `LatencyTracker` keeps a window of recent latencies; its percentile is used as
+  the delay before sending a hedged request.
+"""
+import logging
+import math
+import time
+from collections import deque
+from admission import TokenBucket
+from metrics import METRICS
+
+logger = logging.getLogger('discord_bot')
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit open: retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._gauge = METRICS.gauge(f"{name}_circuit_state", f"{name} circuit breaker (0 closed, 1 half-open, 2 open)")
+        self._rejected = METRICS.counter(f"{name}_circuit_rejected", f"{name} calls rejected by an open circuit")
+
+    def _transition(self, state, reason):
+        if state == self.state:
+            return
+        log = logger.warning if state == OPEN else logger.info
+        log(f"🔌 {self.name} circuit {self.state} → {state} ({reason})")
+        self.state = state
+        self._gauge.set(_STATE_VALUES[state])
+
+    @property
+    def rejecting(self):
+        """True while the circuit is open and calls would be rejected (no state change)."""
+        return self.state == OPEN and self._clock() < self._opened_at + self.reset_timeout
+
+    def allow(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        now = self._clock()
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining > 0:
+                self._rejected.inc()
+                raise CircuitOpen(self.name, remaining)
+            self._transition(HALF_OPEN, f"{self.reset_timeout:g}s elapsed, probing")
+            self._probe_started = None
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported back is given up on
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                self._rejected.inc()
+                raise CircuitOpen(self.name, self._probe_started + self.reset_timeout - now)
+            self._probe_started = now
+
+    def record_success(self):
+        self._failures = 0
+        self._probe_started = None
+        self._transition(CLOSED, "call succeeded")
+
+    def record_failure(self):
+        self._failures += 1
+        self._probe_started = None
+        if self.state == HALF_OPEN:
+            self._opened_at = self._clock()
+            self._transition(OPEN, "probe failed")
+        elif self.state == CLOSED and self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            self._transition(OPEN, f"{self._failures} consecutive failures")
+
+
+class RetryBudget:
+    """Every request deposits `ratio` tokens; every retry or hedge spends one.
+
+    `min_per_second` keeps a trickle of retries available when traffic is low.
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=0.1, capacity=10, clock=time.monotonic):
+        self.ratio = ratio
+        self._bucket = TokenBucket(rate=min_per_second, capacity=capacity, clock=clock)
+
+    def deposit(self):
+        self._bucket.refund(self.ratio)
+
+    def try_spend(self):
+        return self._bucket.try_acquire() == 0
+
+
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def observe(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, q):
+        """Return the `q` quantile (0..1) of recent samples, or None until enough are seen."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
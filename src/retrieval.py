@@ -0,0 +1,346 @@
+"""Lexical retrieval over class data for `!ask` prompts and `!search`.
+
+`LexicalIndex` is an in-memory inverted index with BM25 scoring that is updated
+incrementally as rows are added or removed. `ContextBuilder` keeps one document
+per Schedule / Assignment / Note / Material / Assessment row; it selects the
+best-scoring snippets for a question within a token budget, and answers
+prefix-matching `!search` queries without a database round trip.
+"""
+import bisect
+import heapq
+import itertools
+import math
+import re
+import threading
+from collections import Counter
+from configuration import config
+from database.models import Assignment, Note, Material, Assessment
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are at be by for from how i in is it me my of on or the there this to was what when where which who will with".split()
+)
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    # Rough rule of thumb for English text with LLM tokenizers
+    return max(1, len(text) // 4)
+
+
+class LexicalIndex:
+    """Inverted index with BM25 ranking and optional prefix matching.
+
+    Documents are keyed by (kind, key). Terms are also kept in a sorted list so a
+    query token can be expanded to every indexed term that starts with it. Per-term
+    BM25 weights are cached in descending order, so a single-term top-k query reads
+    only k postings; multi-term AND queries intersect document sets before scoring.
+    """
+
+    PREFIX_WEIGHT = 0.8  # a prefix expansion counts a little less than an exact term
+    MAX_EXPANSIONS = 32
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = {}  # (kind, key) -> (text, length)
+        self._postings = {}  # term -> {doc_id: term frequency}
+        self._terms = []  # sorted keys of _postings
+        self._weights = {}  # term -> ({doc_id: weight}, [(doc_id, weight)] best first); rebuilt lazily
+        self._norm_len = None  # average document length the cached weights were computed with
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def term_count(self):
+        return len(self._terms)
+
+    def add(self, kind, key, text):
+        """Index (or re-index) a document."""
+        doc_id = (kind, key)
+        tf = Counter(tokenize(text))
+        with self._lock:
+            self._remove_locked(doc_id)
+            length = sum(tf.values())
+            self._docs[doc_id] = (text, length)
+            self._total_len += length
+            for term, n in tf.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._terms, term)
+                postings[doc_id] = n
+                self._weights.pop(term, None)
+
+    def remove(self, kind, key):
+        with self._lock:
+            self._remove_locked((kind, key))
+
+    def _remove_locked(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        text, length = doc
+        self._total_len -= length
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                self._weights.pop(term, None)
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def remove_kind(self, kind):
+        with self._lock:
+            for doc_id in [d for d in self._docs if d[0] == kind]:
+                self._remove_locked(doc_id)
+
+    # ----- scoring ---------------------------------------------------------
+    def _check_norm(self):
+        # Cached weights depend on the average length; rebuild them once it drifts by 10%
+        avg = self._total_len / len(self._docs) if self._docs else 0.0
+        if not self._norm_len or abs(avg - self._norm_len) > 0.1 * self._norm_len:
+            self._norm_len = avg or 1.0
+            self._weights.clear()
+
+    def _term_weights(self, term):
+        cached = self._weights.get(term)
+        if cached is None:
+            k1, b, avg = self.k1, self.b, self._norm_len
+            weights = {
+                d: tf * (k1 + 1) / (tf + k1 * (1 - b + b * self._docs[d][1] / avg))
+                for d, tf in self._postings[term].items()
+            }
+            cached = self._weights[term] = (weights, sorted(weights.items(), key=lambda item: -item[1]))
+        return cached
+
+    def _expand(self, token, prefix):
+        """Return [(term, factor)] for `token`: the term itself and, with `prefix`, terms it starts."""
+        n_docs = len(self._docs)
+        terms = [(token, 1.0)] if token in self._postings else []
+        if prefix:
+            i = bisect.bisect_left(self._terms, token)
+            for term in self._terms[i:i + self.MAX_EXPANSIONS + 1]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    terms.append((term, self.PREFIX_WEIGHT))
+        expansions = []
+        for term, weight in terms:
+            df = len(self._postings[term])
+            expansions.append((term, weight * math.log(1 + (n_docs - df + 0.5) / (df + 0.5))))
+        return expansions
+
+    def _best_first(self, expansions, kinds):
+        """Yield (score, doc_id) for one query token in descending score order."""
+        if len(expansions) == 1:
+            term, factor = expansions[0]
+            for d, w in self._term_weights(term)[1]:
+                if kinds is None or d[0] in kinds:
+                    yield factor * w, d
+            return
+        streams = [((-factor * w, d) for d, w in self._term_weights(term)[1]) for term, factor in expansions]
+        seen = set()
+        for neg, d in heapq.merge(*streams):
+            if d not in seen and (kinds is None or d[0] in kinds):
+                seen.add(d)
+                yield -neg, d
+
+    def _search_all(self, groups, k, kinds):
+        if len(groups) == 1:
+            # Postings are read best-first, so the first k documents are the top k
+            return list(itertools.islice(self._best_first(groups[0], kinds), k))
+        # Intersect the tokens' document sets (set operations run in C), then score the survivors
+        candidates = None
+        for group in sorted(groups, key=lambda g: sum(len(self._postings[t]) for t, _ in g)):
+            keys = [self._postings[t].keys() for t, _ in group]
+            docs = keys[0] if len(keys) == 1 else set().union(*keys)
+            candidates = set(docs) if candidates is None else candidates & docs
+            if not candidates:
+                return []
+        if kinds is not None:
+            candidates = [d for d in candidates if d[0] in kinds]
+        totals = dict.fromkeys(candidates, 0.0)
+        for group in groups:
+            if len(group) == 1:
+                term, factor = group[0]
+                weights = self._term_weights(term)[0]
+                for d in candidates:
+                    totals[d] += factor * weights[d]
+                continue
+            # A prefix token scores as its best-matching expansion
+            best = dict.fromkeys(candidates, 0.0)
+            for term, factor in group:
+                weights = self._term_weights(term)[0]
+                for d in candidates:
+                    score = factor * weights.get(d, 0.0)
+                    if score > best[d]:
+                        best[d] = score
+            for d, score in best.items():
+                totals[d] += score
+        return [(score, d) for d, score in totals.items()]
+
+    def _search_any(self, groups, k, kinds):
+        totals = {}
+        for group in groups:
+            best = {}
+            for term, factor in group:
+                for d, w in self._term_weights(term)[0].items():
+                    if kinds is None or d[0] in kinds:
+                        score = factor * w
+                        if score > best.get(d, 0.0):
+                            best[d] = score
+            for d, score in best.items():
+                totals[d] = totals.get(d, 0.0) + score
+        return [(score, d) for d, score in totals.items()]
+
+    def search(self, query, k=10, kinds=None, prefix=False, match_all=False):
+        """Return up to `k` (score, doc_id, kind, text) tuples, best first.
+
+        With `prefix`, every query token also matches indexed terms that start with it.
+        With `match_all`, a document must match every query token.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._check_norm()
+            groups = [self._expand(t, prefix) for t in tokens]
+            groups = [g for g in groups if g] if not match_all else groups
+            if not groups or not all(groups):
+                return []
+            scored = self._search_all(groups, k, kinds) if match_all else self._search_any(groups, k, kinds)
+            best = heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))
+            return [(score, d, d[0], self._docs[d][0]) for score, d in best]
+
+
+def _schedule_text(e):
+    text = f"Class: {e['subject']} for {e['group_name']} on {(e['day'] or '').title()} at {e['time']}"
+    if e.get('room'):
+        text += f" in {e['room']}"
+    if e.get('instructor') and e['instructor'] != 'None':
+        text += f" with {e['instructor']}"
+    return text
+
+
+def _assignment_text(subject, topic, due_date):
+    return f"Assignment: {subject} - {topic}, due {due_date}"
+
+
+def _note_text(subject, link):
+    return f"Notes for {subject}: {link}"
+
+
+def _material_text(subject, link):
+    return f"Material for {subject}: {link}"
+
+
+def _assessment_text(subject, date, time, description):
+    text = f"Exam: {subject} on {date}"
+    if time:
+        text += f" at {time.strftime('%H:%M')}"
+    if description:
+        text += f" ({description})"
+    return text
+
+
+SEARCH_KINDS = frozenset({'assignment', 'note', 'material'})
+
+
+class ContextBuilder:
+    def __init__(self, index=None, top_k=8, token_budget=400):
+        self.index = index or LexicalIndex()
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self._schedule_version = None
+        self._exams = {}  # assessment id -> (date, text), for the no-match fallback
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self.load_error = None  # the exception of the last failed load(), if any
+
+    # ----- loading / incremental updates -----------------------------------
+    def load(self, db):
+        """Index every non-schedule row. Run at startup via `run_db`.
+
+        A failure is kept in `load_error` and re-raised; calling load() again retries
+        it. Once loaded, further calls return immediately.
+        """
+        with self._load_lock:
+            if self.loaded:
+                return len(self.index)
+            try:
+                for a in db.query(Assignment).all():
+                    self.add_assignment(a.id, a.subject, a.topic, a.due_date)
+                for n in db.query(Note).all():
+                    self.add_note(n.id, n.subject, n.link)
+                for m in db.query(Material).all():
+                    self.add_material(m.id, m.subject, m.drive_link)
+                for e in db.query(Assessment).all():
+                    self.add_assessment(e.id, e.subject, e.date, e.time, e.description)
+            except Exception as e:
+                self.load_error = e
+                raise
+            self.load_error = None
+            self.loaded = True
+            return len(self.index)
+
+    def add_assignment(self, row_id, subject, topic, due_date):
+        self.index.add('assignment', row_id, _assignment_text(subject, topic, due_date))
+
+    def add_note(self, row_id, subject, link):
+        self.index.add('note', row_id, _note_text(subject, link))
+
+    def add_material(self, row_id, subject, link):
+        self.index.add('material', row_id, _material_text(subject, link))
+
+    def add_assessment(self, row_id, subject, date, time, description):
+        text = _assessment_text(subject, date, time, description)
+        self.index.add('assessment', row_id, text)
+        self._exams[row_id] = (date, text)
+
+    def remove(self, kind, row_id):
+        self.index.remove(kind, row_id)
+        if kind == 'assessment':
+            self._exams.pop(row_id, None)
+
+    def _sync_schedule(self, schedule):
+        """Re-index schedule rows from a schedule index snapshot when it changed."""
+        if self._schedule_version == schedule.version:
+            return
+        self.index.remove_kind('schedule')
+        for e in schedule.all_rows():
+            self.index.add('schedule', e['id'], _schedule_text(e))
+        self._schedule_version = schedule.version
+
+    # ----- query -----------------------------------------------------------
+    def search(self, query, k=10, kinds=SEARCH_KINDS):
+        """Rank documents of `kinds` matching every term of `query` (terms may be prefixes)."""
+        return self.index.search(query, k=k, kinds=kinds, prefix=True, match_all=True)
+
+    def build(self, question, schedule):
+        """Return a context string of the most relevant snippets within the token budget.
+
+        `schedule` is the `ScheduleSnapshot` from `SCHEDULE_INDEX.ensure_loaded()`.
+        """
+        self._sync_schedule(schedule)
+        snippets = []
+        used = 0
+        for _, _, _, text in self.index.search(question, k=self.top_k):
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget:
+                break
+            snippets.append(text)
+            used += cost
+        if not snippets:
+            # Nothing matched; upcoming exams are the most commonly useful default
+            exams = sorted((d, t) for d, t in self._exams.values() if d is not None)[:5]
+            snippets = [t for _, t in exams]
+        return "\n".join(snippets)
+
+
+CONTEXT = ContextBuilder(top_k=config.ASK_CONTEXT_TOP_K, token_budget=config.ASK_CONTEXT_TOKENS)
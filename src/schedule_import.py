@@ -0,0 +1,155 @@
+"""Bulk, diff-based import of main.json into the `schedule` table.
+
+The source file is hashed and the hash stored in `import_state`; an unchanged file
+skips the import entirely. Otherwise the desired rows are diffed against the table
+and only the inserts/updates/deletes are applied, as bulk statements in a single
+transaction, so readers never observe an empty table mid-import.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, insert, update
+from database.database import get_db
+from database.parsing import day_start_minute, parse_interval, parse_weekday
+from database.models import ImportState, Schedule as ScheduleModel
+
+SOURCE_NAME = 'schedule'
+_PAYLOAD = ('room', 'instructor', 'note', 'start_minute', 'end_minute')
+
+
+class ImportResult:
+    def __init__(self, skipped=False, reason='', inserted=0, updated=0, deleted=0):
+        self.skipped = skipped
+        self.reason = reason
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+    @property
+    def changed(self):
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def __str__(self):
+        if self.skipped:
+            return f"skipped ({self.reason})"
+        return f"{self.inserted} inserted, {self.updated} updated, {self.deleted} deleted"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def schedule_rows_from_data(schedule_data):
+    """Flatten {group: {day: [entry, ...]}} into schedule row dicts, skipping metadata.
+
+    Each row carries its time parsed into (start_minute, end_minute), with bare 12-hour
+    times resolved against `metadata.day_start`. Day names are normalized to lowercase
+    weekdays ('Mon' -> 'monday'); raises ValueError if any is not a weekday.
+    """
+    rows = []
+    unknown_days = set()
+    day_start = day_start_minute(schedule_data.get('metadata'))
+    for group, days in schedule_data.items():
+        # skip any top-level keys that are not schedule groups (e.g., metadata)
+        if not isinstance(days, dict):
+            continue
+        for day, entries in days.items():
+            if not isinstance(entries, list):
+                continue
+            weekday = parse_weekday(day)
+            if weekday is None:
+                unknown_days.add(f"{group}.{day}")
+                continue
+            for e in entries:
+                if not isinstance(e, dict):
+                    continue
+                start, end = parse_interval(e.get('time'), day_start)
+                rows.append({
+                    'day': weekday,
+                    'time': e.get('time'),
+                    'start_minute': start,
+                    'end_minute': end,
+                    'subject': e.get('subject'),
+                    'group_name': group,
+                    'room': e.get('room', ''),
+                    'instructor': e.get('instructor', ''),
+                    'note': e.get('note', ''),
+                })
+    if unknown_days:
+        raise ValueError(f"not a day of the week: {', '.join(sorted(unknown_days))}")
+    return rows
+
+
+def _row_key(r):
+    return (r['group_name'], r['day'], r['time'], r['subject'])
+
+
+def diff_rows(existing, desired):
+    """Return (inserts, updates, delete_ids) turning `existing` rows into `desired`.
+
+    Rows are matched on (group, day, time, subject); duplicates are matched in order.
+    """
+    by_key = defaultdict(list)
+    for r in existing:
+        by_key[_row_key(r)].append(r)
+
+    inserts, updates = [], []
+    for r in desired:
+        matches = by_key.get(_row_key(r))
+        if not matches:
+            inserts.append(r)
+            continue
+        current = matches.pop(0)
+        if any((current[k] or '') != (r[k] or '') for k in _PAYLOAD):
+            updates.append({'id': current['id'], **{k: r[k] for k in _PAYLOAD}})
+    delete_ids = [r['id'] for rows in by_key.values() for r in rows]
+    return inserts, updates, delete_ids
+
+
+def import_schedule(schedule_data, source_hash=None, override=True):
+    """Synchronise the schedule table with `schedule_data`.
+
+    If override is False, do not import when the table already has rows.
+    If `source_hash` matches the last imported hash, the import is skipped.
+    """
+    db = get_db()
+    try:
+        count = db.query(ScheduleModel).count()
+        if count and not override:
+            return ImportResult(skipped=True, reason=f"found {count} existing entries (use --override to replace)")
+
+        state = db.get(ImportState, SOURCE_NAME)
+        if count and source_hash and state and state.content_hash == source_hash:
+            return ImportResult(skipped=True, reason='source unchanged')
+
+        existing = [
+            {'id': r.id, 'day': r.day, 'time': r.time, 'subject': r.subject, 'group_name': r.group_name,
+             'room': r.room, 'instructor': r.instructor, 'note': r.note,
+             'start_minute': r.start_minute, 'end_minute': r.end_minute}
+            for r in db.query(ScheduleModel).all()
+        ]
+        inserts, updates, delete_ids = diff_rows(existing, schedule_rows_from_data(schedule_data))
+        if delete_ids:
+            db.execute(delete(ScheduleModel).where(ScheduleModel.id.in_(delete_ids)))
+        if updates:
+            db.execute(update(ScheduleModel), updates)
+        if inserts:
+            db.execute(insert(ScheduleModel), inserts)
+
+        if source_hash:
+            if state is None:
+                db.add(ImportState(name=SOURCE_NAME, content_hash=source_hash, imported_at=datetime.now()))
+            else:
+                state.content_hash = source_hash
+                state.imported_at = datetime.now()
+        db.commit()
+        return ImportResult(inserted=len(inserts), updated=len(updates), deleted=len(delete_ids))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,136 @@
+"""In-memory read model for the `schedule` table.
+
+The schedule changes only a few times per term, so the read commands are served
+from a process-wide index keyed by (day, group_name) instead of querying the
+database on every invocation. Write paths must call `invalidate()` (or patch the
+index with `remove_ids()`) after committing.
+
+Readers `await run_blocking(SCHEDULE_INDEX.ensure_loaded)` and read rows from the
+`ScheduleSnapshot` it returns. A snapshot never changes and never touches the
+database, so an invalidate that lands while a command is rendering can't make
+the event loop reload the table.
+"""
+import threading
+from database.database import get_db
+from database.models import Schedule as ScheduleModel
+from database.parsing import parse_weekday
+
+
+def _normalize_day(day):
+    return parse_weekday(day) or (day or '').strip().lower()
+
+
+def _row_to_entry(row):
+    return {
+        'id': row.id,
+        'day': _normalize_day(row.day),
+        'time': row.time,
+        'start_minute': row.start_minute,
+        'end_minute': row.end_minute,
+        'subject': row.subject,
+        'group_name': row.group_name,
+        'room': row.room or '',
+        'instructor': row.instructor or '',
+        'note': row.note or '',
+    }
+
+
+class ScheduleSnapshot:
+    """Immutable view of the schedule table at one index `version`."""
+
+    def __init__(self, by_key, version):
+        self._by_key = by_key  # (day, group_name) -> (entry, ...) in id order
+        self.version = version
+
+    def rows_for(self, day, group):
+        return list(self._by_key.get((_normalize_day(day), group), ()))
+
+    def rows_for_day(self, day):
+        """Return all entries for a day across groups, ordered by row id."""
+        day = _normalize_day(day)
+        rows = []
+        for (d, _), entries in self._by_key.items():
+            if d == day:
+                rows.extend(entries)
+        rows.sort(key=lambda e: e['id'])
+        return rows
+
+    def all_rows(self):
+        rows = [e for entries in self._by_key.values() for e in entries]
+        rows.sort(key=lambda e: e['id'])
+        return rows
+
+    def without_ids(self, ids, version):
+        by_key = {}
+        for key, entries in self._by_key.items():
+            kept = tuple(e for e in entries if e['id'] not in ids)
+            if kept:
+                by_key[key] = kept
+        return ScheduleSnapshot(by_key, version)
+
+
+class ScheduleIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held by the one thread (re)building the index; other callers of ensure_loaded() wait on it
+        self._load_lock = threading.Lock()
+        self._snapshot = None  # ScheduleSnapshot, or None until (re)loaded
+        # Bumped by invalidate()/remove_ids(); a load that overlaps either is discarded and retried
+        self._generation = 0
+        self.version = 0
+
+    def load(self):
+        """(Re)build the index from the database with a single query; returns the new snapshot."""
+        with self._load_lock:
+            return self._load()
+
+    def _load(self):
+        while True:
+            generation = self._generation
+            db = get_db()
+            try:
+                rows = db.query(ScheduleModel).order_by(ScheduleModel.id).all()
+                entries = [_row_to_entry(r) for r in rows]
+            finally:
+                db.close()
+            by_key = {}
+            for e in entries:
+                by_key.setdefault((e['day'], e['group_name']), []).append(e)
+            with self._lock:
+                # The table changed while we were reading it; the snapshot may be stale
+                if generation != self._generation:
+                    continue
+                self.version += 1
+                self._snapshot = ScheduleSnapshot({k: tuple(v) for k, v in by_key.items()}, self.version)
+                return self._snapshot
+
+    def ensure_loaded(self):
+        """Return the current snapshot, loading it from the database first if needed (blocking)."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._load_lock:
+            # Another caller may have loaded it while we waited
+            snapshot = self._snapshot
+            return snapshot if snapshot is not None else self._load()
+
+    def invalidate(self):
+        """Drop the cached rows; the next ensure_loaded() reloads them from the database."""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+            self.version += 1
+
+    def remove_ids(self, ids):
+        """Patch the index after rows were deleted from the database."""
+        ids = set(ids)
+        if not ids:
+            return
+        with self._lock:
+            self._generation += 1
+            self.version += 1
+            if self._snapshot is not None:
+                self._snapshot = self._snapshot.without_ids(ids, self.version)
+
+
+SCHEDULE_INDEX = ScheduleIndex()
@@ -0,0 +1,121 @@
+"""Startup orchestration: concurrent phases, per-phase timings and readiness state.
+
+`main()` registers each startup step as a named phase. Independent phases run
+concurrently, every phase records its status and duration, and `/health` reports
+the snapshot so a deploy can tell "process up" apart from "bot ready".
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+
+logger = logging.getLogger('discord_bot')
+
+NETWORK_READY_TIMEOUT = float(os.getenv('NETWORK_READY_TIMEOUT', '30'))
+
+
+class StartupOrchestrator:
+    def __init__(self, required=()):
+        self.required = tuple(required)
+        self.started_at = time.monotonic()
+        self.phases = {}
+        self._background = set()  # strong references to background() tasks until they finish
+
+    def begin(self, name):
+        self.phases[name] = {'status': 'running', 'started': time.monotonic(), 'duration_ms': None}
+
+    def finish(self, name, ok=True, error=None):
+        phase = self.phases.setdefault(name, {'started': time.monotonic()})
+        phase['status'] = 'done' if ok else 'failed'
+        phase['duration_ms'] = round((time.monotonic() - phase['started']) * 1000, 1)
+        if error is not None:
+            phase['error'] = str(error)
+        log = logger.info if ok else logger.warning
+        detail = f": {error}" if error is not None else ''
+        log(f"⏱️ Startup phase '{name}' {phase['status']} in {phase['duration_ms']} ms{detail}")
+
+    async def run(self, name, aw):
+        """Await `aw` as phase `name`, recording its timing. Exceptions are re-raised."""
+        self.begin(name)
+        try:
+            result = await aw
+        except BaseException as e:
+            self.finish(name, ok=False, error=e)
+            raise
+        self.finish(name)
+        return result
+
+    def start(self, name, aw):
+        """Run phase `name` as a background task."""
+        return asyncio.create_task(self.run(name, aw), name=f"startup:{name}")
+
+    def background(self, name, aw):
+        """Run phase `name` as a task nobody awaits; a failure is logged instead of re-raised."""
+        task = self.start(name, aw)
+        self._background.add(task)
+        task.add_done_callback(lambda t: self._background_done(name, t))
+        return task
+
+    def _background_done(self, name, task):
+        self._background.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.error(f"❌ Startup phase '{name}' failed", exc_info=error)
+
+    @property
+    def ready(self):
+        return all(self.phases.get(n, {}).get('status') == 'done' for n in self.required)
+
+    def snapshot(self):
+        return {
+            'ready': self.ready,
+            'uptime_s': round(time.monotonic() - self.started_at, 1),
+            'phases': {
+                name: {k: v for k, v in phase.items() if k != 'started'}
+                for name, phase in self.phases.items()
+            },
+        }
+
+    def log_summary(self):
+        parts = [f"{name}={p.get('duration_ms')}ms({p.get('status')})" for name, p in self.phases.items()]
+        total = round((time.monotonic() - self.started_at) * 1000, 1)
+        logger.info(f"⏱️ Startup breakdown ({total} ms total): " + ", ".join(parts))
+
+
+async def probe_network(host='discord.com', port=443, timeout=NETWORK_READY_TIMEOUT):
+    """Wait until `host:port` accepts a TCP connection, instead of sleeping a fixed time.
+
+    DNS diagnostics for IPv4/IPv6/any are resolved concurrently and logged. Raises
+    TimeoutError if `timeout` elapses first; callers treat that as non-fatal and rely
+    on the connect retry loop.
+    """
+    loop = asyncio.get_running_loop()
+    families = [(socket.AF_INET, 'IPv4'), (socket.AF_INET6, 'IPv6'), (socket.AF_UNSPEC, 'ANY')]
+    results = await asyncio.gather(
+        *(loop.getaddrinfo(host, port, family=f) for f, _ in families), return_exceptions=True
+    )
+    for (_, fam_name), res in zip(families, results):
+        if isinstance(res, Exception):
+            logger.warning(f"   ❌ {fam_name} resolution failed: {res}")
+        else:
+            logger.info(f"   ✅ {fam_name} resolution: {res[0][4][0]}")
+
+    deadline = loop.time() + timeout
+    delay = 0.25
+    while True:
+        remaining = deadline - loop.time()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), max(remaining, 0.1))
+            writer.close()
+            return
+        except (OSError, asyncio.TimeoutError) as e:
+            if loop.time() + delay >= deadline:
+                raise TimeoutError(f"{host}:{port} not reachable after {timeout}s: {e}") from e
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+
+STARTUP = StartupOrchestrator(required=('database', 'extensions', 'gateway'))
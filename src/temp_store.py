@@ -0,0 +1,142 @@
+"""Durable store for temporary schedule changes.
+
+`utils.TEMP_CHANGES` stays the in-memory view used by the merge helpers, but every
+change is also queued here and written to the `temp_changes` table in batches, so
+a burst of edits costs one commit. The schedule commands flush before replying,
+and the periodic flush retries anything a failed write left queued. Only the current and next
+ISO week are loaded at startup, and past weeks are pruned from both the table
+and memory.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import and_, insert, or_
+from database.database import get_db
+from database.models import TempChange
+
+logger = logging.getLogger('discord_bot')
+
+
+def _week_key(dt):
+    iso = dt.isocalendar()
+    return (iso.year, iso.week)
+
+
+def _before_week(week_key):
+    year, week = week_key
+    return or_(TempChange.year < year, and_(TempChange.year == year, TempChange.week < week))
+
+
+class TempChangeStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Serialises flush() inserts with delete_before(), so a prune cannot miss rows being written
+        self._write_lock = threading.Lock()
+        self._pending = []
+        self._floor = None  # week key set by evict(); queued rows for earlier weeks are dropped
+
+    def record_replacement(self, week_key, group, day, orig_key, new_entry):
+        self._queue(week_key, group, day, 'replacement', orig_key, new_entry)
+
+    def record_cancellation(self, week_key, group, day, orig_key):
+        self._queue(week_key, group, day, 'cancellation', orig_key, None)
+
+    def _queue(self, week_key, group, day, kind, orig_key, new_entry):
+        new_entry = new_entry or {}
+        row = {
+            'year': week_key[0], 'week': week_key[1], 'group_name': group, 'day': day, 'kind': kind,
+            'orig_time': orig_key[0], 'orig_subject': orig_key[1],
+            'new_time': new_entry.get('time'), 'new_subject': new_entry.get('subject'),
+            'new_room': new_entry.get('room', ''),
+        }
+        with self._lock:
+            self._pending.append(row)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Write all queued changes in a single transaction. Returns the number written."""
+        with self._write_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._floor is not None:
+                batch = [r for r in batch if (r['year'], r['week']) >= self._floor]
+        if not batch:
+            return 0
+        db = get_db()
+        try:
+            db.execute(insert(TempChange), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Re-queue so the next flush retries, keeping the original order
+            with self._lock:
+                self._pending[:0] = batch
+            logger.exception(f"Failed to persist {len(batch)} temporary schedule changes")
+            return 0
+        finally:
+            db.close()
+        logger.debug(f"Persisted {len(batch)} temporary schedule changes")
+        return len(batch)
+
+    def load_window(self, target, now=None):
+        """Load the current and next ISO week from the table into `target` (TEMP_CHANGES)."""
+        now = now or datetime.now()
+        weeks = [_week_key(now), _week_key(now + timedelta(weeks=1))]
+        db = get_db()
+        try:
+            rows = db.query(TempChange).filter(
+                or_(*[and_(TempChange.year == y, TempChange.week == w) for (y, w) in weeks])
+            ).order_by(TempChange.id).all()
+        finally:
+            db.close()
+        for wk in weeks:
+            target.pop(wk, None)
+        for r in rows:
+            day_changes = target.setdefault((r.year, r.week), {}).setdefault(r.group_name, {}).setdefault(r.day, {})
+            orig_key = (r.orig_time or '', r.orig_subject or '')
+            if r.kind == 'cancellation':
+                day_changes.setdefault('cancellations', []).append(orig_key)
+            else:
+                new_e = {'time': r.new_time, 'subject': r.new_subject, 'room': r.new_room or ''}
+                day_changes.setdefault('replacements', []).append((orig_key, new_e))
+        return len(rows)
+
+    def evict(self, target, now=None):
+        """Drop past weeks from `target` (TEMP_CHANGES) and from the write queue.
+
+        Returns the current week key. Mutates `target`, so call it where `target` is read
+        (the event loop); the table is pruned separately with `delete_before()`.
+        """
+        current = _week_key(now or datetime.now())
+        for wk in [k for k in target if k < current]:
+            del target[wk]
+        with self._lock:
+            self._floor = current
+            self._pending = [r for r in self._pending if (r['year'], r['week']) >= current]
+        return current
+
+    def delete_before(self, week_key):
+        """Delete the changes of weeks before `week_key` from the table."""
+        with self._write_lock:
+            db = get_db()
+            try:
+                deleted = db.query(TempChange).filter(_before_week(week_key)).delete(synchronize_session=False)
+                db.commit()
+            finally:
+                db.close()
+        if deleted:
+            logger.info(f"🧹 Pruned {deleted} temporary schedule changes from past weeks")
+        return deleted
+
+    def prune(self, target, now=None):
+        """Evict past weeks from `target` and the write queue, then delete them from the table."""
+        return self.delete_before(self.evict(target, now))
+
+
+TEMP_STORE = TempChangeStore()
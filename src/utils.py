@@ -2,13 +2,25 @@ import os
 import json
 import re
 from datetime import datetime
+from functools import lru_cache
 from discord.ext import commands
 from configuration.config import CR_USER_ID, CR_ROLE_NAME
+from database.parsing import day_start_minute, parse_interval, parse_weekday
+from dispatch import send
+from temp_store import TEMP_STORE
 
 # Global State
 MAIN_SCHEDULE = {}
 MAIN_SCHEDULE_FILE = None
 TEMP_CHANGES = {}
+# Bumped on every mutation so rendered views can be cached per version
+MAIN_SCHEDULE_VERSION = 0
+TEMP_CHANGES_VERSION = 0
+
+# Keys added to MAIN_SCHEDULE entries at load time; never written back to main.json
+DERIVED_KEYS = ('start_minute', 'end_minute')
+# Sorts entries whose time could not be parsed after all others
+UNKNOWN_START = 24 * 60
 
 # Ensure project root is on sys.path so packages at repo root (e.g., database, configuration)
 # can be imported when running this file as a script: `python src/main.py`.
@@ -20,7 +32,7 @@ def is_cr():
             return True
         if any(role.name == CR_ROLE_NAME for role in ctx.author.roles):
             return True
-        await ctx.send("❌ You don't have permission to use this command.")
+        await send(ctx, "❌ You don't have permission to use this command.")
         return False
     return commands.check(predicate)
 
@@ -30,7 +42,7 @@ def get_week_key(dt=None):
     return (iso.year, iso.week)
 
 def load_main_schedule_from_file(path):
-    global MAIN_SCHEDULE, MAIN_SCHEDULE_FILE
+    global MAIN_SCHEDULE, MAIN_SCHEDULE_FILE, MAIN_SCHEDULE_VERSION
     # Resolve path: allow passing a filename relative to project root (where main.json usually lives)
     candidate_paths = []
     # expand user + absolute
@@ -57,42 +69,174 @@ def load_main_schedule_from_file(path):
         raise FileNotFoundError(f"Schedule file not found: {path}. Tried: {', '.join(candidate_paths)}")
     with open(found, 'r', encoding='utf-8') as f:
         data = json.load(f)
-    # Normalize day keys to lowercase
+    # Normalize day keys to lowercase weekday names ('Mon' -> 'monday')
     normalized = {}
     for group, days in data.items():
         normalized[group] = {}
         for day, entries in days.items():
-            normalized[group][day.lower()] = entries
+            key = parse_weekday(day) if isinstance(entries, list) else None
+            normalized[group][key or day.lower()] = entries
+    # Parse every entry's time once; views sort on the resulting integers
+    day_start = day_start_minute(normalized.get('metadata'))
+    for group, days in normalized.items():
+        for entries in days.values():
+            if isinstance(entries, list):
+                for e in entries:
+                    if isinstance(e, dict):
+                        set_entry_interval(e, day_start)
     MAIN_SCHEDULE = normalized
     MAIN_SCHEDULE_FILE = found
+    MAIN_SCHEDULE_VERSION += 1
     return MAIN_SCHEDULE
 
 def save_main_schedule_to_file(path=None):
-    global MAIN_SCHEDULE, MAIN_SCHEDULE_FILE
+    global MAIN_SCHEDULE, MAIN_SCHEDULE_FILE, MAIN_SCHEDULE_VERSION
+    # Callers mutate MAIN_SCHEDULE in place before saving
+    MAIN_SCHEDULE_VERSION += 1
     if path is None:
         path = MAIN_SCHEDULE_FILE
     if not path:
         raise ValueError("No main schedule file set")
-    # We will write days as they are in MAIN_SCHEDULE (lowercase days)
+    # We will write days as they are in MAIN_SCHEDULE (lowercase days), without the parsed intervals
+    data = {
+        group: {
+            day: [{k: v for k, v in e.items() if k not in DERIVED_KEYS} if isinstance(e, dict) else e for e in entries]
+            if isinstance(entries, list) else entries
+            for day, entries in days.items()
+        } if isinstance(days, dict) else days
+        for group, days in MAIN_SCHEDULE.items()
+    }
     with open(path, 'w', encoding='utf-8') as f:
-        json.dump(MAIN_SCHEDULE, f, indent=2, ensure_ascii=False)
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def _day_start():
+    return day_start_minute(MAIN_SCHEDULE.get('metadata'))
+
+@lru_cache(maxsize=8192)
+def _parse_interval(t, day_start):
+    return parse_interval(t, day_start)
+
+def set_entry_interval(e, day_start=None):
+    """Store e['time'] parsed into e['start_minute'] / e['end_minute']; call after changing the time."""
+    e['start_minute'], e['end_minute'] = _parse_interval(e.get('time'), _day_start() if day_start is None else day_start)
+    return e
+
+def _entry_interval(e):
+    if e.get('start_minute') is not None:
+        return e['start_minute'], e.get('end_minute')
+    return _parse_interval(e.get('time'), _day_start())
 
+def time_sort_key(e):
+    """Chronological sort key for schedule entries carrying 'start_minute'."""
+    start = e.get('start_minute')
+    return UNKNOWN_START if start is None else start
+
+_AMPM_SUFFIX_RE = re.compile(r'\s*([AaPp][Mm])$')
+_SPACES_RE = re.compile(r'\s+')
+_AMPM_RE = re.compile(r'([AaPp][Mm])')
+
+@lru_cache(maxsize=8192)
 def _normalize_time(t):
     if not t:
         return ''
     s = str(t).strip()
     # Ensure there's a space before AM/PM if present (e.g., '9:00AM' -> '9:00 AM')
-    s = re.sub(r'\s*([AaPp][Mm])$', r' \1', s)
+    s = _AMPM_SUFFIX_RE.sub(r' \1', s)
     # Normalize spacing and AM/PM case
-    s = re.sub(r'\s+', ' ', s).strip()
-    s = re.sub(r'([AaPp][Mm])', lambda m: m.group(1).upper(), s)
+    s = _SPACES_RE.sub(' ', s).strip()
+    s = _AMPM_RE.sub(lambda m: m.group(1).upper(), s)
     return s
 
+@lru_cache(maxsize=8192)
 def _normalize_subject(sub):
     if not sub:
         return ''
     return str(sub).strip().lower()
 
+def _entry_key(e):
+    return (_normalize_time(e.get('time')), _normalize_subject(e.get('subject')))
+
+def _display_entry(e, time=None):
+    start, end = _entry_interval(e)
+    return {
+        'time': time if time is not None else e.get('time'),
+        'start_minute': start,
+        'end_minute': end,
+        'subject': e.get('subject'),
+        'room': e.get('room', ''),
+        'instructor': e.get('instructor', ''),
+        'note': e.get('note', '')
+    }
+
+class _DayOverlay:
+    """The temporary changes of one (week, group, day), compiled into lookups for the merge helpers.
+
+    `replacements` maps an original key to `(new_entry, display_entry)`, or to None when the
+    replacement was itself cancelled; the last replacement recorded for a key wins. `adds` holds
+    every live replacement in order, used for those whose original is not in the base schedule.
+    """
+    __slots__ = ('cancels', 'replacements', 'adds')
+
+    def __init__(self, day_changes):
+        self.cancels = set(day_changes.get('cancellations', []))
+        self.replacements = {}
+        self.adds = []
+        for orig_key, new_e in day_changes.get('replacements', []):
+            if _entry_key(new_e) in self.cancels:
+                self.replacements[orig_key] = None
+                continue
+            compiled = (new_e, _display_entry(new_e))
+            self.replacements[orig_key] = compiled
+            self.adds.append((orig_key,) + compiled)
+
+# (week_key, group, day) -> _DayOverlay, or None for days without changes; valid for _OVERLAYS_VERSION
+_OVERLAYS = {}
+_OVERLAYS_VERSION = None
+# (group, day) -> [(key, display_entry)] of MAIN_SCHEDULE; valid for _BASE_VERSION
+_BASE_ENTRIES = {}
+_BASE_VERSION = None
+
+def _compile_overlay(week_key, group, day):
+    day_changes = TEMP_CHANGES.get(week_key, {}).get(group, {}).get(day)
+    overlay = _DayOverlay(day_changes) if day_changes else None
+    _OVERLAYS[(week_key, group, day)] = overlay
+    return overlay
+
+def _overlay(week_key, group, day):
+    global _OVERLAYS_VERSION
+    if _OVERLAYS_VERSION != TEMP_CHANGES_VERSION:
+        # TEMP_CHANGES was reloaded or pruned wholesale
+        _OVERLAYS.clear()
+        _OVERLAYS_VERSION = TEMP_CHANGES_VERSION
+    try:
+        return _OVERLAYS[(week_key, group, day)]
+    except KeyError:
+        return _compile_overlay(week_key, group, day)
+
+def _record_temp_change(week_key, group, day):
+    """Bump TEMP_CHANGES_VERSION and recompile only the overlay of the day that changed."""
+    global TEMP_CHANGES_VERSION, _OVERLAYS_VERSION
+    current = _OVERLAYS_VERSION == TEMP_CHANGES_VERSION
+    TEMP_CHANGES_VERSION += 1
+    if current:
+        _OVERLAYS_VERSION = TEMP_CHANGES_VERSION
+        _compile_overlay(week_key, group, day)
+
+def _base_entries(group, day):
+    global _BASE_VERSION
+    if _BASE_VERSION != MAIN_SCHEDULE_VERSION:
+        _BASE_ENTRIES.clear()
+        _BASE_VERSION = MAIN_SCHEDULE_VERSION
+    try:
+        return _BASE_ENTRIES[(group, day)]
+    except KeyError:
+        pass
+    entries = MAIN_SCHEDULE.get(group, {}).get(day) or []
+    # Original time is kept normalized for consistent display
+    base = [(_entry_key(e), _display_entry(e, _normalize_time(e.get('time')))) for e in entries]
+    _BASE_ENTRIES[(group, day)] = base
+    return base
+
 def apply_temp_replacement(week_key, group, day, orig_time, orig_subject, new_entry):
     # store normalized keys for robust matching
     ot = _normalize_time(orig_time)
@@ -103,83 +247,79 @@ def apply_temp_replacement(week_key, group, day, orig_time, orig_subject, new_en
         new_e['time'] = _normalize_time(new_e['time'])
     if 'subject' in new_e:
         new_e['subject'] = new_e['subject'].strip()
+    set_entry_interval(new_e)
     TEMP_CHANGES.setdefault(week_key, {}).setdefault(group, {}).setdefault(day, {}).setdefault('replacements', []).append(((ot, osub), new_e))
+    _record_temp_change(week_key, group, day)
+    TEMP_STORE.record_replacement(week_key, group, day, (ot, osub), new_e)
 
 def apply_temp_cancellation(week_key, group, day, orig_time, orig_subject):
     ot = _normalize_time(orig_time)
     osub = _normalize_subject(orig_subject)
     TEMP_CHANGES.setdefault(week_key, {}).setdefault(group, {}).setdefault(day, {}).setdefault('cancellations', []).append((ot, osub))
+    _record_temp_change(week_key, group, day)
+    TEMP_STORE.record_cancellation(week_key, group, day, (ot, osub))
+
+def load_persisted_temp_changes(now=None):
+    """Populate TEMP_CHANGES with the current and next week from the database."""
+    global TEMP_CHANGES_VERSION
+    count = TEMP_STORE.load_window(TEMP_CHANGES, now)
+    TEMP_CHANGES_VERSION += 1
+    return count
+
+def evict_past_temp_changes(now=None):
+    """Drop past weeks from TEMP_CHANGES and the write-behind queue; returns the current week key.
+
+    Mutates TEMP_CHANGES, so once the bot is running call it on the event loop.
+    """
+    global TEMP_CHANGES_VERSION
+    current = TEMP_STORE.evict(TEMP_CHANGES, now)
+    TEMP_CHANGES_VERSION += 1
+    return current
+
+def prune_temp_changes(now=None):
+    """Drop past weeks from TEMP_CHANGES and the database."""
+    return TEMP_STORE.delete_before(evict_past_temp_changes(now))
 
 def merge_schedule_for_week(group, day, week_key=None):
-    """Return a list of schedule entries for the given group and day, applying temporary changes for the week_key if present."""
+    """Return a list of schedule entries for the given group and day, applying temporary changes for the week_key if present.
+
+    The entries are shared between calls; treat them as read-only.
+    """
     week_key = week_key or get_week_key()
-    base = []
-    if group in MAIN_SCHEDULE and day in MAIN_SCHEDULE[group]:
-        # clone base entries
-        base = [dict(e) for e in MAIN_SCHEDULE[group][day]]
-    # Apply temporary changes if any
-    wk = TEMP_CHANGES.get(week_key, {})
-    grp = wk.get(group, {})
-    day_changes = grp.get(day, {})
-    cancels = set(day_changes.get('cancellations', []))
-    replacements = {k: v for (k, v) in day_changes.get('replacements', [])}
+    base = _base_entries(group, day)
+    overlay = _overlay(week_key, group, day)
+    if overlay is None:
+        return [e for _, e in base]
 
+    cancels = overlay.cancels
+    replacements = overlay.replacements
     merged = []
     handled_orig_keys = set()
-
-    for e in base:
-        key = (_normalize_time(e.get('time')), _normalize_subject(e.get('subject')))
-        # If original time+subject canceled directly, skip
+    for key, e in base:
+        # Cancelled directly, or replaced (unless the replacement was cancelled too)
         if key in cancels:
             handled_orig_keys.add(key)
-            continue
-
-        # If there is a replacement mapping for this original, check if the replacement itself is canceled
-        if key in replacements:
-            new_e = replacements[key]
-            new_key = (_normalize_time(new_e.get('time')), _normalize_subject(new_e.get('subject')))
-            # If replacement is canceled explicitly, skip (neither original nor replacement)
-            if new_key in cancels:
-                handled_orig_keys.add(key)
-                continue
-            merged.append({
-                'time': new_e.get('time'),
-                'subject': new_e.get('subject'),
-                'room': new_e.get('room', ''),
-                'instructor': new_e.get('instructor', ''),
-                'note': new_e.get('note', '')
-            })
+        elif key in replacements:
             handled_orig_keys.add(key)
+            compiled = replacements[key]
+            if compiled is not None:
+                merged.append(compiled[1])
         else:
-            # keep original (normalize time for consistent display)
-            merged.append({
-                'time': _normalize_time(e.get('time')),
-                'subject': e.get('subject'),
-                'room': e.get('room', ''),
-                'instructor': e.get('instructor', ''),
-                'note': e.get('note', '')
-            })
+            merged.append(e)
 
     # Add any replacement entries that did not map to an existing original (standalone adds)
-    for (orig_k, new_e) in day_changes.get('replacements', []):
+    for orig_k, _, shown in overlay.adds:
         if orig_k not in handled_orig_keys:
-            new_key = (_normalize_time(new_e.get('time')), _normalize_subject(new_e.get('subject')))
-            if new_key in cancels:
-                # this standalone replacement was later canceled
-                continue
-            merged.append({
-                'time': new_e.get('time'),
-                'subject': new_e.get('subject'),
-                'room': new_e.get('room', ''),
-                'instructor': new_e.get('instructor', ''),
-                'note': new_e.get('note', '')
-            })
-
+            merged.append(shown)
     return merged
 
-def apply_temp_changes_to_db_rows(rows, week_key):
+def apply_temp_changes_to_db_rows(rows, week_key, days=None):
     """Given a list of sqlite Row-like dicts with keys day,time,subject,group_name,room,
     apply temporary changes from TEMP_CHANGES for week_key and return merged list.
+
+    Rows may span several days; every merged entry carries its lowercase 'day' so
+    callers can bucket a whole week from a single pass. When `days` is given, pure
+    additions from TEMP_CHANGES are limited to those days.
     """
     # build mapping of replacements and cancellations for groups/days
     result = []
@@ -188,10 +328,12 @@ def apply_temp_changes_to_db_rows(rows, week_key):
 
     def _rget(r, key, default=None):
         try:
+            # Dictionary access (the schedule index hands out dicts)
+            if isinstance(r, dict):
+                return r.get(key, default)
             # SQLAlchemy object access
             if hasattr(r, key):
                 return getattr(r, key)
-            # Dictionary access
             elif hasattr(r, 'get'):
                 return r.get(key, default)
             else:
@@ -199,6 +341,20 @@ def apply_temp_changes_to_db_rows(rows, week_key):
         except Exception:
             return default
 
+    day_start = _day_start()
+
+    def _kept(r, time, subject, group, day):
+        # keep original (normalize time for consistent display)
+        start, end = _rget(r, 'start_minute'), _rget(r, 'end_minute')
+        if start is None:
+            start, end = _parse_interval(time, day_start)
+        return {'time': time, 'start_minute': start, 'end_minute': end, 'subject': subject,
+                'room': _rget(r, 'room', ''), 'group_name': group, 'day': day}
+
+    def _changed(shown, room, group, day):
+        return {'time': shown['time'], 'start_minute': shown['start_minute'], 'end_minute': shown['end_minute'],
+                'subject': shown['subject'], 'room': room, 'group_name': group, 'day': day}
+
     # Group rows by (group, day) so we can apply replacements/cancellations per group/day
     grouped = {}
     for r in rows:
@@ -206,56 +362,50 @@ def apply_temp_changes_to_db_rows(rows, week_key):
         day = (_rget(r, 'day') or '').lower()
         grouped.setdefault((group, day), []).append(r)
 
-    wk = TEMP_CHANGES.get(week_key, {})
-
     # Process each group/day present in DB rows
     for (group, day), rlist in grouped.items():
-        # get changes for this group/day
-        grp = wk.get(group, {})
-        day_changes = grp.get(day, {})
-        cancels = set(day_changes.get('cancellations', []))
-        replacements = {k: v for (k, v) in day_changes.get('replacements', [])}
+        overlay = _overlay(week_key, group, day)
+        if overlay is None:
+            for r in rlist:
+                result.append(_kept(r, _normalize_time(_rget(r, 'time')), _rget(r, 'subject'), group, day))
+            continue
 
+        cancels = overlay.cancels
+        replacements = overlay.replacements
         handled_orig_keys = set()
-
         for r in rlist:
-            time = _rget(r, 'time')
             subject = _rget(r, 'subject')
-            key = (_normalize_time(time), _normalize_subject(subject))
-
+            time = _normalize_time(_rget(r, 'time'))
+            key = (time, _normalize_subject(subject))
             if key in cancels:
                 # skip cancelled original
                 handled_orig_keys.add(key)
-                continue
-
-            if key in replacements:
-                new_e = replacements[key]
+            elif key in replacements:
                 handled_orig_keys.add(key)
-                merged_entry = {
-                    'time': new_e.get('time'),
-                    'subject': new_e.get('subject'),
-                    'room': new_e.get('room', _rget(r, 'room', '')),
-                    'group_name': group
-                }
-                result.append(merged_entry)
+                compiled = replacements[key]
+                if compiled is not None:
+                    new_e, shown = compiled
+                    result.append(_changed(shown, new_e.get('room', _rget(r, 'room', '')), group, day))
             else:
-                # keep original (normalize time for consistent display)
-                result.append({'time': _normalize_time(time), 'subject': subject, 'room': _rget(r, 'room', ''), 'group_name': group})
+                result.append(_kept(r, time, subject, group, day))
 
         # Add any replacement entries that did not map to an existing original (standalone adds)
-        for (orig_k, new_e) in day_changes.get('replacements', []):
+        for orig_k, _, shown in overlay.adds:
             if orig_k not in handled_orig_keys:
-                # This replacement did not correspond to any existing row - append as new
-                result.append({'time': new_e.get('time'), 'subject': new_e.get('subject'), 'room': new_e.get('room', ''), 'group_name': group})
+                result.append(_changed(shown, shown['room'], group, day))
 
     # Also process any TEMP_CHANGES for groups/days not present in DB rows (pure adds)
-    for grp_name, groups in wk.items():
-        for dname, dchanges in groups.items():
+    for grp_name, groups in TEMP_CHANGES.get(week_key, {}).items():
+        for dname in groups:
             if (grp_name, dname) in grouped:
                 continue
-            # no DB rows for this group/day; add all replacements that are not cancellations
-            for (orig_k, new_e) in dchanges.get('replacements', []):
-                result.append({'time': new_e.get('time'), 'subject': new_e.get('subject'), 'room': new_e.get('room',''), 'group_name': grp_name})
+            if days is not None and dname not in days:
+                continue
+            overlay = _overlay(week_key, grp_name, dname)
+            if overlay is None:
+                continue
+            for _, _, shown in overlay.adds:
+                result.append(_changed(shown, shown['room'], grp_name, dname))
 
     return result
 
@@ -280,7 +430,9 @@ def _parse_edit_cancel_args(args):
     if len(tokens) < 4:
         return None
     group = tokens[0]
-    day = tokens[1].lower()
+    day = parse_weekday(tokens[1])
+    if not day:
+        return None
     # find first time token
     t1, t1s, t1e = _find_time_tokens(tokens, 2)
     if not t1: